@@ -0,0 +1,368 @@
+"""End-to-end pipeline benchmark on synthetic course exports.
+
+A synthetic Canvas export (HTML pages and PDFs) and Piazza export are
+generated at the requested scale, then every stage of the pipeline is timed
+separately: loading, splitting, embedding with
+:class:`~rag_ed.embeddings.PassThroughEmbeddings`, index build per vector
+store backend, reloading a persisted index, cold start from a retriever
+snapshot in a fresh process, query latency and throughput, and graph
+construction and traversal with
+:class:`~rag_ed.retrievers.graph.GraphRetriever`. Results are written as
+JSON, so runs on different commits can be diffed with ``--compare``.
+
+Examples
+--------
+$ python benchmarks/e2e.py --pages 200 --pdfs 50 --posts 1000 --output e2e.json
+$ python benchmarks/e2e.py --pages 200 --pdfs 50 --posts 1000 --compare e2e.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from rag_ed.retrievers.vectorstore import VectorStoreType
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import generate_course, sample_queries
+
+STORES = ("in_memory", "faiss", "chroma")
+
+
+def _timed(func: Callable[[], Any]) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _latency(func: Callable[[str], Any], queries: list[str]) -> dict[str, float]:
+    """Run ``func`` over ``queries`` and summarize per-query latency."""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "queries": len(samples),
+        "p50_ms": 1000 * statistics.median(samples),
+        "p95_ms": 1000 * samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "max_ms": 1000 * samples[-1],
+        "qps": len(samples) / total if total else 0.0,
+    }
+
+
+def _bench_store(
+    store_type: VectorStoreType,
+    chunks: list[Any],
+    embeddings: Any,
+    queries: list[str],
+    workdir: Path,
+    k: int,
+) -> dict[str, Any]:
+    from rag_ed.retrievers.vectorstore import _build_vector_store
+
+    persist = None if store_type == "in_memory" else str(workdir / store_type)
+    store, build_s = _timed(
+        lambda: _build_vector_store(chunks, embeddings, store_type, persist)
+    )
+    result: dict[str, Any] = {"build_s": build_s}
+    if persist is not None:
+        store, load_s = _timed(
+            lambda: _build_vector_store(chunks, embeddings, store_type, persist)
+        )
+        result["persisted_load_s"] = load_s
+    result["query"] = _latency(lambda q: store.similarity_search(q, k=k), queries)
+    return result
+
+
+def _bench_ingest(
+    canvas: Path, piazza: Path, chunker: Any, embeddings: Any
+) -> dict[str, Any]:
+    """Run load, split, embed and in-memory indexing as one pipeline."""
+    from rag_ed.loaders.canvas import CanvasLoader
+    from rag_ed.loaders.piazza import PiazzaLoader
+    from rag_ed.retrievers.ingest import file_sources, ingest
+    from rag_ed.retrievers.vectorstore import _VectorBuffer
+
+    sources = file_sources(CanvasLoader(str(canvas))) + file_sources(
+        PiazzaLoader(str(piazza))
+    )
+    result = ingest(
+        sources,
+        split=chunker.split,
+        embeddings=embeddings,
+        build_store=_VectorBuffer,
+    )
+    result.vector_store.build(result.chunks, embeddings)
+    stats = result.stats
+    return {
+        "seconds": stats.seconds,
+        "chunks": stats.chunks,
+        "bottleneck": stats.bottleneck,
+        "peak_in_flight_chars": stats.peak_in_flight,
+        "peak_rss_bytes": stats.peak_rss,
+        "stage_busy_s": {
+            name: stage.busy_seconds for name, stage in stats.stages.items()
+        },
+    }
+
+
+_COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+imported = time.perf_counter()
+retriever = VectorStoreRetriever.from_snapshot(
+    sys.argv[1], embeddings=PassThroughEmbeddings()
+)
+opened = time.perf_counter()
+retriever.retrieve(sys.argv[2])
+done = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "open_s": opened - imported,
+    "first_query_s": done - opened,
+}))
+"""
+
+
+def _bench_snapshot(
+    canvas: Path, piazza: Path, chunker: Any, workdir: Path, query: str
+) -> dict[str, Any]:
+    """Write a snapshot and time a cold start from it in a fresh process."""
+    from rag_ed.embeddings import PassThroughEmbeddings
+    from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+    retriever = VectorStoreRetriever(
+        str(canvas),
+        str(piazza),
+        vector_store_type="in_memory",
+        embeddings=PassThroughEmbeddings(),
+        retrieval_mode="hybrid",
+        chunker=chunker,
+    )
+    path = workdir / "index.snap"
+    _, save_s = _timed(lambda: retriever.save_snapshot(path))
+    process, cold_start_s = _timed(
+        lambda: subprocess.run(
+            [sys.executable, "-c", _COLD_START, str(path), query],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    )
+    return {
+        "save_s": save_s,
+        "bytes": path.stat().st_size,
+        "cold_start_s": cold_start_s,
+        **json.loads(process.stdout),
+    }
+
+
+def _bench_bm25(chunks: list[Any], queries: list[str], k: int) -> dict[str, Any]:
+    from rag_ed.retrievers.lexical import BM25Index
+
+    index, build_s = _timed(lambda: BM25Index([c.page_content for c in chunks]))
+    return {
+        "build_s": build_s,
+        "query": _latency(lambda q: index.search(q, k), queries),
+    }
+
+
+def _bench_graph(documents: list[Any], samples: int, depth: int) -> dict[str, Any]:
+    from rag_ed.graphs.generation import _graph_from_documents
+    from rag_ed.retrievers.graph import GraphRetriever
+
+    graph, build_s = _timed(lambda: _graph_from_documents(documents, prefix="doc"))
+    retriever = GraphRetriever(graph, max_depth=depth)
+    nodes = list(graph.graph.nodes)
+    rng = random.Random(0)
+    starts = [rng.choice(nodes) for _ in range(samples)] if nodes else []
+    return {
+        "build_s": build_s,
+        "nodes": graph.graph.number_of_nodes(),
+        "edges": graph.graph.number_of_edges(),
+        "max_depth": depth,
+        "query": _latency(retriever.retrieve, starts),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Generate the synthetic course and time every pipeline stage."""
+    from rag_ed.embeddings import PassThroughEmbeddings
+    from rag_ed.loaders.canvas import CanvasLoader
+    from rag_ed.loaders.piazza import PiazzaLoader
+    from rag_ed.retrievers.chunking import Chunker
+
+    chunker = Chunker(args.chunker)
+    stages: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="rag-ed-bench-") as tmp:
+        workdir = Path(tmp)
+        (canvas, piazza), generate_s = _timed(
+            lambda: generate_course(
+                workdir / "exports",
+                pages=args.pages,
+                pdfs=args.pdfs,
+                posts=args.posts,
+                seed=args.seed,
+            )
+        )
+        stages["generate"] = {
+            "seconds": generate_s,
+            "canvas_bytes": canvas.stat().st_size,
+            "piazza_bytes": piazza.stat().st_size,
+        }
+
+        canvas_docs, canvas_s = _timed(CanvasLoader(str(canvas)).load)
+        piazza_docs, piazza_s = _timed(PiazzaLoader(str(piazza)).load)
+        documents = canvas_docs + piazza_docs
+        stages["load"] = {
+            "seconds": canvas_s + piazza_s,
+            "canvas_s": canvas_s,
+            "piazza_s": piazza_s,
+            "documents": len(documents),
+        }
+
+        chunks, split_s = _timed(lambda: chunker.split(documents))
+        stages["split"] = {
+            "seconds": split_s,
+            "strategy": args.chunker,
+            **dataclasses.asdict(chunker.describe(chunks)),
+        }
+
+        embeddings = PassThroughEmbeddings()
+        texts = [chunk.page_content for chunk in chunks]
+        _, embed_s = _timed(lambda: embeddings.embed_documents(texts))
+        stages["embed"] = {
+            "seconds": embed_s,
+            "chunks_per_s": len(texts) / embed_s if embed_s else 0.0,
+        }
+
+        stages["pipelined_ingest"] = _bench_ingest(canvas, piazza, chunker, embeddings)
+
+        queries = sample_queries(args.queries, seed=args.seed)
+        stores: dict[str, Any] = {}
+        for store_type in args.stores:
+            try:
+                stores[store_type] = _bench_store(
+                    store_type, chunks, embeddings, queries, workdir, args.k
+                )
+            except ImportError as exc:
+                # Optional backends that are not installed are reported, not fatal.
+                stores[store_type] = {"skipped": repr(exc)}
+        stores["bm25"] = _bench_bm25(chunks, queries, args.k)
+        stages["snapshot"] = _bench_snapshot(
+            canvas, piazza, chunker, workdir, queries[0]
+        )
+        stages["graph"] = _bench_graph(documents, args.queries, args.graph_depth)
+
+    return {"stages": stages, "stores": stores}
+
+
+def _git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def _flatten(payload: Any, prefix: str = "") -> dict[str, float]:
+    if isinstance(payload, dict):
+        flat: dict[str, float] = {}
+        for key, value in payload.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        return flat
+    if isinstance(payload, (int, float)) and not isinstance(payload, bool):
+        return {prefix[:-1]: float(payload)}
+    return {}
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> dict[str, float]:
+    """Return ``current / baseline`` for every timing both runs report."""
+    old = _flatten({"stages": baseline["stages"], "stores": baseline["stores"]})
+    new = _flatten({"stages": current["stages"], "stores": current["stores"]})
+    return {
+        key: new[key] / old[key]
+        for key in sorted(old.keys() & new.keys())
+        if key.endswith(("_s", "seconds", "_ms"))
+        and not key.endswith("per_s")
+        and old[key] > 0
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100, help="Canvas HTML pages")
+    parser.add_argument("--pdfs", type=int, default=20, help="Canvas PDF files")
+    parser.add_argument("--posts", type=int, default=500, help="Piazza posts")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per index")
+    parser.add_argument("--k", type=int, default=5, help="Documents per query")
+    parser.add_argument("--graph-depth", type=int, default=2, help="Graph hops")
+    parser.add_argument(
+        "--chunker",
+        choices=["recursive", "structure"],
+        default="recursive",
+        help="Chunking strategy",
+    )
+    parser.add_argument(
+        "--stores",
+        nargs="+",
+        choices=STORES,
+        default=list(STORES),
+        help="Vector store backends to benchmark",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    parser.add_argument("--compare", help="Baseline JSON to report ratios against")
+    args = parser.parse_args(argv)
+
+    results = {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "revision": _git_revision(),
+        "scale": {
+            "pages": args.pages,
+            "pdfs": args.pdfs,
+            "posts": args.posts,
+            "queries": args.queries,
+            "k": args.k,
+            "seed": args.seed,
+        },
+        **run(args),
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            results["ratios"] = compare(json.load(file), results)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(payload + "\n")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Compare the ``networkx`` and CSR course graph backends at scale.
+
+A synthetic graph is generated with the shape :func:`graph_from_canvas`
+produces (chronological chains within each directory) plus random
+cross-references, then each backend is built with the bulk ``add_*`` calls
+and timed on neighbour lookups and :class:`GraphRetriever` traversals from
+one and from several start artifacts. Memory is the traced allocation of the
+graph structure alone; the documents are created up front and shared by both
+backends. Results are written as JSON.
+
+Examples
+--------
+$ python benchmarks/graph.py --artifacts 200000 --output graph.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import langchain_core.documents
+
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
+from rag_ed.retrievers.graph import GraphRetriever
+
+BACKENDS: dict[str, Callable[[], Any]] = {
+    "networkx": CourseGraph,
+    "csr": CSRCourseGraph,
+}
+
+
+def synthetic_graph(
+    artifacts: int, *, group: int = 50, extra_edges: int = 2, seed: int = 0
+) -> tuple[list[tuple[str, langchain_core.documents.Document]], list[tuple[str, str]]]:
+    """Return ``(artifacts, edges)`` for a graph of ``artifacts`` nodes."""
+    rng = random.Random(seed)
+    ids = [f"doc_{i}" for i in range(artifacts)]
+    nodes = [
+        (
+            artifact_id,
+            langchain_core.documents.Document(
+                page_content=f"artifact {i}", metadata={"source": f"dir{i // group}"}
+            ),
+        )
+        for i, artifact_id in enumerate(ids)
+    ]
+    edges = [(ids[i], ids[i + 1]) for i in range(artifacts - 1) if (i + 1) % group]
+    edges += [
+        (ids[i], ids[rng.randrange(artifacts)])
+        for i in range(artifacts)
+        for _ in range(extra_edges)
+    ]
+    return nodes, edges
+
+
+def _build(factory: Callable[[], Any], nodes: list[Any], edges: list[Any]) -> Any:
+    graph = factory()
+    graph.add_artifacts(nodes)
+    graph.add_relationships(edges)
+    # Force the CSR backend to merge its buffered edges.
+    graph.neighbors(nodes[0][0])
+    return graph
+
+
+def bench_backend(
+    factory: Callable[[], Any],
+    nodes: list[Any],
+    edges: list[Any],
+    samples: list[str],
+    depth: int,
+    seeds: int,
+) -> dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    graph = _build(factory, nodes, edges)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del graph
+    gc.collect()
+
+    start = time.perf_counter()
+    graph = _build(factory, nodes, edges)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for artifact_id in samples:
+        graph.neighbors(artifact_id)
+    neighbors_s = time.perf_counter() - start
+
+    # The first traversal of the networkx backend builds its integer view.
+    GraphRetriever(graph).retrieve(samples[0])
+    retriever = GraphRetriever(graph, max_depth=depth, cache_size=0)
+    start = time.perf_counter()
+    found = sum(len(retriever.retrieve(artifact_id)) for artifact_id in samples)
+    traverse_s = time.perf_counter() - start
+
+    # Expanding the top hits of a query: one call per group of seeds, without
+    # and with the neighbourhood cache warmed by an earlier pass.
+    groups = [samples[i : i + seeds] for i in range(0, len(samples), seeds)]
+    start = time.perf_counter()
+    for group in groups:
+        retriever.retrieve_many(group)
+    many_s = time.perf_counter() - start
+    cached = GraphRetriever(graph, max_depth=depth, cache_size=len(samples))
+    for group in groups:
+        cached.retrieve_many(group)
+    start = time.perf_counter()
+    for group in groups:
+        cached.retrieve_many(group)
+    cached_s = time.perf_counter() - start
+
+    # Personalized PageRank over the whole graph: the first call also builds
+    # the walk operator; then one call per group of seeds, then all groups in
+    # one batched call warm-started from those scores.
+    ranker = GraphRetriever(graph)
+    start = time.perf_counter()
+    ranker.retrieve_pagerank(groups[0])
+    first_s = time.perf_counter() - start
+    walks = groups[:20]
+    start = time.perf_counter()
+    for group in walks:
+        ranker.retrieve_pagerank(group)
+    pagerank_s = time.perf_counter() - start
+    start = time.perf_counter()
+    ranker.retrieve_pagerank_many(walks)
+    batched_s = time.perf_counter() - start
+    return {
+        "build_s": build_s,
+        "structure_bytes": memory,
+        "neighbors_us": 1e6 * neighbors_s / len(samples),
+        "traverse_ms": 1000 * traverse_s / len(samples),
+        "documents_per_traversal": found / len(samples),
+        "retrieve_many_ms": 1000 * many_s / len(groups),
+        "retrieve_many_cached_ms": 1000 * cached_s / len(groups),
+        "pagerank_first_s": first_s,
+        "pagerank_ms": 1000 * pagerank_s / len(walks),
+        "pagerank_batched_warm_ms": 1000 * batched_s / len(walks),
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    nodes, edges = synthetic_graph(
+        args.artifacts, extra_edges=args.extra_edges, seed=args.seed
+    )
+    rng = random.Random(args.seed)
+    samples = [nodes[rng.randrange(len(nodes))][0] for _ in range(args.queries)]
+    results = {
+        name: bench_backend(factory, nodes, edges, samples, args.depth, args.seeds)
+        for name in args.backends
+        for factory in [BACKENDS[name]]
+    }
+    return {
+        "python": sys.version.split()[0],
+        "artifacts": len(nodes),
+        "edges": len(edges),
+        "depth": args.depth,
+        "seeds": args.seeds,
+        "backends": results,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artifacts", type=int, default=200_000, help="Graph nodes")
+    parser.add_argument(
+        "--extra-edges", type=int, default=2, help="Random edges per artifact"
+    )
+    parser.add_argument("--queries", type=int, default=1000, help="Lookups to time")
+    parser.add_argument("--depth", type=int, default=2, help="Traversal depth")
+    parser.add_argument(
+        "--seeds", type=int, default=10, help="Start artifacts per retrieve_many"
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=sorted(BACKENDS),
+        default=list(BACKENDS),
+        help="Backends to compare",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    payload = run(args)
+    text = json.dumps(payload, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure import-time cost of ``rag_ed`` and the ``vanilla-rag`` CLI.
+
+Each target runs in a fresh interpreter under ``python -X importtime``. The
+import time over a bare interpreter start-up and the slowest top-level imports
+are reported as JSON, so runs on different commits can be diffed.
+
+Examples
+--------
+$ python benchmarks/import_time.py --repeat 5 --output import_time.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+from typing import Any
+
+TARGETS = {
+    "import rag_ed": ["-c", "import rag_ed"],
+    "vanilla-rag --help": ["-m", "rag_ed.agents.vanilla_rag", "--help"],
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int]]:
+    """Return ``(module, cumulative_us)`` for every top-level import."""
+    entries: list[tuple[str, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented below the module that triggered them.
+        if name.startswith("  "):
+            continue
+        entries.append((name.strip(), int(cumulative)))
+    return entries
+
+
+def measure(args: list[str]) -> dict[str, Any]:
+    """Run ``python -X importtime *args`` and summarize the import tree."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = parse_importtime(result.stderr)
+    slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:10]
+    return {
+        "total_us": sum(us for _, us in entries),
+        "slowest": [{"module": name, "cumulative_us": us} for name, us in slowest],
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    baseline = min(measure(["-c", "pass"])["total_us"] for _ in range(args.repeat))
+    results = {}
+    for target, target_args in TARGETS.items():
+        runs = [measure(target_args) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["total_us"])
+        results[target] = {
+            "overhead_us": max(best["total_us"] - baseline, 0),
+            **best,
+            "runs_us": [run["total_us"] for run in runs],
+        }
+
+    payload = json.dumps(
+        {"python": sys.version, "baseline_us": baseline, "results": results},
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(payload + "\n")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
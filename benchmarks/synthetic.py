@@ -0,0 +1,208 @@
+"""Generate synthetic Canvas and Piazza exports at a chosen scale.
+
+The archives follow the layout of real exports closely enough for
+:class:`~rag_ed.loaders.canvas.CanvasLoader` and
+:class:`~rag_ed.loaders.piazza.PiazzaLoader`: a Common Cartridge with wiki
+pages and PDF files, and a Piazza ``.zip`` with ``class_content_flat.json``.
+Content is drawn from a seeded vocabulary so runs are reproducible.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TOPICS = [
+    "statics",
+    "dynamics",
+    "thermodynamics",
+    "kinematics",
+    "torque",
+    "friction",
+    "momentum",
+    "energy",
+    "stress",
+    "strain",
+    "beam",
+    "truss",
+    "vector",
+    "matrix",
+    "gradient",
+    "integral",
+]
+FILLER = [
+    "the",
+    "a",
+    "of",
+    "for",
+    "and",
+    "with",
+    "review",
+    "lecture",
+    "example",
+    "problem",
+    "solution",
+    "due",
+    "week",
+    "quiz",
+    "exam",
+    "office",
+    "hours",
+    "question",
+    "answer",
+    "figure",
+]
+_EPOCH = datetime(2024, 1, 8, 9, 0, 0)
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    tokens = [
+        rng.choice(TOPICS) if rng.random() < 0.3 else rng.choice(FILLER)
+        for _ in range(words)
+    ]
+    tokens.append(f"HW{rng.randint(1, 12)}")
+    return " ".join(tokens).capitalize() + "."
+
+
+def _paragraphs(rng: random.Random, count: int) -> list[str]:
+    return [
+        " ".join(_sentence(rng) for _ in range(rng.randint(3, 6))) for _ in range(count)
+    ]
+
+
+def _pdf_bytes(lines: list[str]) -> bytes:
+    """Return a minimal single-page PDF showing ``lines`` of text."""
+    text_ops = ["BT", "/F1 10 Tf", "12 TL", "40 780 Td"]
+    for line in lines:
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        text_ops.append(f"({escaped}) Tj T*")
+    text_ops.append("ET")
+    stream = "\n".join(text_ops).encode("latin-1", errors="replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>"
+        ),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
+
+
+def _zip_entry(zf: zipfile.ZipFile, name: str, data: str | bytes, day: int) -> None:
+    stamp = _EPOCH + timedelta(days=day)
+    info = zipfile.ZipInfo(name, date_time=stamp.timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    zf.writestr(info, data)
+
+
+def generate_canvas_export(
+    out_path: Path | str, *, pages: int, pdfs: int, seed: int = 0
+) -> Path:
+    """Write a Canvas ``.imscc`` export with ``pages`` wiki pages and ``pdfs`` PDFs.
+
+    Pages link to their successor and to one PDF through
+    ``$IMS-CC-FILEBASE$``, like real Canvas exports.
+    """
+    rng = random.Random(seed)
+    path = Path(out_path).with_suffix(".imscc")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    resources = []
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(pages):
+            href = f"wiki_content/page-{i}.html"
+            links = []
+            if i + 1 < pages:
+                links.append(f'<a href="$WIKI_REFERENCE$/pages/page-{i + 1}">Next</a>')
+            if pdfs:
+                links.append(
+                    f'<a href="$IMS-CC-FILEBASE$/files/notes-{i % pdfs}.pdf">Notes</a>'
+                )
+            body = "".join(f"<p>{p}</p>" for p in _paragraphs(rng, rng.randint(2, 8)))
+            html = (
+                f"<html><head><title>Week {i // 3 + 1} page {i}</title></head>"
+                f"<body><h1>Week {i // 3 + 1}</h1>{body}{''.join(links)}</body></html>"
+            )
+            _zip_entry(zf, href, html, day=i)
+            resources.append(
+                f'<resource identifier="page{i}" type="webcontent" href="{href}">'
+                f'<file href="{href}"/></resource>'
+            )
+        for i in range(pdfs):
+            href = f"web_resources/files/notes-{i}.pdf"
+            lines = [s for p in _paragraphs(rng, 4) for s in p.split(". ")]
+            _zip_entry(zf, href, _pdf_bytes(lines[:40]), day=i)
+            resources.append(
+                f'<resource identifier="file{i}" type="webcontent" href="{href}">'
+                f'<file href="{href}"/></resource>'
+            )
+        manifest = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<manifest identifier="synthetic" '
+            'xmlns="http://www.imsglobal.org/xsd/imscc/imscp_v1p1">'
+            f"<organizations/><resources>{''.join(resources)}</resources></manifest>\n"
+        )
+        _zip_entry(zf, "imsmanifest.xml", manifest, day=0)
+    return path
+
+
+def generate_piazza_export(out_path: Path | str, *, posts: int, seed: int = 0) -> Path:
+    """Write a Piazza ``.zip`` export containing ``posts`` posts."""
+    rng = random.Random(seed + 1)
+    path = Path(out_path).with_suffix(".zip")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = []
+    for i in range(posts):
+        created = _EPOCH + timedelta(hours=7 * i)
+        subject = f"{rng.choice(TOPICS).title()} question about HW{rng.randint(1, 12)}"
+        content.append(
+            {
+                "id": f"p{i}",
+                "nr": i + 1,
+                "subject": subject,
+                "content": "".join(f"<p>{p}</p>" for p in _paragraphs(rng, 2)),
+                "type": "question" if i % 3 else "note",
+                "created": created.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "thread_id": f"p{i - i % 4}",
+            }
+        )
+    config = {"course_number": "SYN101", "name": "synthetic"}
+    with zipfile.ZipFile(path, "w") as zf:
+        _zip_entry(zf, "config.json", json.dumps(config), day=0)
+        _zip_entry(zf, "class_content_flat.json", json.dumps(content), day=1)
+    return path
+
+
+def generate_course(
+    out_dir: Path | str, *, pages: int, pdfs: int, posts: int, seed: int = 0
+) -> tuple[Path, Path]:
+    """Write a matching Canvas and Piazza export pair into ``out_dir``."""
+    out = Path(out_dir)
+    canvas = generate_canvas_export(out / "canvas", pages=pages, pdfs=pdfs, seed=seed)
+    piazza = generate_piazza_export(out / "piazza", posts=posts, seed=seed)
+    return canvas, piazza
+
+
+def sample_queries(count: int, *, seed: int = 0) -> list[str]:
+    """Return ``count`` queries drawn from the generator's vocabulary."""
+    rng = random.Random(seed + 2)
+    return [
+        f"{rng.choice(TOPICS)} {rng.choice(FILLER)} HW{rng.randint(1, 12)}"
+        for _ in range(count)
+    ]
@@ -2,11 +2,26 @@
 This module provides a unified interface for various data loaders used for education
 """
 
-# Re-export the loaders for easier access
-from rag_ed.loaders.canvas import CanvasLoader
-from rag_ed.loaders.canvas_api import CanvasAPILoader
-from rag_ed.loaders.piazza import PiazzaLoader
-from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from rag_ed.loaders.canvas import CanvasLoader
+    from rag_ed.loaders.canvas_api import CanvasAPILoader
+    from rag_ed.loaders.piazza import PiazzaLoader
+    from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+# Re-export the loaders for easier access. They pull in the Unstructured
+# loaders, ``requests`` and ``langchain_openai``, so each is imported on first
+# attribute access instead of with the package.
+_LAZY_EXPORTS = {
+    "CanvasLoader": "rag_ed.loaders.canvas",
+    "CanvasAPILoader": "rag_ed.loaders.canvas_api",
+    "PiazzaLoader": "rag_ed.loaders.piazza",
+    "VectorStoreRetriever": "rag_ed.retrievers.vectorstore",
+}
 
 __all__ = [
     "CanvasLoader",
@@ -14,3 +29,17 @@ __all__ = [
     "PiazzaLoader",
     "VectorStoreRetriever",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
@@ -3,20 +3,26 @@
 The agent decomposes a user's question into simpler sub-queries and retrieves
 relevant context for each step using :class:`~rag_ed.retrievers.vectorstore.VectorStoreRetriever`.
 All configuration is provided via environment variables so no file paths are
-hard coded in the source.
+hard coded in the source. :func:`refresh_retriever` rebuilds the index from the
+current exports without interrupting queries that are already running.
 """
 
 from __future__ import annotations
 
+import concurrent.futures
 import os
 import re
+import threading
 from typing import List
 
 import langchain_core.documents
 
+from rag_ed import tracing
+from rag_ed.retrievers.holder import IndexHolder
 from rag_ed.retrievers.vectorstore import VectorStoreRetriever
 
-_RETRIEVER: VectorStoreRetriever | None = None
+_RETRIEVER: IndexHolder[VectorStoreRetriever] | None = None
+_RETRIEVER_LOCK = threading.Lock()
 
 
 def _split_query(query: str) -> list[str]:
@@ -37,24 +43,57 @@ def _split_query(query: str) -> list[str]:
     return [p.strip() for p in parts if p.strip()]
 
 
-def _get_retriever() -> VectorStoreRetriever:
-    """Lazily construct the :class:`VectorStoreRetriever`.
+def _build_retriever() -> VectorStoreRetriever:
+    """Build a :class:`VectorStoreRetriever` from the configured exports.
 
-    The retriever is cached at module level. ``CANVAS_PATH`` and ``PIAZZA_PATH``
-    environment variables must be set to point to the course exports.
+    ``CANVAS_PATH`` and ``PIAZZA_PATH`` environment variables must be set to
+    point to the course exports.
     """
 
+    canvas_path = os.getenv("CANVAS_PATH")
+    piazza_path = os.getenv("PIAZZA_PATH")
+    if not canvas_path or not piazza_path:
+        msg = "Environment variables CANVAS_PATH and PIAZZA_PATH must be set"
+        raise RuntimeError(msg)
+    return VectorStoreRetriever(canvas_path, piazza_path, vector_store_type="in_memory")
+
+
+def _holder() -> IndexHolder[VectorStoreRetriever]:
+    """Return the module-level index holder, creating it on first use."""
+
     global _RETRIEVER
-    if _RETRIEVER is None:
-        canvas_path = os.getenv("CANVAS_PATH")
-        piazza_path = os.getenv("PIAZZA_PATH")
-        if not canvas_path or not piazza_path:
-            msg = "Environment variables CANVAS_PATH and PIAZZA_PATH must be set"
-            raise RuntimeError(msg)
-        _RETRIEVER = VectorStoreRetriever(
-            canvas_path, piazza_path, vector_store_type="in_memory"
-        )
-    return _RETRIEVER
+    with _RETRIEVER_LOCK:
+        if _RETRIEVER is None:
+            _RETRIEVER = IndexHolder(_build_retriever)
+        return _RETRIEVER
+
+
+def _get_retriever() -> IndexHolder[VectorStoreRetriever]:
+    """Return the index holder, building the first index if needed.
+
+    Concurrent first callers share a single build.
+    """
+
+    holder = _holder()
+    if not holder.ready:
+        holder.refresh_async().result()
+    return holder
+
+
+def refresh_retriever() -> concurrent.futures.Future[int]:
+    """Rebuild the retriever from the current exports in the background.
+
+    Queries keep running against the previous index until the new one is
+    swapped in; the previous index is released once they finish.
+
+    Returns
+    -------
+    concurrent.futures.Future[int]
+        Resolves to the new index version, or raises the build error while
+        the previous index stays in service.
+    """
+
+    return _holder().refresh_async()
 
 
 def run_agent(query: str) -> str:
@@ -68,10 +107,15 @@ def run_agent(query: str) -> str:
     'Sub-query: topic one\n...'
     """
 
-    retriever = _get_retriever()
     responses: List[str] = []
-    for sub_query in _split_query(query):
-        docs: list[langchain_core.documents.Document] = retriever.retrieve(sub_query, 5)
-        docs_text = "\n".join(doc.page_content for doc in docs)
-        responses.append(f"Sub-query: {sub_query}\n{docs_text}")
+    sub_queries = _split_query(query)
+    span = tracing.span("agent", agent="self_querying", sub_queries=len(sub_queries))
+    # One lease per question, so every sub-query sees the same version.
+    with span, _get_retriever().lease() as retriever:
+        for sub_query in sub_queries:
+            docs: list[langchain_core.documents.Document] = retriever.retrieve(
+                sub_query, 5
+            )
+            docs_text = "\n".join(doc.page_content for doc in docs)
+            responses.append(f"Sub-query: {sub_query}\n{docs_text}")
     return "\n\n".join(responses)
@@ -0,0 +1,477 @@
+"""Long-lived retrieval server for ``vanilla-rag``.
+
+``vanilla-rag serve`` builds (or loads) the index once and answers queries over
+local HTTP or a Unix domain socket, so query latency depends on search time
+rather than on re-parsing and re-embedding the course exports. Requests are
+handled concurrently on a thread per connection.
+
+Endpoints
+---------
+``GET /health``
+    Liveness probe; always ``200`` with ``{"status": "ok", "ready": bool}``,
+    plus the index ``"version"`` and whether it is ``"reloading"`` once ready.
+``GET /ready``
+    Readiness probe; ``200`` once the index is loaded, ``503`` before.
+``POST /query``
+    Body ``{"query": str, "pass_through": bool, "k": int, "filter": dict,
+    "trace": bool}``. Returns ``{"answer": str}`` plus ``"documents"`` in
+    pass-through mode and per-stage ``"timings"`` when ``trace`` is set.
+``POST /reload``
+    Rebuilds the index in the background and swaps it in without dropping
+    queries; ``202`` with the ``"version"`` currently in service. ``SIGHUP``
+    does the same.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import http.client
+import http.server
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import threading
+import urllib.parse
+from typing import TYPE_CHECKING, Any, Callable
+
+from rag_ed import tracing
+from rag_ed.retrievers.holder import IndexHolder
+
+if TYPE_CHECKING:
+    from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class RetrievalService:
+    """Hold a warm retriever and answer queries against it.
+
+    The retriever lives in an :class:`~rag_ed.retrievers.holder.IndexHolder`,
+    so :meth:`reload` can rebuild it in the background and swap it in while
+    queries keep being answered; each query finishes on the version it
+    started with.
+
+    Parameters
+    ----------
+    build_retriever : Callable[[], VectorStoreRetriever]
+        Factory invoked in a background thread to load or build the index,
+        once on start-up and again on every reload.
+    """
+
+    def __init__(self, build_retriever: Callable[[], VectorStoreRetriever]) -> None:
+        self._holder: IndexHolder[VectorStoreRetriever] = IndexHolder(build_retriever)
+        self._ready = threading.Event()
+        self.error: Exception | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether the index has finished loading."""
+        return self._ready.is_set()
+
+    @property
+    def version(self) -> int:
+        """Version of the index in service; ``0`` before the first load."""
+        return self._holder.version
+
+    def load(self) -> None:
+        """Build the retriever; errors are kept and reported by ``/health``."""
+        try:
+            self._holder.refresh()
+        except Exception as exc:  # noqa: BLE001 - reported by /health
+            self.error = exc
+            return
+        self.error = None
+        self._ready.set()
+
+    def start(self) -> threading.Thread:
+        """Load the index in a daemon thread so probes answer immediately."""
+        thread = threading.Thread(target=self.load, name="rag-ed-load", daemon=True)
+        thread.start()
+        return thread
+
+    def reload(self) -> concurrent.futures.Future[int]:
+        """Rebuild the index in the background and swap it in when done.
+
+        Queries keep being answered by the current version meanwhile. A
+        failed rebuild leaves it in service and is reported by ``/health``.
+        """
+        future = self._holder.refresh_async()
+        future.add_done_callback(self._reloaded)
+        return future
+
+    def _reloaded(self, future: concurrent.futures.Future[int]) -> None:
+        if future.exception() is None and not self.ready:
+            self.error = None
+            self._ready.set()
+
+    def health(self) -> dict[str, Any]:
+        """Return the payload of the ``/health`` endpoint."""
+        payload: dict[str, Any] = {"status": "ok", "ready": self.ready}
+        if self.ready:
+            payload["version"] = self.version
+            payload["reloading"] = self._holder.refreshing
+            if self._holder.error is not None:
+                payload["reload_error"] = repr(self._holder.error)
+        if self.error is not None:
+            payload["status"] = "error"
+            payload["error"] = repr(self.error)
+        return payload
+
+    def query(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Answer one ``/query`` request body.
+
+        With ``"trace": true`` in the body the response also carries
+        ``"timings"``, the seconds spent in each traced stage of this request.
+        """
+        query = payload.get("query")
+        if not isinstance(query, str) or not query:
+            msg = "'query' must be a non-empty string"
+            raise ValueError(msg)
+        if not payload.get("trace", False):
+            return self._answer(query, payload)
+        with tracing.collect() as spans:
+            response = self._answer(query, payload)
+        response["timings"] = tracing.breakdown(spans)
+        return response
+
+    def _answer(self, query: str, payload: dict[str, Any]) -> dict[str, Any]:
+        from rag_ed.agents.vanilla_rag import answer_query
+
+        pass_through = bool(payload.get("pass_through", False))
+        request = tracing.span("request", pass_through=pass_through)
+        with request as span, self._holder.lease() as retriever:
+            span.set(version=self._holder.version)
+            k, filter = payload.get("k"), payload.get("filter")
+            if not pass_through:
+                return {"answer": answer_query(retriever, query, k=k, filter=filter)}
+            docs = retriever.retrieve(query, k, filter=filter)
+        return {
+            "answer": "\n".join(doc.page_content for doc in docs),
+            "documents": [
+                {"page_content": doc.page_content, "metadata": doc.metadata}
+                for doc in docs
+            ],
+        }
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: _HTTPServer | _UnixHTTPServer  # type: ignore[assignment]
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, service.health())
+        elif self.path == "/ready":
+            self._send(200 if service.ready else 503, {"ready": service.ready})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        if self.path == "/reload":
+            service.reload()
+            self._send(202, {"version": service.version, "reloading": True})
+            return
+        if self.path != "/query":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        if not service.ready:
+            self._send(503, {"error": "index is loading"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                self._send(400, {"error": "request body must be a JSON object"})
+                return
+            self._send(200, service.query(payload))
+        except (ValueError, TypeError) as exc:
+            self._send(400, {"error": str(exc)})
+        except Exception as exc:  # noqa: BLE001 - answered as a 500
+            self._send(500, {"error": repr(exc)})
+
+    def _send(self, status: int, payload: dict[str, Any]) -> None:
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if os.environ.get("RAG_ED_SERVER_LOG"):
+            super().log_message(format, *args)
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    def __init__(self, address: tuple[str, int], service: RetrievalService) -> None:
+        self.service = service
+        super().__init__(address, _Handler)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, service: RetrievalService) -> None:
+        self.service = service
+        if _is_socket(path):
+            os.unlink(path)  # left behind by a previous server
+        elif os.path.lexists(path):
+            msg = f"{path} exists and is not a socket"
+            raise FileExistsError(msg)
+        super().__init__(path, _Handler)
+
+    def get_request(self) -> tuple[socket.socket, Any]:
+        # Unix socket peers have no (host, port) address for request logging.
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def _is_socket(path: str) -> bool:
+    """Return whether ``path`` itself, not a symlink target, is a socket."""
+    try:
+        return stat.S_ISSOCK(os.lstat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def make_server(
+    service: RetrievalService,
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+) -> socketserver.BaseServer:
+    """Create a threaded HTTP server for ``service``.
+
+    The server listens on ``socket_path`` when given, otherwise on
+    ``host:port``. Call ``serve_forever()`` on the result to start serving.
+    A socket left at ``socket_path`` by a previous server is replaced.
+
+    Raises
+    ------
+    FileExistsError
+        If ``socket_path`` exists and is not a socket.
+    """
+    if socket_path is not None:
+        return _UnixHTTPServer(socket_path, service)
+    return _HTTPServer((host, port), service)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class RetrievalClient:
+    """Thin client for a running ``vanilla-rag serve`` instance.
+
+    Parameters
+    ----------
+    address : str
+        ``http://host:port`` or ``unix:///path/to/socket``.
+    timeout : float, optional
+        Socket timeout in seconds. Defaults to ``300`` to leave room for LLM
+        answers.
+
+    Examples
+    --------
+    >>> client = RetrievalClient("http://127.0.0.1:8765")
+    >>> client.query("When is the midterm?", pass_through=True)  # doctest: +SKIP
+    {'answer': '...', 'documents': [...]}
+    """
+
+    def __init__(self, address: str, *, timeout: float = 300.0) -> None:
+        parsed = urllib.parse.urlparse(address)
+        if parsed.scheme not in ("http", "unix"):
+            msg = f"Unsupported server address '{address}'"
+            raise ValueError(msg)
+        self._parsed = parsed
+        self._timeout = timeout
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._parsed.scheme == "unix":
+            return _UnixHTTPConnection(self._parsed.path, self._timeout)
+        return http.client.HTTPConnection(
+            self._parsed.hostname or DEFAULT_HOST,
+            self._parsed.port or DEFAULT_PORT,
+            timeout=self._timeout,
+        )
+
+    def _request(
+        self, method: str, path: str, payload: dict[str, Any] | None = None
+    ) -> tuple[int, dict[str, Any]]:
+        connection = self._connection()
+        try:
+            body = None if payload is None else json.dumps(payload)
+            headers = {"Content-Type": "application/json"} if body else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read() or b"{}")
+        finally:
+            connection.close()
+
+    def health(self) -> dict[str, Any]:
+        """Return the server's ``/health`` payload."""
+        return self._request("GET", "/health")[1]
+
+    def ready(self) -> bool:
+        """Return whether the server has finished loading its index."""
+        return self._request("GET", "/ready")[0] == 200
+
+    def reload(self) -> dict[str, Any]:
+        """Ask the server to rebuild its index in the background."""
+        return self._request("POST", "/reload")[1]
+
+    def query(
+        self,
+        query: str,
+        *,
+        pass_through: bool = False,
+        k: int | None = None,
+        filter: dict[str, Any] | None = None,
+        trace: bool = False,
+    ) -> dict[str, Any]:
+        """Send ``query`` to the server and return its JSON response.
+
+        With ``trace=True`` the response includes per-stage ``"timings"``.
+
+        Raises
+        ------
+        RuntimeError
+            If the server answers with an error status.
+        """
+        payload: dict[str, Any] = {"query": query, "pass_through": pass_through}
+        if k is not None:
+            payload["k"] = k
+        if filter is not None:
+            payload["filter"] = filter
+        if trace:
+            payload["trace"] = True
+        status, body = self._request("POST", "/query", payload)
+        if status != 200:
+            msg = f"Server returned {status}: {body.get('error', '')}"
+            raise RuntimeError(msg)
+        return body
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for ``vanilla-rag serve``."""
+    from rag_ed.agents.vanilla_rag import build_retriever
+    from rag_ed.embeddings import PassThroughEmbeddings
+
+    parser = argparse.ArgumentParser(
+        prog="vanilla-rag serve", description="Serve retrieval over HTTP"
+    )
+    parser.add_argument("--canvas", help="Path to Canvas .imscc file")
+    parser.add_argument("--piazza", help="Path to Piazza export .zip")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port")
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of TCP")
+    parser.add_argument(
+        "--pass-through",
+        action="store_true",
+        help="Use offline pass-through embeddings.",
+    )
+    parser.add_argument(
+        "--vector-store",
+        choices=["in_memory", "faiss", "chroma"],
+        default="in_memory",
+        help="Vector store backend.",
+    )
+    parser.add_argument(
+        "--persist-directory",
+        help="Load the index from, or save it to, this directory.",
+    )
+    parser.add_argument(
+        "--retrieval-mode",
+        choices=["vector", "hybrid", "bm25"],
+        default="vector",
+        help="Ranking strategy.",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Open the index from this snapshot file, writing it first if missing.",
+    )
+    parser.add_argument(
+        "--trace",
+        help="Append a span for every traced stage to this file.",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=["json", "otlp"],
+        default="json",
+        help="One JSON object per span, or OTLP/JSON traces for OpenTelemetry.",
+    )
+    args = parser.parse_args(argv)
+    have_snapshot = bool(args.snapshot) and os.path.exists(args.snapshot)
+    if not have_snapshot and not (args.canvas and args.piazza):
+        parser.error(
+            "--canvas and --piazza are required without an existing --snapshot"
+        )
+
+    initial = True
+
+    def build() -> VectorStoreRetriever:
+        # Reloads rebuild from the exports when given, else reopen the snapshot.
+        nonlocal initial
+        from_snapshot = have_snapshot if initial else not (args.canvas and args.piazza)
+        initial = False
+        embeddings = PassThroughEmbeddings() if args.pass_through else None
+        if from_snapshot:
+            from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+            return VectorStoreRetriever.from_snapshot(
+                args.snapshot, embeddings=embeddings
+            )
+        retriever = build_retriever(
+            canvas_path=args.canvas,
+            piazza_path=args.piazza,
+            embeddings=embeddings,
+            vector_store_type=args.vector_store,
+            persist_directory=args.persist_directory,
+            retrieval_mode=args.retrieval_mode,
+        )
+        if args.snapshot:
+            retriever.save_snapshot(args.snapshot)
+        return retriever
+
+    if args.trace:
+        exporter = (
+            tracing.OTLPJSONExporter(args.trace)
+            if args.trace_format == "otlp"
+            else tracing.JSONLinesExporter(args.trace)
+        )
+        tracing.set_tracer(tracing.Tracer(exporter))
+    service = RetrievalService(build)
+    service.start()
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: service.reload())
+    server = make_server(
+        service, host=args.host, port=args.port, socket_path=args.socket
+    )
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"vanilla-rag serving on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        tracer = tracing.set_tracer(None)
+        if tracer is not None:
+            tracer.close()
+        if args.socket and _is_socket(args.socket):
+            os.unlink(args.socket)
@@ -5,14 +5,44 @@ to perform a single retrieval and answer a query. File paths are supplied by the
 caller; no paths are hard coded within the module.
 """
 
+from __future__ import annotations
+
 import argparse
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any
+
+from rag_ed import tracing
+
+if TYPE_CHECKING:
+    import langchain_core.embeddings
+
+    from rag_ed.retrievers.metadata import MetadataFilter
+    from rag_ed.retrievers.vectorstore import VectorStoreRetriever
 
-import langchain_core.embeddings
-from langchain.chains import RetrievalQA
-from langchain.llms import OpenAI
+# Heavy dependencies are imported on first use so that ``vanilla-rag --help``
+# and ``--pass-through`` runs never load the LLM stack.
+_LAZY_IMPORTS = {
+    "OpenAI": "langchain.llms",
+    "PassThroughEmbeddings": "rag_ed.embeddings",
+    "VectorStoreRetriever": "rag_ed.retrievers.vectorstore",
+    "load_qa_chain": "langchain.chains.question_answering",
+}
 
-from rag_ed.embeddings import PassThroughEmbeddings
-from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str) -> Any:
+    """Return the module global ``name``, importing it on first use."""
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
 def one_step_retrieval(
@@ -47,37 +77,102 @@ def one_step_retrieval(
         when ``pass_through`` is ``True``.
     """
 
-    retriever = VectorStoreRetriever(
+    with tracing.span("agent", agent="one_step"):
+        retriever = build_retriever(
+            canvas_path=canvas_path, piazza_path=piazza_path, embeddings=embeddings
+        )
+        return answer_query(retriever, query, pass_through=pass_through)
+
+
+def build_retriever(
+    *,
+    canvas_path: str,
+    piazza_path: str,
+    embeddings: langchain_core.embeddings.Embeddings | None = None,
+    **retriever_kwargs: Any,
+) -> VectorStoreRetriever:
+    """Build the retriever used by :func:`one_step_retrieval`.
+
+    ``retriever_kwargs`` are forwarded to :class:`VectorStoreRetriever`; the
+    vector store defaults to ``"in_memory"``.
+    """
+    retriever_kwargs.setdefault("vector_store_type", "in_memory")
+    return _lazy("VectorStoreRetriever")(
         canvas_path=canvas_path,
         piazza_path=piazza_path,
-        vector_store_type="in_memory",
         embeddings=embeddings,
+        **retriever_kwargs,
     )
+
+
+def answer_query(
+    retriever: VectorStoreRetriever,
+    query: str,
+    *,
+    pass_through: bool = False,
+    k: int | None = None,
+    filter: MetadataFilter | None = None,
+) -> str:
+    """Answer ``query`` with an already built ``retriever``.
+
+    Returns the concatenated retrieved documents when ``pass_through`` is
+    ``True`` and the language model's answer otherwise. Either way the
+    documents come from :meth:`VectorStoreRetriever.retrieve`, so ``k``,
+    ``filter``, the retrieval mode and any reranker apply.
+    """
+    docs = retriever.retrieve(query, k, filter=filter)
     if pass_through:
-        docs = retriever.retrieve(query)
         return "\n".join(doc.page_content for doc in docs)
-    qa = RetrievalQA.from_chain_type(
-        llm=OpenAI(temperature=0.7, model_name="gpt-4o-mini"),
+    chain = _lazy("load_qa_chain")(
+        _lazy("OpenAI")(temperature=0.7, model_name="gpt-4o-mini"),
         chain_type="stuff",
-        retriever=retriever.vector_store,
     )
-    return qa.run(query)
+    with tracing.span("llm", model="gpt-4o-mini"):
+        result = chain.invoke({"input_documents": docs, "question": query})
+    return result[chain.output_key]
 
 
-def main() -> None:
-    """CLI entry point for one-step retrieval."""
+def main(argv: list[str] | None = None) -> None:
+    """CLI entry point for one-step retrieval.
+
+    ``vanilla-rag serve ...`` starts a long-lived retrieval server instead; see
+    :mod:`rag_ed.agents.server`.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        from rag_ed.agents import server
+
+        server.main(argv[1:])
+        return
+
     parser = argparse.ArgumentParser(description="Run one-step retrieval")
     parser.add_argument("query", help="Query string")
-    parser.add_argument("--canvas", required=True, help="Path to Canvas .imscc file")
-    parser.add_argument("--piazza", required=True, help="Path to Piazza export .zip")
+    parser.add_argument("--canvas", help="Path to Canvas .imscc file")
+    parser.add_argument("--piazza", help="Path to Piazza export .zip")
     parser.add_argument(
         "--pass-through",
         action="store_true",
         help="Return retrieved documents without calling the LLM.",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--server",
+        help=(
+            "Forward the query to a running 'vanilla-rag serve' instance, "
+            "e.g. http://127.0.0.1:8765 or unix:///tmp/rag-ed.sock."
+        ),
+    )
+    args = parser.parse_args(argv)
+
+    if args.server:
+        from rag_ed.agents.server import RetrievalClient
+
+        client = RetrievalClient(args.server)
+        print(client.query(args.query, pass_through=args.pass_through)["answer"])
+        return
+    if not args.canvas or not args.piazza:
+        parser.error("--canvas and --piazza are required unless --server is given")
 
-    embeddings = PassThroughEmbeddings() if args.pass_through else None
+    embeddings = _lazy("PassThroughEmbeddings")() if args.pass_through else None
     print(
         one_step_retrieval(
             args.query,
@@ -7,6 +7,7 @@ calls to external language model APIs and is suitable for offline tests.
 
 from __future__ import annotations
 
+import zlib
 from typing import List
 
 from langchain_core.embeddings import Embeddings
@@ -28,7 +29,9 @@ class PassThroughEmbeddings(Embeddings):
     def _embed(self, text: str) -> List[float]:
         vec = [0.0] * self._dim
         for token in text.lower().split():
-            idx = hash(token) % self._dim
+            # crc32 rather than ``hash`` keeps vectors stable across processes,
+            # so persisted indexes stay searchable after a restart.
+            idx = zlib.crc32(token.encode("utf-8")) % self._dim
             vec[idx] += 1.0
         return vec
 
@@ -1,6 +1,26 @@
 """Graph utilities for modeling relationships among course artifacts."""
 
 from .course import CourseGraph
-from .generation import graph_from_canvas, graph_from_piazza
+from .csr import CSRCourseGraph
+from .generation import (
+    CourseGraphBuilder,
+    graph_from_canvas,
+    graph_from_course,
+    graph_from_piazza,
+)
+from .links import link_references
+from .pagerank import PageRank
+from .similarity import link_similar, similarity_join
 
-__all__ = ["CourseGraph", "graph_from_canvas", "graph_from_piazza"]
+__all__ = [
+    "CSRCourseGraph",
+    "CourseGraph",
+    "CourseGraphBuilder",
+    "PageRank",
+    "graph_from_canvas",
+    "graph_from_course",
+    "graph_from_piazza",
+    "link_references",
+    "link_similar",
+    "similarity_join",
+]
@@ -2,9 +2,19 @@
 
 from __future__ import annotations
 
+import os
+from typing import Iterable, Union
+
 import networkx as nx
+import numpy as np
+import numpy.typing as npt
 import langchain_core.documents
 
+from .storage import load_graph, save_graph
+
+Edge = Union[tuple[str, str], tuple[str, str, float]]
+"""``(source_id, target_id)`` or ``(source_id, target_id, weight)``."""
+
 
 class CourseGraph:
     """Graph representing relationships among course artifacts.
@@ -12,6 +22,10 @@ class CourseGraph:
     Nodes store :class:`langchain_core.documents.Document` instances.
     Edges indicate relationships like references or sequencing.
 
+    :attr:`version` counts changes made through this class; edits made
+    directly on :attr:`graph` are not tracked, so caches keyed on it (such as
+    the integer view behind :attr:`adjacency`) would go stale.
+
     Examples
     --------
     >>> from langchain_core.documents import Document
@@ -26,16 +40,112 @@ class CourseGraph:
 
     def __init__(self) -> None:
         self._graph: nx.DiGraph = nx.DiGraph()
+        self._version = 0
+        self._arrays: _IntegerView | None = None
+
+    def __len__(self) -> int:
+        return self._graph.number_of_nodes()
+
+    def __contains__(self, artifact_id: object) -> bool:
+        return artifact_id in self._graph
 
     def add_artifact(
         self, artifact_id: str, document: langchain_core.documents.Document
     ) -> None:
         """Add a document to the graph."""
         self._graph.add_node(artifact_id, document=document)
+        self._version += 1
+
+    def add_artifacts(
+        self,
+        artifacts: Iterable[tuple[str, langchain_core.documents.Document]],
+    ) -> None:
+        """Add ``(artifact_id, document)`` pairs in one call."""
+        self._graph.add_nodes_from(
+            (artifact_id, {"document": document}) for artifact_id, document in artifacts
+        )
+        self._version += 1
+
+    def add_relationship(
+        self, source_id: str, target_id: str, weight: float = 1.0
+    ) -> None:
+        """Create a directed edge between two artifacts.
 
-    def add_relationship(self, source_id: str, target_id: str) -> None:
-        """Create a directed edge between two artifacts."""
-        self._graph.add_edge(source_id, target_id)
+        ``weight`` is the edge strength used by ranked traversals, from ``0``
+        (unrelated) to ``1`` (default).
+        """
+        self._graph.add_edge(source_id, target_id, weight=weight)
+        self._version += 1
+
+    def add_relationships(self, edges: Iterable[Edge]) -> None:
+        """Create directed edges in one call.
+
+        Each edge is ``(source_id, target_id)`` or
+        ``(source_id, target_id, weight)``; the weight defaults to ``1``.
+        """
+        self._graph.add_edges_from(
+            (source, target, {"weight": rest[0] if rest else 1.0})
+            for source, target, *rest in edges
+        )
+        self._version += 1
+
+    def remove_relationships(self, edges: Iterable[tuple[str, str]]) -> None:
+        """Delete directed ``(source_id, target_id)`` edges; absent ones are skipped."""
+        self._graph.remove_edges_from(edges)
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """Counter increased by every change made through this class."""
+        return self._version
+
+    @property
+    def ids(self) -> list[str]:
+        """Artifact ids in insertion order; position is the integer id."""
+        return self._view().ids
+
+    @property
+    def documents(self) -> list[langchain_core.documents.Document]:
+        """Documents by integer id."""
+        return self._view().documents
+
+    @property
+    def adjacency(self) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]:
+        """CSR arrays ``(indptr, indices)`` over integer ids.
+
+        Built from the ``networkx`` graph on first use after a change; see
+        :class:`~rag_ed.graphs.CSRCourseGraph` for a backend that stores
+        them natively.
+        """
+        view = self._view()
+        return view.indptr, view.indices
+
+    @property
+    def weights(self) -> npt.NDArray[np.float32]:
+        """Edge weights aligned with ``adjacency[1]``."""
+        return self._view().weights
+
+    def index(self, artifact_id: str) -> int:
+        """Return the integer id of ``artifact_id``.
+
+        Raises
+        ------
+        ValueError
+            If ``artifact_id`` is absent from the graph.
+        """
+        try:
+            return self._view().index[artifact_id]
+        except KeyError:
+            msg = f"Artifact '{artifact_id}' not found in course graph"
+            raise ValueError(msg) from None
+
+    def document(self, artifact_id: str) -> langchain_core.documents.Document:
+        """Return the document stored for ``artifact_id``."""
+        return self._graph.nodes[artifact_id]["document"]
+
+    def successors(self, artifact_id: str) -> list[str]:
+        """Return the ids of artifacts ``artifact_id`` links to."""
+        return list(self._graph.successors(artifact_id))
 
     def neighbors(self, artifact_id: str) -> list[langchain_core.documents.Document]:
         """Return documents directly connected to ``artifact_id``."""
@@ -47,3 +157,70 @@ class CourseGraph:
     def graph(self) -> nx.DiGraph:
         """Access the underlying ``networkx`` graph."""
         return self._graph
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the graph to ``path`` for :meth:`load`.
+
+        The file holds CSR edge arrays and a table of document texts and
+        metadata behind a JSON header; nothing is pickled. Metadata values
+        that are not JSON types come back as strings, and edge attributes
+        other than ``weight`` are not kept.
+        """
+        view = self._view()
+        save_graph(
+            path, view.ids, view.documents, view.indptr, view.indices, view.weights
+        )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> CourseGraph:
+        """Read a graph written by :meth:`save` or :meth:`CSRCourseGraph.save`.
+
+        Every node and edge is copied into ``networkx``; open the file with
+        :meth:`CSRCourseGraph.load <rag_ed.graphs.CSRCourseGraph.load>` to
+        memory-map it instead.
+
+        Raises
+        ------
+        ValueError
+            If ``path`` is not a course graph file.
+        """
+        ids, documents, arrays = load_graph(path)
+        sources = np.repeat(np.arange(len(ids)), np.diff(arrays["indptr"]))
+        graph = cls()
+        graph.add_artifacts(zip(ids, documents))
+        graph.add_relationships(
+            (ids[s], ids[t], w)
+            for s, t, w in zip(
+                sources.tolist(),
+                arrays["indices"].tolist(),
+                arrays["weights"].tolist(),
+            )
+        )
+        return graph
+
+    def _view(self) -> _IntegerView:
+        view = self._arrays
+        if view is None or view.version != self._version:
+            view = self._arrays = _IntegerView(self._graph, self._version)
+        return view
+
+
+class _IntegerView:
+    """Integer ids and CSR adjacency of one :attr:`CourseGraph.version`."""
+
+    def __init__(self, graph: nx.DiGraph, version: int) -> None:
+        self.version = version
+        self.ids: list[str] = list(graph.nodes)
+        self.index = {artifact_id: i for i, artifact_id in enumerate(self.ids)}
+        self.documents = [graph.nodes[n].get("document") for n in self.ids]
+        self.indptr = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum([graph.out_degree(n) for n in self.ids], out=self.indptr[1:])
+        edges = [(t, attrs) for n in self.ids for t, attrs in graph.succ[n].items()]
+        self.indices = np.fromiter(
+            (self.index[t] for t, _ in edges), dtype=np.int32, count=len(edges)
+        )
+        self.weights = np.fromiter(
+            (attrs.get("weight", 1.0) for _, attrs in edges),
+            dtype=np.float32,
+            count=len(edges),
+        )
@@ -0,0 +1,306 @@
+"""Course artifact graph stored as compressed sparse row (CSR) arrays."""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, Union
+
+import langchain_core.documents
+import networkx as nx
+import numpy as np
+import numpy.typing as npt
+
+from .course import Edge
+from .storage import DocumentTable, load_graph, save_graph
+
+_Documents = Union[list[langchain_core.documents.Document], DocumentTable]
+
+
+class CSRCourseGraph:
+    """Compact drop-in alternative to :class:`~rag_ed.graphs.CourseGraph`.
+
+    Artifact ids are interned to consecutive integers, documents are kept in a
+    side table indexed by those integers, and edges are stored as two NumPy
+    arrays: ``indptr`` (one offset per artifact) and ``indices`` (targets of
+    every edge, grouped by source). Per edge this costs 4 bytes instead of the
+    nested dicts of :class:`networkx.DiGraph`, and neighbour lookups are array
+    slices.
+
+    New edges are buffered and merged into the arrays on the next lookup, so
+    build graphs with :meth:`add_artifacts` and :meth:`add_relationships`
+    before querying them. Duplicate edges are stored once and neighbours are
+    returned in the order their artifacts were added.
+
+    :meth:`save` writes the graph to a single file that :meth:`load` maps
+    back into memory without copying the edge arrays or parsing documents
+    until they are requested.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> from rag_ed.graphs import CSRCourseGraph
+    >>> graph = CSRCourseGraph()
+    >>> graph.add_artifacts([("a", Document(page_content="A")),
+    ...                      ("b", Document(page_content="B"))])
+    >>> graph.add_relationships([("a", "b")])
+    >>> [d.page_content for d in graph.neighbors("a")]
+    ['B']
+    >>> graph.adjacency
+    (array([0, 1, 1]), array([1], dtype=int32))
+    """
+
+    def __init__(self) -> None:
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._documents: _Documents = []
+        self._indptr: npt.NDArray[np.int64] = np.zeros(1, dtype=np.int64)
+        self._indices: npt.NDArray[np.int32] = np.zeros(0, dtype=np.int32)
+        self._weights: npt.NDArray[np.float32] = np.zeros(0, dtype=np.float32)
+        self._sources: list[npt.NDArray[np.int64]] = []
+        self._targets: list[npt.NDArray[np.int64]] = []
+        self._pending_weights: list[npt.NDArray[np.float32]] = []
+        self._networkx: nx.DiGraph | None = None
+        self._version = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, artifact_id: object) -> bool:
+        return artifact_id in self._index
+
+    def add_artifact(
+        self, artifact_id: str, document: langchain_core.documents.Document
+    ) -> None:
+        """Add a document to the graph, replacing the document of a known id."""
+        self.add_artifacts([(artifact_id, document)])
+
+    def add_artifacts(
+        self,
+        artifacts: Iterable[tuple[str, langchain_core.documents.Document]],
+    ) -> None:
+        """Add ``(artifact_id, document)`` pairs in one call."""
+        if isinstance(self._documents, DocumentTable):
+            self._documents = list(self._documents)
+        for artifact_id, document in artifacts:
+            index = self._index.get(artifact_id)
+            if index is None:
+                self._index[artifact_id] = len(self._ids)
+                self._ids.append(artifact_id)
+                self._documents.append(document)
+            else:
+                self._documents[index] = document
+        self._networkx = None
+        self._version += 1
+
+    def add_relationship(
+        self, source_id: str, target_id: str, weight: float = 1.0
+    ) -> None:
+        """Create a directed edge between two artifacts.
+
+        ``weight`` is the edge strength used by ranked traversals, from ``0``
+        (unrelated) to ``1`` (default).
+        """
+        self.add_relationships([(source_id, target_id, weight)])
+
+    def add_relationships(self, edges: Iterable[Edge]) -> None:
+        """Create directed edges in one call.
+
+        Each edge is ``(source_id, target_id)`` or
+        ``(source_id, target_id, weight)``; the weight defaults to ``1``.
+        Adding an existing edge again replaces its weight.
+
+        Raises
+        ------
+        ValueError
+            If an endpoint has not been added with :meth:`add_artifact`.
+        """
+        rows = [
+            (self.index(source), self.index(target), rest[0] if rest else 1.0)
+            for source, target, *rest in edges
+        ]
+        if not rows:
+            return
+        pairs = np.asarray([row[:2] for row in rows], dtype=np.int64)
+        self._sources.append(pairs[:, 0])
+        self._targets.append(pairs[:, 1])
+        self._pending_weights.append(
+            np.asarray([row[2] for row in rows], dtype=np.float32)
+        )
+        self._networkx = None
+        self._version += 1
+
+    def remove_relationships(self, edges: Iterable[tuple[str, str]]) -> None:
+        """Delete directed ``(source_id, target_id)`` edges; absent ones are skipped.
+
+        Buffered edges are merged first, so this rewrites the edge arrays once
+        per call; batch removals together.
+
+        Raises
+        ------
+        ValueError
+            If an endpoint is absent from the graph.
+        """
+        n = len(self._ids)
+        removed = np.fromiter(
+            (self.index(source) * n + self.index(target) for source, target in edges),
+            dtype=np.int64,
+        )
+        if not len(removed):
+            return
+        self._compact()
+        sources = np.repeat(np.arange(n, dtype=np.int64), np.diff(self._indptr))
+        keep = ~np.isin(sources * n + self._indices, removed)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources[keep], minlength=n), out=indptr[1:])
+        self._indptr = indptr
+        self._indices = self._indices[keep]
+        self._weights = self._weights[keep]
+        self._networkx = None
+        self._version += 1
+
+    def index(self, artifact_id: str) -> int:
+        """Return the integer id interned for ``artifact_id``.
+
+        Raises
+        ------
+        ValueError
+            If ``artifact_id`` is absent from the graph.
+        """
+        try:
+            return self._index[artifact_id]
+        except KeyError:
+            msg = f"Artifact '{artifact_id}' not found in course graph"
+            raise ValueError(msg) from None
+
+    @property
+    def version(self) -> int:
+        """Counter increased by every change to the graph."""
+        return self._version
+
+    @property
+    def ids(self) -> list[str]:
+        """Artifact ids by integer id. Do not modify."""
+        return self._ids
+
+    @property
+    def documents(self) -> _Documents:
+        """Documents by integer id. Do not modify."""
+        return self._documents
+
+    @property
+    def adjacency(self) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int32]]:
+        """CSR arrays ``(indptr, indices)`` of the edges.
+
+        The targets of artifact ``i`` are ``indices[indptr[i]:indptr[i + 1]]``.
+        """
+        self._compact()
+        return self._indptr, self._indices
+
+    @property
+    def weights(self) -> npt.NDArray[np.float32]:
+        """Edge weights aligned with ``adjacency[1]``."""
+        self._compact()
+        return self._weights
+
+    def document(self, artifact_id: str) -> langchain_core.documents.Document:
+        """Return the document stored for ``artifact_id``."""
+        return self._documents[self.index(artifact_id)]
+
+    def successors(self, artifact_id: str) -> list[str]:
+        """Return the ids of artifacts ``artifact_id`` links to."""
+        indptr, indices = self.adjacency
+        i = self.index(artifact_id)
+        return [self._ids[j] for j in indices[indptr[i] : indptr[i + 1]]]
+
+    def neighbors(self, artifact_id: str) -> list[langchain_core.documents.Document]:
+        """Return documents directly connected to ``artifact_id``."""
+        indptr, indices = self.adjacency
+        i = self.index(artifact_id)
+        return [self._documents[j] for j in indices[indptr[i] : indptr[i + 1]]]
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        """Return a ``networkx`` copy of the graph.
+
+        Provided for code written against
+        :attr:`CourseGraph.graph <rag_ed.graphs.CourseGraph.graph>`. Built on
+        first access and after every change, so prefer :attr:`adjacency` on
+        large graphs. Changes made to the copy are not reflected in this graph.
+        """
+        if self._networkx is None:
+            indptr, indices = self.adjacency
+            graph = nx.DiGraph()
+            graph.add_nodes_from(
+                (artifact_id, {"document": document})
+                for artifact_id, document in zip(self._ids, self._documents)
+            )
+            sources = np.repeat(np.arange(len(self._ids)), np.diff(indptr))
+            graph.add_edges_from(
+                (self._ids[s], self._ids[t], {"weight": w})
+                for s, t, w in zip(
+                    sources.tolist(), indices.tolist(), self._weights.tolist()
+                )
+            )
+            self._networkx = graph
+        return self._networkx
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the graph to ``path`` for :meth:`load`.
+
+        The file holds the edge arrays and a table of document texts and
+        metadata behind a JSON header; nothing is pickled. Metadata values
+        that are not JSON types come back as strings.
+        """
+        indptr, indices = self.adjacency
+        save_graph(path, self._ids, self._documents, indptr, indices, self._weights)
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> CSRCourseGraph:
+        """Open a graph written by :meth:`save` or :meth:`CourseGraph.save`.
+
+        The edge arrays are memory-mapped and documents are rebuilt on first
+        access, so opening costs little more than reading the artifact ids.
+
+        Raises
+        ------
+        ValueError
+            If ``path`` is not a course graph file.
+        """
+        ids, documents, arrays = load_graph(path)
+        graph = cls()
+        graph._ids = ids
+        graph._index = {artifact_id: i for i, artifact_id in enumerate(ids)}
+        graph._documents = documents
+        graph._indptr = arrays["indptr"]
+        graph._indices = arrays["indices"]
+        graph._weights = arrays["weights"]
+        return graph
+
+    def _compact(self) -> None:
+        """Merge buffered edges and artifacts added since into the arrays."""
+        n = len(self._ids)
+        if not self._sources:
+            if len(self._indptr) <= n:
+                self._indptr = np.pad(
+                    self._indptr, (0, n + 1 - len(self._indptr)), mode="edge"
+                )
+            return
+        existing = np.repeat(
+            np.arange(len(self._indptr) - 1, dtype=np.int64), np.diff(self._indptr)
+        )
+        sources = np.concatenate([existing, *self._sources])
+        targets = np.concatenate([self._indices.astype(np.int64), *self._targets])
+        weights = np.concatenate([self._weights, *self._pending_weights])
+        # One sort over ``source * n + target`` groups edges by source, orders
+        # each group by target and drops duplicates. Keys are reversed first
+        # so the first occurrence ``unique`` keeps is the latest edge added.
+        keys, last = np.unique((sources * n + targets)[::-1], return_index=True)
+        sources, targets = np.divmod(keys, n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        self._indptr = indptr
+        self._indices = targets.astype(np.int32)
+        self._weights = weights[::-1][last]
+        self._sources.clear()
+        self._targets.clear()
+        self._pending_weights.clear()
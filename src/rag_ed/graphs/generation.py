@@ -2,18 +2,168 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+import bisect
+import os
+from typing import Any, Callable, Iterable, Union
 
 from pathlib import Path
 from collections import defaultdict
 from itertools import pairwise
 
 import langchain_core.documents
+import langchain_core.embeddings
 
 from rag_ed.loaders.canvas import CanvasLoader
 from rag_ed.loaders.piazza import PiazzaLoader
 
 from .course import CourseGraph
+from .csr import CSRCourseGraph
+from .links import link_references
+from .similarity import link_similar
+from .storage import FORMAT_VERSION, archive_digest
+
+# Part of cache file names; bumped when generated graphs gain new edges so
+# graphs cached by older versions are rebuilt.
+_REVISION = 2
+
+Graph = Union[CourseGraph, CSRCourseGraph]
+_SortKey = tuple[Any, int]
+
+
+class CourseGraphBuilder:
+    """Link documents into a course graph as they arrive.
+
+    Documents are grouped by the normalized parent directory of
+    ``metadata['source']`` and chained within each group in ``metadata['timestamp']`` order, ties
+    keeping arrival order. Each group only keeps the sorted
+    ``(timestamp, sequence)`` keys of its members; node ids are
+    ``f"{prefix}_{sequence}"``, so they need not be stored.
+
+    :meth:`extend` consumes an iterator once: nodes are added in one call and
+    groups that were empty are sorted once and chained. Documents joining a
+    group that already has members are inserted by binary search, replacing
+    at most the one edge they split, so an append touches only its group.
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of generated node ids.
+    graph : CourseGraph or CSRCourseGraph, optional
+        Graph to add to. Defaults to a new :class:`CourseGraph`.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> builder = CourseGraphBuilder("piazza")
+    >>> builder.extend(
+    ...     Document(page_content=t, metadata={"source": "a/p", "timestamp": t})
+    ...     for t in ["2", "1"]
+    ... )
+    ['piazza_0', 'piazza_1']
+    >>> builder.add(
+    ...     Document(page_content="3", metadata={"source": "a/q", "timestamp": "3"})
+    ... )
+    'piazza_2'
+    >>> sorted(builder.graph.graph.edges)
+    [('piazza_0', 'piazza_2'), ('piazza_1', 'piazza_0')]
+    """
+
+    def __init__(self, prefix: str, graph: Graph | None = None) -> None:
+        self.prefix = prefix
+        self.graph: Graph = CourseGraph() if graph is None else graph
+        self._groups: dict[str, list[_SortKey]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @classmethod
+    def from_graph(cls, graph: Graph, *, prefix: str) -> CourseGraphBuilder:
+        """Resume building ``graph``, such as one read with ``load``.
+
+        Rebuilds the group state from the documents of a graph that was
+        produced by a builder with the same ``prefix``; no edges are changed.
+        """
+        builder = cls(prefix, graph)
+        groups: defaultdict[str, list[_SortKey]] = defaultdict(list)
+        for sequence, document in enumerate(graph.documents):
+            group, key = builder._key(document, sequence)
+            groups[group].append(key)
+        for keys in groups.values():
+            keys.sort()
+        builder._groups = dict(groups)
+        builder._count = len(graph)
+        return builder
+
+    def add(self, document: langchain_core.documents.Document) -> str:
+        """Add one document and link it into its group; return its node id."""
+        return self.extend([document])[0]
+
+    def extend(
+        self, documents: Iterable[langchain_core.documents.Document]
+    ) -> list[str]:
+        """Add ``documents`` in order and link them; return their node ids."""
+        artifacts: list[tuple[str, langchain_core.documents.Document]] = []
+        arrived: defaultdict[str, list[_SortKey]] = defaultdict(list)
+        for document in documents:
+            sequence = self._count + len(artifacts)
+            group, key = self._key(document, sequence)
+            artifacts.append((self._node(sequence), document))
+            arrived[group].append(key)
+        if not artifacts:
+            return []
+        self.graph.add_artifacts(artifacts)
+        self._count += len(artifacts)
+
+        added: dict[tuple[str, str], None] = {}
+        removed: list[tuple[str, str]] = []
+        for group, keys in arrived.items():
+            members = self._groups.get(group)
+            if members is None:
+                keys.sort()
+                self._groups[group] = keys
+                added.update(
+                    ((self._node(a[1]), self._node(b[1])), None)
+                    for a, b in pairwise(keys)
+                )
+                continue
+            for key in keys:
+                position = bisect.bisect(members, key)
+                node = self._node(key[1])
+                before = self._node(members[position - 1][1]) if position else None
+                after = (
+                    self._node(members[position][1])
+                    if position < len(members)
+                    else None
+                )
+                members.insert(position, key)
+                if before is not None and after is not None:
+                    split = (before, after)
+                    if split in added:
+                        del added[split]
+                    else:
+                        removed.append(split)
+                if before is not None:
+                    added[before, node] = None
+                if after is not None:
+                    added[node, after] = None
+        if removed:
+            self.graph.remove_relationships(removed)
+        self.graph.add_relationships(added)
+        return [artifact_id for artifact_id, _ in artifacts]
+
+    def _node(self, sequence: int) -> str:
+        return f"{self.prefix}_{sequence}"
+
+    @staticmethod
+    def _key(
+        document: langchain_core.documents.Document, sequence: int
+    ) -> tuple[str, _SortKey]:
+        metadata = document.metadata
+        # ``os.path`` on the string is several times cheaper than ``Path``.
+        source = os.path.normpath(metadata.get("source", "."))
+        group = os.path.dirname(source) or "."
+        return group, (metadata.get("timestamp", ""), sequence)
 
 
 def _graph_from_documents(
@@ -25,12 +175,12 @@ def _graph_from_documents(
     loader groups documents by their source directory (from ``metadata['source']``)
     and links them in chronological order using the ``timestamp`` metadata. This
     preserves basic structural and temporal relationships among related
-    artifacts.
+    artifacts. See :class:`CourseGraphBuilder`.
 
     Parameters
     ----------
     documents : Iterable[Document]
-        Documents to add as graph nodes.
+        Documents to add as graph nodes, consumed once.
     prefix : str
         Prefix used when generating node identifiers.
 
@@ -41,36 +191,70 @@ def _graph_from_documents(
         groupings and timestamp ordering.
     """
     graph = CourseGraph()
-    node_ids: list[str] = []
-    for idx, doc in enumerate(documents):
-        node_id = f"{prefix}_{idx}"
-        graph.add_artifact(node_id, doc)
-        node_ids.append(node_id)
-
-    # Group nodes by parent directory of their source path.
-    grouped: dict[Path, list[str]] = defaultdict(list)
-    for node_id in node_ids:
-        doc = graph.graph.nodes[node_id]["document"]
-        source = Path(doc.metadata.get("source", "."))
-        grouped[source.parent].append(node_id)
-
-    # Within each directory group, link documents by increasing timestamp.
-    for nodes in grouped.values():
-        sorted_nodes = sorted(
-            nodes,
-            key=lambda n: graph.graph.nodes[n]["document"].metadata.get(
-                "timestamp", ""
-            ),
-        )
-        for src, dst in pairwise(sorted_nodes):
-            graph.add_relationship(src, dst)
+    CourseGraphBuilder(prefix, graph).extend(documents)
+    return graph
+
+
+def _add_canvas(graph: CourseGraph, canvas_path: str) -> list[str]:
+    """Add a Canvas export's artifacts with chain and reference edges."""
+    artifact_ids = CourseGraphBuilder("canvas", graph).extend(
+        CanvasLoader(canvas_path).lazy_load()
+    )
+    link_references(graph, artifact_ids)
+    return artifact_ids
+
+
+def _canvas_graph(canvas_path: str) -> CourseGraph:
+    graph = CourseGraph()
+    _add_canvas(graph, canvas_path)
+    return graph
 
+
+def _cached_graph(
+    path: str,
+    cache_dir: str | os.PathLike[str] | None,
+    *,
+    prefix: str,
+    build: Callable[[], CourseGraph],
+) -> CourseGraph:
+    """Build the graph of ``path`` once and reuse it from ``cache_dir``.
+
+    Cache files are named after the SHA-256 of the archive, so a changed
+    export is parsed again while an unchanged one, even when moved or
+    renamed, is read back with :meth:`CourseGraph.load`.
+    """
+    if cache_dir is None:
+        return build()
+    cached = Path(cache_dir) / (
+        f"{prefix}-{archive_digest(path)[:32]}-v{FORMAT_VERSION}.{_REVISION}.graph"
+    )
+    if cached.exists():
+        return CourseGraph.load(cached)
+    graph = build()
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    graph.save(cached)
     return graph
 
 
-def graph_from_canvas(canvas_path: str) -> CourseGraph:
+def graph_from_canvas(
+    canvas_path: str, *, cache_dir: str | os.PathLike[str] | None = None
+) -> CourseGraph:
     """Create a graph from a Canvas export.
 
+    Besides the chronological chains of :class:`CourseGraphBuilder`, every
+    link from a page to another artifact of the export, such as an
+    ``$IMS-CC-FILEBASE$`` file or a ``$WIKI_REFERENCE$`` page, becomes an
+    edge; see :func:`~rag_ed.graphs.links.link_references`.
+
+    Parameters
+    ----------
+    canvas_path : str
+        Path to the ``.imscc`` export.
+    cache_dir : str or os.PathLike, optional
+        Directory of saved graphs keyed by the export's SHA-256. When the
+        export was seen before its graph is loaded from there instead of
+        parsing the archive again.
+
     Examples
     --------
     >>> from rag_ed.graphs import graph_from_canvas
@@ -78,13 +262,27 @@ def graph_from_canvas(canvas_path: str) -> CourseGraph:
     >>> list(graph.graph.nodes)  # doctest: +SKIP
     ['canvas_0', 'canvas_1']
     """
-    documents = CanvasLoader(canvas_path).load()
-    return _graph_from_documents(documents, prefix="canvas")
+    return _cached_graph(
+        canvas_path,
+        cache_dir,
+        prefix="canvas",
+        build=lambda: _canvas_graph(canvas_path),
+    )
 
 
-def graph_from_piazza(piazza_path: str) -> CourseGraph:
+def graph_from_piazza(
+    piazza_path: str, *, cache_dir: str | os.PathLike[str] | None = None
+) -> CourseGraph:
     """Create a graph from a Piazza export.
 
+    Parameters
+    ----------
+    piazza_path : str
+        Path to the Piazza ``.zip`` export.
+    cache_dir : str or os.PathLike, optional
+        Directory of saved graphs keyed by the export's SHA-256, as in
+        :func:`graph_from_canvas`.
+
     Examples
     --------
     >>> from rag_ed.graphs import graph_from_piazza
@@ -92,5 +290,61 @@ def graph_from_piazza(piazza_path: str) -> CourseGraph:
     >>> list(graph.graph.nodes)  # doctest: +SKIP
     ['piazza_0', 'piazza_1', 'piazza_2']
     """
-    documents = PiazzaLoader(piazza_path).load()
-    return _graph_from_documents(documents, prefix="piazza")
+    return _cached_graph(
+        piazza_path,
+        cache_dir,
+        prefix="piazza",
+        build=lambda: _graph_from_documents(
+            PiazzaLoader(piazza_path).lazy_load(), prefix="piazza"
+        ),
+    )
+
+
+def graph_from_course(
+    canvas_path: str,
+    piazza_path: str,
+    embeddings: langchain_core.embeddings.Embeddings,
+    *,
+    k: int = 3,
+    threshold: float = 0.5,
+    max_degree: int | None = 5,
+) -> CourseGraph:
+    """Create one graph from a Canvas and a Piazza export of a course.
+
+    Each export is linked as in :func:`graph_from_canvas` and
+    :func:`graph_from_piazza`; Canvas and Piazza artifacts are then joined
+    by weighted similarity edges with
+    :func:`~rag_ed.graphs.similarity.link_similar`.
+
+    Parameters
+    ----------
+    canvas_path, piazza_path : str
+        Paths to the two exports.
+    embeddings : Embeddings
+        Model embedding every artifact once.
+    k, threshold, max_degree
+        Similarity join settings; see
+        :func:`~rag_ed.graphs.similarity.similarity_join`.
+
+    Examples
+    --------
+    >>> from rag_ed.embeddings import PassThroughEmbeddings
+    >>> graph = graph_from_course(
+    ...     "/path/to/course.imscc", "/path/to/piazza.zip", PassThroughEmbeddings()
+    ... )  # doctest: +SKIP
+    """
+    graph = CourseGraph()
+    canvas = _add_canvas(graph, canvas_path)
+    piazza = CourseGraphBuilder("piazza", graph).extend(
+        PiazzaLoader(piazza_path).lazy_load()
+    )
+    link_similar(
+        graph,
+        canvas,
+        piazza,
+        embeddings,
+        k=k,
+        threshold=threshold,
+        max_degree=max_degree,
+    )
+    return graph
@@ -0,0 +1,137 @@
+"""Reference edges from the links inside Canvas HTML pages."""
+
+from __future__ import annotations
+
+import html
+import os
+import posixpath
+import re
+import urllib.parse
+from typing import Iterator, Sequence
+
+from rag_ed import tracing
+
+from .course import CourseGraph
+from .csr import CSRCourseGraph
+
+_HREF = re.compile(r"""\b(?:href|src)\s*=\s*(["'])(.*?)\1""", re.IGNORECASE | re.DOTALL)
+# Canvas writes links to course files and wiki pages with these placeholders.
+_PLACEHOLDERS = {
+    "$IMS-CC-FILEBASE$": "web_resources",
+    "$WIKI_REFERENCE$/pages": "wiki_content",
+    "$WIKI_REFERENCE$/wiki": "wiki_content",
+}
+_FOLDERS = frozenset(_PLACEHOLDERS.values())
+_HTML = (".html", ".htm")
+
+
+def extract_links(text: str) -> Iterator[str]:
+    """Yield the ``href`` and ``src`` attribute values of an HTML page."""
+    for match in _HREF.finditer(text):
+        yield html.unescape(match.group(2)).strip()
+
+
+class LinkResolver:
+    """Resolution index from paths inside a Canvas export to artifact ids.
+
+    Every source file is indexed once under its absolute path and under its
+    path from the ``web_resources`` or ``wiki_content`` folder, which is what
+    ``$IMS-CC-FILEBASE$`` and ``$WIKI_REFERENCE$`` links name. Keys are
+    case-folded. A source split into several documents resolves to the first.
+
+    Parameters
+    ----------
+    sources : Sequence[tuple[str, str]]
+        ``(artifact_id, source_path)`` pairs.
+    """
+
+    def __init__(self, sources: Sequence[tuple[str, str]]) -> None:
+        self._index: dict[str, str] = {}
+        for artifact_id, source in sources:
+            path = os.path.normpath(os.path.abspath(source))
+            for key in _keys(path):
+                self._index.setdefault(key, artifact_id)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def resolve(self, href: str, base: str) -> str | None:
+        """Return the artifact ``href`` points to from the page at ``base``.
+
+        External URLs, anchors and links to files that are not artifacts
+        resolve to ``None``.
+        """
+        href = urllib.parse.unquote(href.split("#", 1)[0].split("?", 1)[0])
+        if not href or urllib.parse.urlsplit(href).scheme:
+            return None
+        for placeholder, folder in _PLACEHOLDERS.items():
+            if href.startswith(placeholder + "/"):
+                path = posixpath.normpath(folder + href[len(placeholder) :])
+                if folder == "wiki_content" and not path.endswith(_HTML):
+                    path += ".html"
+                return self._index.get(path.casefold())
+        if href.startswith(("$", "/")):
+            return None
+        path = os.path.normpath(os.path.join(os.path.dirname(base), href))
+        return self._index.get(path.casefold())
+
+
+def link_references(
+    graph: CourseGraph | CSRCourseGraph, artifact_ids: Sequence[str]
+) -> int:
+    """Add an edge for every link between Canvas artifacts in ``graph``.
+
+    A :class:`LinkResolver` is built over the artifacts' ``source`` paths,
+    then each HTML source is read once, its links resolved and all edges
+    added in one call. Sources must still be on disk, as
+    :class:`~rag_ed.loaders.canvas.CanvasLoader` leaves them.
+
+    Parameters
+    ----------
+    graph : CourseGraph or CSRCourseGraph
+        Graph holding the artifacts.
+    artifact_ids : Sequence[str]
+        Artifacts of one Canvas export.
+
+    Returns
+    -------
+    int
+        Number of linked pairs.
+    """
+    sources = [
+        (artifact_id, source)
+        for artifact_id in artifact_ids
+        if (source := graph.document(artifact_id).metadata.get("source"))
+    ]
+    with tracing.span("graph_link", kind="references") as span:
+        resolver = LinkResolver(sources)
+        edges: dict[tuple[str, str], None] = {}
+        seen: set[str] = set()
+        for artifact_id, source in sources:
+            if source in seen or not source.lower().endswith(_HTML):
+                continue
+            seen.add(source)
+            try:
+                with open(source, encoding="utf-8", errors="ignore") as file:
+                    text = file.read()
+            except OSError:
+                continue
+            base = os.path.abspath(source)
+            for href in extract_links(text):
+                target = resolver.resolve(href, base)
+                if target is not None and target != artifact_id:
+                    edges[artifact_id, target] = None
+        graph.add_relationships(edges)
+        span.count("edges", len(edges))
+    return len(edges)
+
+
+def _keys(path: str) -> list[str]:
+    """Return the lookup keys of an absolute, normalized source path."""
+    keys = [path.casefold()]
+    parts = path.replace(os.sep, "/").split("/")
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] in _FOLDERS:
+            keys.append("/".join(parts[i:]).casefold())
+            break
+    return keys
@@ -0,0 +1,147 @@
+"""Personalized PageRank over course graph adjacency arrays."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import scipy.sparse
+
+
+class PageRank:
+    """Sparse random-walk operator of a course graph.
+
+    The transposed, row-normalized adjacency matrix is built once from the
+    graph's CSR arrays, so each power iteration is a single sparse
+    matrix-matrix product. Every column of the personalization matrix is an
+    independent walk, which lets several seed sets share one batched
+    iteration.
+
+    Parameters
+    ----------
+    indptr, indices : numpy.ndarray
+        CSR adjacency, as returned by ``CourseGraph.adjacency``.
+    weights : numpy.ndarray, optional
+        Edge weights aligned with ``indices``; negative weights count as
+        ``0``. Unweighted by default.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> ranker = PageRank(np.array([0, 1, 2, 2]), np.array([1, 2], dtype=np.int32))
+    >>> scores, _ = ranker.run(np.array([1.0, 0.0, 0.0]), damping=0.5, tol=1e-9)
+    >>> [round(float(s), 3) for s in scores]
+    [0.571, 0.286, 0.143]
+    """
+
+    def __init__(
+        self,
+        indptr: npt.NDArray[np.int64],
+        indices: npt.NDArray[np.int32],
+        weights: npt.NDArray[np.float32] | None = None,
+    ) -> None:
+        n = len(indptr) - 1
+        if weights is None:
+            weights = np.ones(len(indices), dtype=np.float32)
+        values = np.clip(np.asarray(weights, dtype=np.float32), 0.0, None)
+        adjacency = scipy.sparse.csr_array((values, indices, indptr), shape=(n, n))
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        scale = np.divide(1.0, degree, out=np.zeros_like(degree), where=degree > 0)
+        self.dangling = np.flatnonzero(degree <= 0)
+        # Row ``i`` of the transposed walk matrix sums the probability mass
+        # flowing into artifact ``i``.
+        self._walk = (scipy.sparse.diags_array(scale) @ adjacency).T.tocsr()
+        self.size = n
+
+    @classmethod
+    def from_graph(cls, graph: Any) -> PageRank:
+        """Build the operator of either course graph backend."""
+        indptr, indices = graph.adjacency
+        return cls(indptr, indices, graph.weights)
+
+    def run(
+        self,
+        personalization: npt.ArrayLike,
+        *,
+        damping: float = 0.5,
+        tol: float = 1e-4,
+        max_iter: int = 100,
+        start: npt.ArrayLike | None = None,
+    ) -> tuple[npt.NDArray[np.float32], int]:
+        """Iterate personalized PageRank to convergence.
+
+        At each step a walker follows an out-edge with probability
+        ``damping`` (in proportion to edge weight) or jumps back to the
+        personalization distribution; walkers at artifacts without out-edges
+        jump back too.
+
+        Parameters
+        ----------
+        personalization : array_like
+            Non-negative restart weights, shape ``(n,)`` or ``(n, b)`` for
+            ``b`` seed sets solved together. Each column is normalized to
+            sum to ``1``.
+        damping : float, optional
+            Probability of following an edge. Lower values keep scores close
+            to the seeds and converge faster. Defaults to ``0.5``.
+        tol : float, optional
+            Stop once the L1 change of every column falls below ``tol``.
+            Scores are ``float32``, so tolerances much below ``1e-6`` run to
+            ``max_iter``. Defaults to ``1e-4``.
+        max_iter : int, optional
+            Iteration cap. Defaults to ``100``.
+        start : array_like, optional
+            Initial scores with the shape of ``personalization``, such as a
+            previous result for the same seeds, to warm-start the iteration.
+
+        Returns
+        -------
+        tuple[numpy.ndarray, int]
+            Scores with the shape of ``personalization`` (each column sums to
+            ``1``) and the number of iterations run.
+
+        Raises
+        ------
+        ValueError
+            If a parameter is out of range or a personalization column is
+            all zeros.
+        """
+        if not 0.0 <= damping < 1.0:
+            msg = "damping must be in [0, 1)"
+            raise ValueError(msg)
+        if tol <= 0 or max_iter <= 0:
+            msg = "tol and max_iter must be positive"
+            raise ValueError(msg)
+        restart = _columns(personalization, self.size)
+        x = restart if start is None else _columns(start, self.size)
+        iterations = 0
+        for iterations in range(1, max_iter + 1):
+            lost = x[self.dangling].sum(axis=0)
+            step = damping * (self._walk @ x + lost * restart)
+            step += (1.0 - damping) * restart
+            change = float(np.abs(step - x).sum(axis=0).max())
+            x = step
+            if change < tol:
+                break
+        if np.ndim(personalization) == 1:
+            return x[:, 0], iterations
+        return x, iterations
+
+
+def _columns(values: npt.ArrayLike, size: int) -> npt.NDArray[np.float32]:
+    """Return ``values`` as an ``(size, b)`` array with columns summing to 1."""
+    array = np.asarray(values, dtype=np.float32)
+    if array.ndim == 1:
+        array = array[:, None]
+    if array.shape[0] != size or array.ndim != 2:
+        msg = f"expected {size} rows, got shape {array.shape}"
+        raise ValueError(msg)
+    if (array < 0).any():
+        msg = "personalization must be non-negative"
+        raise ValueError(msg)
+    totals = array.sum(axis=0)
+    if (totals <= 0).any():
+        msg = "every personalization column needs a positive entry"
+        raise ValueError(msg)
+    return array / totals
@@ -0,0 +1,237 @@
+"""Weighted edges between similar artifacts of two document sets."""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import langchain_core.embeddings
+import numpy as np
+import numpy.typing as npt
+
+from rag_ed import tracing
+
+from .course import CourseGraph
+from .csr import CSRCourseGraph
+
+# Similarity scores computed per block; 4M float32 scores take 16 MiB.
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def similarity_join(
+    left: npt.ArrayLike,
+    right: npt.ArrayLike,
+    *,
+    k: int = 3,
+    threshold: float = 0.5,
+    max_degree: int | None = None,
+    block_size: int | None = None,
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+    """Return the most cosine-similar pairs between two sets of vectors.
+
+    Every left vector proposes its ``k`` nearest right vectors and every
+    right vector its ``k`` nearest left vectors. Left rows are scored in
+    blocks against all right rows while a running top-``k`` per right row is
+    kept, so at most ``block_size * len(right)`` scores exist at once.
+
+    Parameters
+    ----------
+    left, right : array_like
+        ``(n, dim)`` and ``(m, dim)`` vectors.
+    k : int, optional
+        Nearest neighbours proposed per vector. Defaults to ``3``.
+    threshold : float, optional
+        Minimum cosine similarity of a returned pair. Defaults to ``0.5``.
+    max_degree : int, optional
+        Cap on the pairs of any one vector. A pair is kept only if it is
+        among the ``max_degree`` strongest proposals of both of its vectors.
+        Uncapped by default.
+    block_size : int, optional
+        Left rows scored at once. Defaults to a block of about 4M scores.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        Left rows, right rows and similarities of the pairs, strongest first.
+
+    Examples
+    --------
+    >>> rows, cols, scores = similarity_join(
+    ...     [[1.0, 0.0], [0.0, 1.0]], [[0.0, 2.0], [1.0, 0.1]], k=1
+    ... )
+    >>> rows.tolist(), cols.tolist()
+    ([1, 0], [0, 1])
+    """
+    if k <= 0 or (max_degree is not None and max_degree <= 0):
+        msg = "k and max_degree must be positive"
+        raise ValueError(msg)
+    if block_size is not None and block_size <= 0:
+        msg = "block_size must be positive"
+        raise ValueError(msg)
+    left = _normalized(left)
+    right = _normalized(right)
+    n, m = len(left), len(right)
+    if not n or not m:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    row_k, col_k = min(k, m), min(k, n)
+    block = block_size or max(1, _BLOCK_ELEMENTS // m)
+    # Best ``col_k`` scores of every right vector, in decreasing order.
+    col_scores = np.full((col_k, m), -np.inf, dtype=np.float32)
+    col_rows = np.zeros((col_k, m), dtype=np.int64)
+    rows, cols, scores = [], [], []
+    for start in range(0, n, block):
+        sims = left[start : start + block] @ right.T
+        top = _top_k(sims, row_k)
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        keep = top_sims >= threshold
+        rows.append(np.nonzero(keep)[0] + start)
+        cols.append(top[keep])
+        scores.append(top_sims[keep])
+
+        # Only scores beating a right vector's current ``k``-th best can
+        # change its running top-``k``; after the first blocks these are few.
+        best = sims.max(axis=0)
+        changed = np.flatnonzero((best >= threshold) & (best > col_scores[-1]))
+        if len(changed):
+            sub = sims[:, changed]
+            hit_rows, hits = np.nonzero(
+                (sub >= threshold) & (sub > col_scores[-1, changed])
+            )
+            _merge_columns(
+                col_scores,
+                col_rows,
+                changed[hits],
+                hit_rows + start,
+                sub[hit_rows, hits],
+            )
+    keep = col_scores >= threshold
+    rows.append(col_rows[keep])
+    cols.append(np.nonzero(keep)[1])
+    scores.append(col_scores[keep])
+
+    row = np.concatenate(rows).astype(np.int64)
+    col = np.concatenate(cols).astype(np.int64)
+    score = np.concatenate(scores).astype(np.float32)
+    _, first = np.unique(row * m + col, return_index=True)
+    row, col, score = row[first], col[first], score[first]
+    order = np.lexsort((col, row, -score))
+    row, col, score = row[order], col[order], score[order]
+    if max_degree is not None:
+        keep = (_ranks(row) < max_degree) & (_ranks(col) < max_degree)
+        row, col, score = row[keep], col[keep], score[keep]
+    return row, col, score
+
+
+def link_similar(
+    graph: CourseGraph | CSRCourseGraph,
+    left_ids: Sequence[str],
+    right_ids: Sequence[str],
+    embeddings: langchain_core.embeddings.Embeddings,
+    *,
+    k: int = 3,
+    threshold: float = 0.5,
+    max_degree: int | None = 5,
+    block_size: int | None = None,
+) -> int:
+    """Link similar artifacts of two sources in ``graph``.
+
+    The documents of ``left_ids`` and ``right_ids``, such as Canvas pages and
+    Piazza posts, are embedded once and paired with :func:`similarity_join`.
+    Each pair is added in both directions with its cosine similarity as the
+    edge weight.
+
+    Parameters
+    ----------
+    graph : CourseGraph or CSRCourseGraph
+        Graph holding both sets of artifacts.
+    left_ids, right_ids : Sequence[str]
+        Artifacts of each source.
+    embeddings : Embeddings
+        Model embedding the documents' ``page_content``.
+    k, threshold, max_degree, block_size
+        As in :func:`similarity_join`; ``max_degree`` defaults to ``5``.
+
+    Returns
+    -------
+    int
+        Number of linked pairs.
+    """
+    if not left_ids or not right_ids:
+        return 0
+    with tracing.span(
+        "graph_link", kind="similarity", left=len(left_ids), right=len(right_ids)
+    ) as span:
+        vectors = [
+            np.asarray(
+                embeddings.embed_documents(
+                    [graph.document(artifact_id).page_content for artifact_id in ids]
+                ),
+                dtype=np.float32,
+            ).reshape(len(ids), -1)
+            for ids in (left_ids, right_ids)
+        ]
+        rows, cols, scores = similarity_join(
+            *vectors,
+            k=k,
+            threshold=threshold,
+            max_degree=max_degree,
+            block_size=block_size,
+        )
+        pairs = [
+            (left_ids[row], right_ids[col], score)
+            for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist())
+        ]
+        graph.add_relationships(pairs)
+        graph.add_relationships((b, a, score) for a, b, score in pairs)
+        span.count("edges", len(pairs))
+    return len(pairs)
+
+
+def _normalized(vectors: npt.ArrayLike) -> npt.NDArray[np.float32]:
+    array = np.asarray(vectors, dtype=np.float32)
+    if array.ndim != 2:
+        msg = f"expected a 2-D array of vectors, got shape {array.shape}"
+        raise ValueError(msg)
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return (array / np.where(norms > 0, norms, 1.0)).astype(np.float32, copy=False)
+
+
+def _top_k(scores: npt.NDArray[np.float32], k: int) -> npt.NDArray[np.intp]:
+    """Return the column indices of the ``k`` largest scores per row, unordered."""
+    size = scores.shape[1]
+    if k >= size:
+        return np.broadcast_to(np.arange(size), scores.shape)
+    return np.argpartition(scores, size - k, axis=1)[:, size - k :]
+
+
+def _merge_columns(
+    col_scores: npt.NDArray[np.float32],
+    col_rows: npt.NDArray[np.int64],
+    cols: npt.NDArray[np.intp],
+    rows: npt.NDArray[np.int64],
+    scores: npt.NDArray[np.float32],
+) -> None:
+    """Merge candidate ``(row, col, score)`` triples into the running top-k."""
+    k = len(col_scores)
+    touched = np.unique(cols)
+    cols = np.concatenate([cols, np.tile(touched, k)])
+    rows = np.concatenate([rows, col_rows[:, touched].ravel()])
+    scores = np.concatenate([scores, col_scores[:, touched].ravel()])
+    order = np.lexsort((-scores, cols))
+    cols, rows, scores = cols[order], rows[order], scores[order]
+    rank = _ranks(cols)
+    keep = rank < k
+    col_scores[rank[keep], cols[keep]] = scores[keep]
+    col_rows[rank[keep], cols[keep]] = rows[keep]
+
+
+def _ranks(groups: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    """Return each element's position among the elements of its group."""
+    order = np.argsort(groups, kind="stable")
+    ordered = groups[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    counts = np.diff(np.r_[starts, len(groups)])
+    ranks = np.empty(len(groups), dtype=np.int64)
+    ranks[order] = np.arange(len(groups)) - np.repeat(starts, counts)
+    return ranks
@@ -0,0 +1,140 @@
+"""Pickle-free, memory-mappable course graph files.
+
+A graph file is a :mod:`rag_ed.retrievers.snapshot` file whose header lists
+the artifact ids and whose arrays hold the CSR edges (``indptr``,
+``indices``, ``weights``) and the documents as a
+:class:`~rag_ed.retrievers.chunkstore.ChunkStore`. Both graph backends read
+and write the same format, so a file saved from one opens in the other.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Iterator, Sequence, overload
+
+import langchain_core.documents
+import numpy as np
+import numpy.typing as npt
+
+from rag_ed.retrievers.chunkstore import ChunkStore
+from rag_ed.retrievers.snapshot import read_snapshot, write_snapshot
+
+FORMAT_VERSION = 1
+_DOCUMENTS = "documents."
+
+
+class DocumentTable(Sequence[langchain_core.documents.Document]):
+    """Documents of a loaded graph, materialized on first access.
+
+    Parameters
+    ----------
+    store : ChunkStore
+        Texts and metadata by integer artifact id.
+    """
+
+    def __init__(self, store: ChunkStore) -> None:
+        self.store = store
+        self._documents: list[langchain_core.documents.Document | None] = [None] * len(
+            store
+        )
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @overload
+    def __getitem__(self, i: int) -> langchain_core.documents.Document: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> Sequence[langchain_core.documents.Document]: ...
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        document = self._documents[i]
+        if document is None:
+            row = range(len(self))[i]
+            document = langchain_core.documents.Document(
+                page_content=self.store.text(row), metadata=self.store.metadata(row)
+            )
+            self._documents[i] = document
+        return document
+
+    def __iter__(self) -> Iterator[langchain_core.documents.Document]:
+        return (self[i] for i in range(len(self)))
+
+
+def save_graph(
+    path: str | os.PathLike[str],
+    ids: Sequence[str],
+    documents: Sequence[langchain_core.documents.Document],
+    indptr: npt.NDArray[np.int64],
+    indices: npt.NDArray[np.int32],
+    weights: npt.NDArray[np.float32],
+) -> None:
+    """Write a graph given by integer ids and CSR arrays to ``path``.
+
+    Document metadata is stored as JSON, so values that are not JSON types
+    come back as strings.
+    """
+    if isinstance(documents, DocumentTable):
+        store = documents.store
+    else:
+        store = ChunkStore.from_documents(documents)
+    chunk_header, chunk_arrays = store.to_arrays()
+    header = {
+        "graph": {"version": FORMAT_VERSION, "ids": list(ids)},
+        "documents": chunk_header,
+    }
+    arrays: dict[str, npt.NDArray[Any]] = {
+        "indptr": indptr,
+        "indices": indices,
+        "weights": weights,
+    }
+    arrays.update({_DOCUMENTS + name: a for name, a in chunk_arrays.items()})
+    write_snapshot(path, header, arrays)
+
+
+def load_graph(
+    path: str | os.PathLike[str],
+) -> tuple[list[str], DocumentTable, dict[str, npt.NDArray[Any]]]:
+    """Memory-map a graph file written by :func:`save_graph`.
+
+    Returns
+    -------
+    tuple[list[str], DocumentTable, dict[str, numpy.ndarray]]
+        Artifact ids, their documents and the read-only ``indptr``,
+        ``indices`` and ``weights`` arrays.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` is not a graph file or uses an unsupported version.
+    """
+    header, arrays = read_snapshot(path)
+    graph = header.get("graph")
+    if graph is None:
+        msg = "Not a course graph file: missing graph header"
+        raise ValueError(msg)
+    if graph.get("version") != FORMAT_VERSION:
+        msg = f"Unsupported course graph version: {graph.get('version')}"
+        raise ValueError(msg)
+    store = ChunkStore.from_arrays(
+        header["documents"],
+        {
+            name.removeprefix(_DOCUMENTS): array
+            for name, array in arrays.items()
+            if name.startswith(_DOCUMENTS)
+        },
+    )
+    edges = {name: arrays[name] for name in ("indptr", "indices", "weights")}
+    return graph["ids"], DocumentTable(store), edges
+
+
+def archive_digest(path: str | os.PathLike[str]) -> str:
+    """Return the SHA-256 of the file at ``path``, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
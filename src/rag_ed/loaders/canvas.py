@@ -3,6 +3,7 @@
 import datetime
 import os
 from pathlib import Path
+from typing import Iterator
 
 from langchain_community.document_loaders import (
     UnstructuredCSVLoader,
@@ -18,8 +19,9 @@ from langchain_core.document_loaders import BaseLoader
 from langchain_core.documents import Document
 import tqdm
 
-from .utils import extract_zip
+from rag_ed import tracing
 
+from .utils import extract_zip
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp"}
 
@@ -63,6 +65,11 @@ class CanvasLoader(BaseLoader):
         file_paths = extract_zip(self.zipped_file_path)
         return self._load_files(file_paths)
 
+    def lazy_load(self) -> Iterator[Document]:
+        """Yield documents one archive member at a time."""
+        for file_path in tqdm.tqdm(extract_zip(self.zipped_file_path)):
+            yield from self.load_file(file_path)
+
     def _load_files(self, list_of_files_to_load: list[str]) -> list[Document]:
         """
         Load the files from the list of files to load.
@@ -75,32 +82,66 @@ class CanvasLoader(BaseLoader):
         """
         loaded_documents: list[Document] = []
         for file_path in tqdm.tqdm(list_of_files_to_load):
-            if not os.path.isfile(file_path):
-                continue
-            file_extension = os.path.splitext(file_path)[1].lower()
-            if file_extension in SKIP_EXTENSIONS:
-                continue  # Skip unsupported binary files
-
-            loader_cls = FILE_LOADERS.get(file_extension)
-            if loader_cls is not None:
-                new_documents = loader_cls(file_path).load()  # type: ignore[call-arg]
-            else:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
-                    content = file.read()
-                new_documents = [
-                    Document(page_content=content, metadata={"source": file_path})
-                ]
-
-            timestamp = datetime.datetime.fromtimestamp(
-                os.path.getmtime(file_path)
-            ).isoformat()
-            for doc in new_documents:
-                doc.metadata.setdefault("source", file_path)
-                doc.metadata["course"] = self.course
-                doc.metadata["timestamp"] = timestamp
-            loaded_documents += new_documents
+            loaded_documents += self.load_file(file_path)
         return loaded_documents
 
+    def load_file(self, file_path: str) -> list[Document]:
+        """Parse one extracted archive member into documents.
+
+        Unsupported and missing files yield no documents. Independent files
+        can be parsed concurrently.
+        """
+        with tracing.span("parse", source=file_path, loader="canvas") as span:
+            documents = self._parse_file(file_path)
+            span.count("documents", len(documents))
+        return documents
+
+    def _parse_file(self, file_path: str) -> list[Document]:
+        if not os.path.isfile(file_path):
+            return []
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_extension in SKIP_EXTENSIONS:
+            return []  # Skip unsupported binary files
+
+        loader_cls = FILE_LOADERS.get(file_extension)
+        if file_extension == ".pdf":
+            new_documents = [_load_pdf(file_path)]
+        elif loader_cls is not None:
+            new_documents = loader_cls(file_path).load()  # type: ignore[call-arg]
+        else:
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
+                content = file.read()
+            new_documents = [
+                Document(page_content=content, metadata={"source": file_path})
+            ]
+
+        timestamp = datetime.datetime.fromtimestamp(
+            os.path.getmtime(file_path)
+        ).isoformat()
+        for doc in new_documents:
+            doc.metadata.setdefault("source", file_path)
+            doc.metadata["course"] = self.course
+            doc.metadata["timestamp"] = timestamp
+        return new_documents
+
+
+def _load_pdf(file_path: str) -> Document:
+    """Load a PDF as one document whose pages are separated by form feeds.
+
+    Unstructured reports the page of every element; joining pages with
+    ``"\\f"`` keeps the file one document while letting the ``"structure"``
+    :class:`~rag_ed.retrievers.chunking.Chunker` split at page boundaries.
+    Pages without text stay as empty pages, so page numbers are preserved.
+    """
+    pages: dict[int, list[str]] = {}
+    for element in UnstructuredPDFLoader(file_path, mode="elements").lazy_load():
+        page = int(element.metadata.get("page_number") or 1)
+        pages.setdefault(page, []).append(element.page_content)
+    text = "\f".join(
+        "\n\n".join(pages.get(page, [])) for page in range(1, max(pages, default=0) + 1)
+    )
+    return Document(page_content=text, metadata={"source": file_path})
+
 
 if __name__ == "__main__":
     # Example usage
@@ -3,12 +3,15 @@
 import datetime
 import os
 from pathlib import Path
+from typing import Iterator
 
 import langchain_community.document_loaders
 import langchain_core.document_loaders
 import langchain_core.documents
 import tqdm
 
+from rag_ed import tracing
+
 from .utils import extract_zip
 
 
@@ -35,6 +38,11 @@ class PiazzaLoader(langchain_core.document_loaders.BaseLoader):
         file_paths = extract_zip(self.zipped_file_path)
         return self._load_files(file_paths)
 
+    def lazy_load(self) -> Iterator[langchain_core.documents.Document]:
+        """Yield documents one archive member at a time."""
+        for file_path in tqdm.tqdm(extract_zip(self.zipped_file_path)):
+            yield from self.load_file(file_path)
+
     def _load_files(
         self, list_of_files_to_load: list[str]
     ) -> list[langchain_core.documents.Document]:
@@ -49,29 +57,44 @@ class PiazzaLoader(langchain_core.document_loaders.BaseLoader):
         """
         loaded_documents = []
         for file_path in tqdm.tqdm(list_of_files_to_load):
-            if os.path.isfile(file_path):
-                file_extension = os.path.splitext(file_path)[1].lower()
-                if file_extension == ".csv":
-                    new_documents = langchain_community.document_loaders.CSVLoader(
-                        file_path
-                    ).load()
-                elif file_extension == ".json":
-                    new_documents = langchain_community.document_loaders.JSONLoader(
-                        file_path, jq_schema=".", text_content=False
-                    ).load()
-                else:
-                    continue  # Skip other file types
-
-                timestamp = datetime.datetime.fromtimestamp(
-                    os.path.getmtime(file_path)
-                ).isoformat()
-                for doc in new_documents:
-                    doc.metadata.setdefault("source", file_path)
-                    doc.metadata["course"] = self.course
-                    doc.metadata["timestamp"] = timestamp
-                loaded_documents += new_documents
+            loaded_documents += self.load_file(file_path)
         return loaded_documents
 
+    def load_file(self, file_path: str) -> list[langchain_core.documents.Document]:
+        """Parse one extracted archive member into documents.
+
+        Only ``.csv`` and ``.json`` files produce documents. Independent files
+        can be parsed concurrently.
+        """
+        with tracing.span("parse", source=file_path, loader="piazza") as span:
+            documents = self._parse_file(file_path)
+            span.count("documents", len(documents))
+        return documents
+
+    def _parse_file(self, file_path: str) -> list[langchain_core.documents.Document]:
+        if not os.path.isfile(file_path):
+            return []
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_extension == ".csv":
+            new_documents = langchain_community.document_loaders.CSVLoader(
+                file_path
+            ).load()
+        elif file_extension == ".json":
+            new_documents = langchain_community.document_loaders.JSONLoader(
+                file_path, jq_schema=".", text_content=False
+            ).load()
+        else:
+            return []  # Skip other file types
+
+        timestamp = datetime.datetime.fromtimestamp(
+            os.path.getmtime(file_path)
+        ).isoformat()
+        for doc in new_documents:
+            doc.metadata.setdefault("source", file_path)
+            doc.metadata["course"] = self.course
+            doc.metadata["timestamp"] = timestamp
+        return new_documents
+
 
 if __name__ == "__main__":
     # Example usage
@@ -7,6 +7,8 @@ import tempfile
 import zipfile
 from typing import List
 
+from rag_ed import tracing
+
 
 def extract_zip(path: str) -> List[str]:
     """Extract ``path`` and return absolute paths of contained files.
@@ -22,11 +24,13 @@ def extract_zip(path: str) -> List[str]:
         Paths to all files contained in the archive. The archive is extracted to
         a temporary directory, which is not automatically cleaned up.
     """
-    temp_dir = tempfile.mkdtemp()
-    with zipfile.ZipFile(path, "r") as zf:
-        zf.extractall(temp_dir)
-    file_paths: list[str] = []
-    for root, _, files in os.walk(temp_dir):
-        for file in files:
-            file_paths.append(os.path.join(root, file))
+    with tracing.span("extract", archive=str(path)) as span:
+        temp_dir = tempfile.mkdtemp()
+        with zipfile.ZipFile(path, "r") as zf:
+            zf.extractall(temp_dir)
+        file_paths: list[str] = []
+        for root, _, files in os.walk(temp_dir):
+            for file in files:
+                file_paths.append(os.path.join(root, file))
+        span.count("files", len(file_paths))
     return file_paths
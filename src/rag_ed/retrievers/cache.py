@@ -0,0 +1,161 @@
+"""In-process caches for query embeddings and retrieval results."""
+
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+import langchain_core.documents
+
+V = TypeVar("V")
+
+
+def normalize_query(query: str) -> str:
+    """Return a canonical cache key for ``query``.
+
+    Case and runs of whitespace are ignored so ``"When is the  Midterm"`` and
+    ``"when is the midterm"`` share an entry.
+    """
+    return " ".join(query.casefold().split())
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Hit and miss counters for a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache(Generic[V]):
+    """Size-bounded LRU mapping with optional time-to-live.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries. The least recently used entry is evicted
+        once the limit is exceeded. Defaults to ``1024``.
+    ttl : float, optional
+        Lifetime of an entry in seconds. ``None`` disables expiry.
+    clock : Callable[[], float], optional
+        Monotonic time source, overridable for testing.
+
+    Examples
+    --------
+    >>> cache: LRUCache[int] = LRUCache(maxsize=1)
+    >>> cache.put("a", 1)
+    >>> cache.put("b", 2)
+    >>> cache.get("a") is None
+    True
+    >>> cache.get("b")
+    2
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        *,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if maxsize <= 0:
+            msg = "maxsize must be positive"
+            raise ValueError(msg)
+        if ttl is not None and ttl <= 0:
+            msg = "ttl must be positive"
+            raise ValueError(msg)
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> V | None:
+        """Return the value stored under ``key`` or ``None`` on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires, value = entry
+            if expires < self._clock():
+                del self._data[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        """Store ``value`` under ``key``, evicting the oldest entry if full."""
+        expires = self._clock() + self._ttl if self._ttl else float("inf")
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry while keeping the statistics."""
+        with self._lock:
+            self._data.clear()
+
+
+class QueryCache:
+    """Cache query embeddings and top-k results for a retriever.
+
+    Embeddings are keyed by the normalized query alone, since they do not
+    depend on the index. Results are keyed by normalized query, ``k`` and the
+    retriever's index version, and are dropped whenever the index changes.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum entries kept in each of the two caches.
+    ttl : float, optional
+        Lifetime of cached entries in seconds.
+
+    Examples
+    --------
+    >>> cache = QueryCache(maxsize=256, ttl=600)
+    >>> cache.stats()["results"].hit_rate
+    0.0
+    """
+
+    def __init__(self, maxsize: int = 1024, *, ttl: float | None = None) -> None:
+        self.embeddings: LRUCache[list[float]] = LRUCache(maxsize, ttl=ttl)
+        self.results: LRUCache[list[langchain_core.documents.Document]] = LRUCache(
+            maxsize, ttl=ttl
+        )
+
+    @staticmethod
+    def result_key(
+        query: str, k: int, version: Any, *, filter: Hashable = None
+    ) -> tuple[str, int, Any, Hashable]:
+        """Build the key under which results for ``query`` are stored."""
+        return normalize_query(query), k, version, filter
+
+    def invalidate(self) -> None:
+        """Forget cached results after the index was rebuilt or updated."""
+        self.results.clear()
+
+    def stats(self) -> dict[str, CacheStats]:
+        """Return hit-rate metrics for the embedding and result caches."""
+        return {"embeddings": self.embeddings.stats, "results": self.results.stats}
@@ -0,0 +1,374 @@
+"""Configurable, structure-aware chunking of loaded course documents."""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import html
+import html.parser
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Literal
+
+import langchain.text_splitter
+import langchain_core.documents
+
+from rag_ed import tracing
+
+Strategy = Literal["recursive", "structure"]
+LengthUnit = Literal["chars", "tokens"]
+
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+@functools.cache
+def _encoding() -> Any:
+    import tiktoken
+
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Count ``cl100k_base`` tokens, the encoding of OpenAI embedding models."""
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+class _TextExtractor(html.parser.HTMLParser):
+    """Collect visible text and the text of ``<h1>``-``<h6>`` elements."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.headings: list[str] = []
+        self._heading: list[str] | None = None
+        self._skip = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in _HEADINGS:
+            self._heading = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("script", "style"):
+            self._skip = max(self._skip - 1, 0)
+        elif tag in _HEADINGS and self._heading is not None:
+            heading = " ".join("".join(self._heading).split())
+            if heading:
+                self.headings.append(heading)
+            self._heading = None
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+        self.parts.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+
+def _extract(markup: str) -> _TextExtractor:
+    parser = _TextExtractor()
+    parser.feed(markup)
+    parser.close()
+    return parser
+
+
+def _strip_html(markup: str) -> str:
+    return html.unescape(" ".join("".join(_extract(markup).parts).split()))
+
+
+def _post_text(post: dict[str, Any]) -> str:
+    """Flatten a Piazza post and its answers and follow-ups into text."""
+    latest = post.get("history", [{}])[0] if post.get("history") else post
+    parts = [latest.get("subject", ""), _strip_html(latest.get("content", ""))]
+    for child in post.get("children", []):
+        if isinstance(child, dict):
+            parts.append(_post_text(child))
+    return "\n\n".join(part for part in parts if part)
+
+
+def _piazza_posts(text: str) -> list[dict[str, Any]] | None:
+    """Return the posts of a Piazza content export, or ``None`` if not one."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, list) or not data:
+        return None
+    if not all(isinstance(item, dict) for item in data):
+        return None
+    if not any("subject" in item or "history" in item for item in data):
+        return None
+    return data
+
+
+@dataclasses.dataclass
+class ChunkStats:
+    """Size distribution of a set of chunks, in the chunker's length unit."""
+
+    chunks: int
+    total: int
+    mean: float
+    minimum: int
+    median: float
+    p95: int
+    maximum: int
+
+
+class Chunker:
+    """Split documents into chunks with a configurable strategy.
+
+    Parameters
+    ----------
+    strategy : {"recursive", "structure"}, optional
+        ``"recursive"`` (default) applies
+        :class:`~langchain.text_splitter.RecursiveCharacterTextSplitter` to
+        every document. ``"structure"`` first cuts documents at their natural
+        boundaries: HTML pages at their headings, PDFs at page breaks and
+        Piazza exports into one unit per post (with its answers). Only units
+        longer than ``chunk_size`` are split further; adjacent short HTML
+        sections are merged up to ``chunk_size``.
+    chunk_size : int, optional
+        Maximum chunk length. Defaults to ``1000``.
+    chunk_overlap : int, optional
+        Overlap between consecutive pieces of a split unit. Defaults to
+        ``200``.
+    length : {"chars", "tokens"} or Callable[[str], int], optional
+        Unit of ``chunk_size``. ``"tokens"`` counts ``cl100k_base`` tokens via
+        ``tiktoken`` so chunks fit an embedding model's input budget.
+        Defaults to ``"chars"``.
+    max_workers : int, optional
+        Split documents in a pool of this many processes. ``None`` or ``1``
+        (default) splits in the calling thread. A custom ``length`` must be
+        picklable to be used with a pool.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> chunker = Chunker("structure", chunk_size=500)
+    >>> doc = Document(
+    ...     page_content='[{"id": "p1", "subject": "HW3", "content": "<p>Due?</p>"}]',
+    ...     metadata={"source": "class_content_flat.json"},
+    ... )
+    >>> [(c.page_content, c.metadata["post_id"]) for c in chunker.split([doc])]
+    [('HW3\\n\\nDue?', 'p1')]
+    """
+
+    def __init__(
+        self,
+        strategy: Strategy = "recursive",
+        *,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        length: LengthUnit | Callable[[str], int] = "chars",
+        max_workers: int | None = None,
+    ) -> None:
+        if strategy not in ("recursive", "structure"):
+            msg = f"Unknown chunking strategy: {strategy}"
+            raise ValueError(msg)
+        if chunk_size <= 0:
+            msg = "chunk_size must be positive"
+            raise ValueError(msg)
+        if not 0 <= chunk_overlap < chunk_size:
+            msg = "chunk_overlap must be non-negative and smaller than chunk_size"
+            raise ValueError(msg)
+        if isinstance(length, str) and length not in ("chars", "tokens"):
+            msg = f"Unknown length unit: {length}"
+            raise ValueError(msg)
+        self.strategy = strategy
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length = length
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        state["_executor_lock"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._executor_lock = threading.Lock()
+
+    def length_function(self) -> Callable[[str], int]:
+        """Return the function measuring chunk length."""
+        if self.length == "chars":
+            return len
+        if self.length == "tokens":
+            return count_tokens
+        return self.length
+
+    def _splitter(self) -> langchain.text_splitter.RecursiveCharacterTextSplitter:
+        return langchain.text_splitter.RecursiveCharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            length_function=self.length_function(),
+        )
+
+    def split(
+        self, documents: list[langchain_core.documents.Document]
+    ) -> list[langchain_core.documents.Document]:
+        """Split ``documents`` into chunks, preserving document order."""
+        with tracing.span(
+            "split", strategy=self.strategy, documents=len(documents)
+        ) as span:
+            chunks = self._split(documents)
+            span.count("chunks", len(chunks))
+        return chunks
+
+    def _split(
+        self, documents: list[langchain_core.documents.Document]
+    ) -> list[langchain_core.documents.Document]:
+        if not self.max_workers or self.max_workers <= 1 or len(documents) < 2:
+            return self._split_batch(documents)
+        executor = self._pool()
+        # A few documents per task amortizes pickling without starving workers.
+        size = max(1, len(documents) // (4 * self.max_workers))
+        batches = [documents[i : i + size] for i in range(0, len(documents), size)]
+        return [
+            chunk
+            for chunks in executor.map(self._split_batch, batches)
+            for chunk in chunks
+        ]
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned workers are safe to start from multi-threaded
+                # callers such as the ingest pipeline.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """Shut down the worker pool, if one was started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _split_batch(
+        self, documents: list[langchain_core.documents.Document]
+    ) -> list[langchain_core.documents.Document]:
+        splitter = self._splitter()
+        if self.strategy == "recursive":
+            return splitter.split_documents(documents)
+        return [
+            chunk
+            for doc in documents
+            for chunk in self._split_structured(doc, splitter)
+        ]
+
+    def _split_structured(
+        self,
+        doc: langchain_core.documents.Document,
+        splitter: langchain.text_splitter.RecursiveCharacterTextSplitter,
+    ) -> list[langchain_core.documents.Document]:
+        source = str(doc.metadata.get("source", ""))
+        extension = os.path.splitext(source)[1].lower()
+        units: list[tuple[str, dict[str, Any]]]
+        if extension in (".html", ".htm"):
+            units = self._merge(self._html_sections(doc.page_content, source))
+        elif extension == ".pdf" and "\f" in doc.page_content:
+            units = [
+                (page, {"page": number})
+                for number, page in enumerate(doc.page_content.split("\f"), start=1)
+                if page.strip()
+            ]
+        elif extension == ".json" and (posts := _piazza_posts(doc.page_content)):
+            units = []
+            for post in posts:
+                extra: dict[str, Any] = {}
+                if "id" in post or "nr" in post:
+                    extra["post_id"] = post.get("id", post.get("nr"))
+                if isinstance(post.get("created"), str):
+                    extra["timestamp"] = post["created"]
+                units.append((_post_text(post), extra))
+        else:
+            units = [(doc.page_content, {})]
+
+        length = self.length_function()
+        chunks = []
+        for text, extra in units:
+            if not text.strip():
+                continue
+            metadata = {**doc.metadata, **extra}
+            fits = length(text) <= self.chunk_size
+            for piece in [text] if fits else splitter.split_text(text):
+                chunks.append(
+                    langchain_core.documents.Document(
+                        page_content=piece, metadata=dict(metadata)
+                    )
+                )
+        return chunks
+
+    @staticmethod
+    def _html_sections(text: str, source: str) -> list[tuple[str, dict[str, Any]]]:
+        """Cut parsed page text where the headings of the raw HTML appear.
+
+        The loaders store HTML as extracted text, so heading positions come
+        from re-reading the source page when it is still on disk.
+        """
+        headings: list[str] = []
+        if os.path.isfile(source):
+            with open(source, encoding="utf-8", errors="ignore") as file:
+                headings = _extract(file.read()).headings
+        cuts: list[tuple[int, str | None]] = [(0, None)]
+        position = 0
+        for heading in headings:
+            found = text.find(heading, position)
+            if found < 0:
+                continue
+            cuts.append((found, heading))
+            position = found + len(heading)
+        sections = []
+        for (start, title), (end, _) in zip(cuts, [*cuts[1:], (len(text), None)]):
+            body = text[start:end]
+            if body.strip():
+                sections.append((body, {"section": title} if title else {}))
+        return sections
+
+    def _merge(
+        self, units: list[tuple[str, dict[str, Any]]]
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """Join adjacent short units while they fit in ``chunk_size``."""
+        length = self.length_function()
+        merged: list[tuple[str, dict[str, Any]]] = []
+        for text, extra in units:
+            if merged:
+                previous, previous_extra = merged[-1]
+                joined = previous.rstrip() + "\n\n" + text.lstrip()
+                if length(joined) <= self.chunk_size:
+                    merged[-1] = (joined, previous_extra)
+                    continue
+            merged.append((text, extra))
+        return merged
+
+    def describe(
+        self, chunks: Iterable[langchain_core.documents.Document | str]
+    ) -> ChunkStats:
+        """Summarize the count and length distribution of ``chunks``."""
+        length = self.length_function()
+        sizes = sorted(
+            length(c if isinstance(c, str) else c.page_content) for c in chunks
+        )
+        if not sizes:
+            return ChunkStats(0, 0, 0.0, 0, 0.0, 0, 0)
+        return ChunkStats(
+            chunks=len(sizes),
+            total=sum(sizes),
+            mean=statistics.fmean(sizes),
+            minimum=sizes[0],
+            median=statistics.median(sizes),
+            p95=sizes[min(len(sizes) - 1, int(0.95 * len(sizes)))],
+            maximum=sizes[-1],
+        )
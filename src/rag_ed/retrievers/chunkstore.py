@@ -0,0 +1,374 @@
+"""Compact, memory-mappable storage for split chunks."""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import zlib
+from typing import Any, Hashable, Iterable, Iterator, Mapping
+
+import langchain_core.documents
+import numpy as np
+import numpy.typing as npt
+
+from rag_ed.retrievers.cache import LRUCache
+
+FORMAT_VERSION = 1
+_HEADER = "chunks.json"
+_TEXT = "text.bin"
+_OFFSETS = "offsets.npy"
+_BLOCKS = "blocks.npy"
+_CODES = "codes.npy"
+
+
+def _intern_key(value: Any) -> Hashable:
+    """Return a key under which equal metadata values share one code.
+
+    The type is part of the key so ``1``, ``1.0`` and ``True`` stay distinct;
+    unhashable values such as lists are keyed by their JSON form.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return ("json", json.dumps(value, sort_keys=True, default=str))
+    return (type(value).__name__, value)
+
+
+class ChunkStoreBuilder:
+    """Accumulate chunks row by row into the arrays of a :class:`ChunkStore`.
+
+    Parameters
+    ----------
+    compress : bool, optional
+        Compress the text blob in zlib blocks. Defaults to ``False``.
+    block_size : int, optional
+        Chunks per compressed block. Defaults to ``64``.
+    """
+
+    def __init__(self, *, compress: bool = False, block_size: int = 64) -> None:
+        if block_size <= 0:
+            msg = "block_size must be positive"
+            raise ValueError(msg)
+        self.compress = compress
+        self.block_size = block_size
+        self.blob = bytearray()
+        self.offsets = [0]
+        self.blocks = [0]
+        self.pending = bytearray()
+        self.values: dict[str, list[Any]] = {}
+        self.interned: dict[str, dict[Hashable, int]] = {}
+        self.codes: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def add(self, text: str, metadata: Mapping[str, Any]) -> None:
+        """Append one chunk."""
+        row = len(self.offsets) - 1
+        data = text.encode("utf-8")
+        self.offsets.append(self.offsets[-1] + len(data))
+        if self.compress:
+            self.pending += data
+            if (row + 1) % self.block_size == 0:
+                self._flush()
+        else:
+            self.blob += data
+        for field in metadata:
+            if field not in self.codes:
+                self.values[field] = []
+                self.interned[field] = {}
+                self.codes[field] = [-1] * row
+        for field, codes in self.codes.items():
+            if field not in metadata:
+                codes.append(-1)
+                continue
+            value = metadata[field]
+            interned = self.interned[field]
+            key = _intern_key(value)
+            code = interned.get(key)
+            if code is None:
+                code = interned[key] = len(self.values[field])
+                self.values[field].append(value)
+            codes.append(code)
+
+    def _flush(self) -> None:
+        self.blob += zlib.compress(bytes(self.pending))
+        self.blocks.append(len(self.blob))
+        self.pending.clear()
+
+    def build(self) -> ChunkStore:
+        """Freeze the accumulated chunks into a :class:`ChunkStore`."""
+        count = len(self.offsets) - 1
+        if self.compress and count % self.block_size:
+            self._flush()
+        fields = list(self.codes)
+        codes = np.full((len(fields), count), -1, dtype=np.int32)
+        for i, field in enumerate(fields):
+            codes[i] = self.codes[field]
+        return ChunkStore(
+            self.blob,
+            np.asarray(self.offsets, dtype=np.int64),
+            fields=fields,
+            values=[self.values[field] for field in fields],
+            codes=codes,
+            blocks=np.asarray(self.blocks, dtype=np.int64) if self.compress else None,
+            block_size=self.block_size,
+        )
+
+
+class ChunkStore:
+    """Column-oriented store of chunk texts and metadata.
+
+    Chunk texts are UTF-8 encoded into one contiguous blob addressed by an
+    ``int64`` offsets array. With ``compress=True`` the blob holds
+    zlib-compressed blocks of ``block_size`` chunks, so a lookup inflates a
+    single block; recently used blocks are kept in a small LRU cache.
+    Metadata is stored per field as a list of distinct values and an ``int32``
+    code per row (``-1`` where a chunk lacks the field), so values repeated
+    across thousands of chunks, like ``course`` or ``source``, are held once.
+    :class:`~langchain_core.documents.Document` objects are only created for
+    the rows that are actually requested.
+
+    A store written with :meth:`save` is reopened by :meth:`load` with the
+    text blob and arrays memory-mapped instead of read into memory.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> store = ChunkStore.from_documents(
+    ...     [Document(page_content="HW3 is due", metadata={"course": "ME201"})]
+    ... )
+    >>> store[0].page_content, store.metadata(0)
+    ('HW3 is due', {'course': 'ME201'})
+    """
+
+    def __init__(
+        self,
+        blob: bytes | bytearray | memoryview | mmap.mmap,
+        offsets: npt.NDArray[np.int64],
+        *,
+        fields: list[str],
+        values: list[list[Any]],
+        codes: npt.NDArray[np.int32],
+        blocks: npt.NDArray[np.int64] | None = None,
+        block_size: int = 64,
+    ) -> None:
+        self._blob = blob
+        self._offsets = offsets
+        self._blocks = blocks
+        self._block_size = block_size
+        self._fields = {field: i for i, field in enumerate(fields)}
+        self._values = values
+        self._codes = codes
+        self._inflated: LRUCache[bytes] = LRUCache(maxsize=16)
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[langchain_core.documents.Document],
+        *,
+        compress: bool = False,
+        block_size: int = 64,
+    ) -> ChunkStore:
+        """Pack ``documents`` into a new store, consuming them one at a time.
+
+        Parameters
+        ----------
+        documents : Iterable[Document]
+            Chunks in row order. A generator keeps peak memory to one chunk.
+        compress : bool, optional
+            Compress the text blob in zlib blocks. Defaults to ``False``.
+        block_size : int, optional
+            Chunks per compressed block. Defaults to ``64``.
+        """
+        builder = ChunkStoreBuilder(compress=compress, block_size=block_size)
+        for doc in documents:
+            builder.add(doc.page_content, doc.metadata)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> langchain_core.documents.Document:
+        """Materialize chunk ``row`` as a :class:`Document` with ``id=str(row)``."""
+        row = self._check(int(row))
+        return langchain_core.documents.Document(
+            id=str(row), page_content=self.text(row), metadata=self.metadata(row)
+        )
+
+    def __iter__(self) -> Iterator[langchain_core.documents.Document]:
+        return (self[row] for row in range(len(self)))
+
+    @property
+    def compressed(self) -> bool:
+        """Whether the text blob is stored in compressed blocks."""
+        return self._blocks is not None
+
+    @property
+    def fields(self) -> list[str]:
+        """Metadata fields present on at least one chunk."""
+        return list(self._fields)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the text blob and index arrays in bytes."""
+        size = len(self._blob) + self._offsets.nbytes + self._codes.nbytes
+        return size + (self._blocks.nbytes if self._blocks is not None else 0)
+
+    def _check(self, row: int) -> int:
+        if not -len(self) <= row < len(self):
+            msg = f"Chunk row {row} out of range for {len(self)} chunks"
+            raise IndexError(msg)
+        return row % len(self)
+
+    def text(self, row: int) -> str:
+        """Return the text of chunk ``row``."""
+        row = self._check(row)
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        if self._blocks is None:
+            return bytes(self._blob[start:end]).decode("utf-8")
+        block = row // self._block_size
+        base = int(self._offsets[block * self._block_size])
+        return self._block(block)[start - base : end - base].decode("utf-8")
+
+    def _block(self, block: int) -> bytes:
+        assert self._blocks is not None
+        data = self._inflated.get(block)
+        if data is None:
+            start, end = int(self._blocks[block]), int(self._blocks[block + 1])
+            data = zlib.decompress(self._blob[start:end])
+            self._inflated.put(block, data)
+        return data
+
+    def texts(self) -> Iterator[str]:
+        """Yield every chunk text in row order."""
+        return (self.text(row) for row in range(len(self)))
+
+    def metadata(self, row: int) -> dict[str, Any]:
+        """Return a fresh metadata dictionary for chunk ``row``."""
+        row = self._check(row)
+        return {
+            field: self._values[i][code]
+            for field, i in self._fields.items()
+            if (code := int(self._codes[i, row])) >= 0
+        }
+
+    def column(self, field: str) -> tuple[list[Any], npt.NDArray[np.int32]]:
+        """Return the distinct values of ``field`` and the per-row codes.
+
+        Rows without the field have code ``-1``; an unknown field yields no
+        values and all ``-1`` codes.
+        """
+        i = self._fields.get(field)
+        if i is None:
+            return [], np.full(len(self), -1, dtype=np.int32)
+        return self._values[i], self._codes[i]
+
+    def with_documents(
+        self, documents: Iterable[langchain_core.documents.Document]
+    ) -> ChunkStore:
+        """Return a new store holding these chunks followed by ``documents``."""
+        builder = ChunkStoreBuilder(
+            compress=self.compressed, block_size=self._block_size
+        )
+        for row in range(len(self)):
+            builder.add(self.text(row), self.metadata(row))
+        for doc in documents:
+            builder.add(doc.page_content, doc.metadata)
+        return builder.build()
+
+    def to_arrays(self) -> tuple[dict[str, Any], dict[str, npt.NDArray[Any]]]:
+        """Return a JSON-serializable header and the arrays backing the store.
+
+        The text blob is returned as a ``uint8`` array. :meth:`from_arrays`
+        reverses this without copying, so the arrays may be memory-mapped.
+        """
+        header: dict[str, Any] = {
+            "version": FORMAT_VERSION,
+            "count": len(self),
+            "compressed": self.compressed,
+            "block_size": self._block_size,
+            "fields": self.fields,
+            "values": self._values,
+        }
+        arrays: dict[str, npt.NDArray[Any]] = {
+            "text": np.frombuffer(self._blob, dtype=np.uint8),
+            "offsets": np.asarray(self._offsets),
+            "codes": np.asarray(self._codes),
+        }
+        if self._blocks is not None:
+            arrays["blocks"] = np.asarray(self._blocks)
+        return header, arrays
+
+    @classmethod
+    def from_arrays(
+        cls, header: Mapping[str, Any], arrays: Mapping[str, npt.NDArray[Any]]
+    ) -> ChunkStore:
+        """Rebuild a store from the output of :meth:`to_arrays`.
+
+        Raises
+        ------
+        ValueError
+            If the header was written by an incompatible format version.
+        """
+        if header.get("version") != FORMAT_VERSION:
+            msg = f"Unsupported chunk store version: {header.get('version')}"
+            raise ValueError(msg)
+        return cls(
+            arrays["text"].data,
+            arrays["offsets"],
+            fields=list(header["fields"]),
+            values=list(header["values"]),
+            codes=arrays["codes"],
+            blocks=arrays["blocks"] if header["compressed"] else None,
+            block_size=header["block_size"],
+        )
+
+    def save(self, directory: str | os.PathLike[str]) -> None:
+        """Write the store to ``directory`` for :meth:`load`.
+
+        Metadata values are stored as JSON, so values that are not JSON types
+        come back as strings and tuples come back as lists.
+        """
+        os.makedirs(directory, exist_ok=True)
+        header, arrays = self.to_arrays()
+        with open(os.path.join(directory, _TEXT), "wb") as file:
+            file.write(self._blob)
+        np.save(os.path.join(directory, _OFFSETS), arrays["offsets"])
+        np.save(os.path.join(directory, _CODES), arrays["codes"])
+        if "blocks" in arrays:
+            np.save(os.path.join(directory, _BLOCKS), arrays["blocks"])
+        with open(os.path.join(directory, _HEADER), "w", encoding="utf-8") as file:
+            json.dump(header, file, default=str)
+
+    @classmethod
+    def load(cls, directory: str | os.PathLike[str]) -> ChunkStore:
+        """Open a store written by :meth:`save`, memory-mapping its data.
+
+        Raises
+        ------
+        ValueError
+            If the directory was written by an incompatible format version.
+        """
+        with open(os.path.join(directory, _HEADER), encoding="utf-8") as file:
+            header = json.load(file)
+        if header.get("version") != FORMAT_VERSION:
+            msg = f"Unsupported chunk store version: {header.get('version')}"
+            raise ValueError(msg)
+        blob: bytes | bytearray | mmap.mmap = b""
+        if os.path.getsize(os.path.join(directory, _TEXT)):
+            with open(os.path.join(directory, _TEXT), "rb") as file:
+                blob = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        blocks = None
+        if header["compressed"]:
+            blocks = np.load(os.path.join(directory, _BLOCKS), mmap_mode="r")
+        return cls(
+            blob,
+            np.load(os.path.join(directory, _OFFSETS), mmap_mode="r"),
+            fields=header["fields"],
+            values=header["values"],
+            codes=np.load(os.path.join(directory, _CODES), mmap_mode="r"),
+            blocks=blocks,
+            block_size=header["block_size"],
+        )
@@ -0,0 +1,220 @@
+"""Expand vector search hits through a course graph."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from typing import Any, Mapping, Protocol, Union
+
+import langchain_core.callbacks.manager
+import langchain_core.documents
+import langchain_core.retrievers
+
+from rag_ed import tracing
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
+from rag_ed.retrievers.graph import GraphRetriever
+from rag_ed.retrievers.metadata import MetadataFilter
+
+SourceKey = Union[tuple[Any, str, Any], None]
+"""``(course, path, row)`` identifying the file a document was loaded from."""
+
+
+def source_key(metadata: Mapping[str, Any]) -> SourceKey:
+    """Return the key matching a chunk to the graph artifact it came from.
+
+    The loaders extract every export to a fresh temporary directory, so the
+    ``source`` path is taken relative to that directory; the ``course`` and
+    CSV ``row`` metadata tell apart files and rows sharing a path.
+
+    Examples
+    --------
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.gettempdir(), "tmpab12", "wiki_content", "hw.html")
+    >>> source_key({"source": path, "course": "ME201"})[1] == os.path.join(
+    ...     "wiki_content", "hw.html"
+    ... )
+    True
+    """
+    source = metadata.get("source")
+    if not source:
+        return None
+    path = os.path.normpath(str(source))
+    temp = os.path.join(os.path.normpath(tempfile.gettempdir()), "")
+    if path.startswith(temp):
+        path = path[len(temp) :].partition(os.sep)[2]
+    return metadata.get("course"), path, metadata.get("row")
+
+
+class ScoredRetriever(Protocol):
+    """Returns scored hits, as :meth:`VectorStoreRetriever.retrieve_with_scores`."""
+
+    def retrieve_with_scores(
+        self, query: str, k: int | None = None, *, filter: MetadataFilter | None = None
+    ) -> list[tuple[langchain_core.documents.Document, float]]: ...
+
+
+class GraphExpansionRetriever(langchain_core.retrievers.BaseRetriever):
+    """Follow the top vector hits of a query into a course graph.
+
+    A query is embedded and searched once by ``vector_retriever``. Each hit
+    is mapped to the graph artifacts loaded from the same file (see
+    :func:`source_key`), which become the seeds of a best-first
+    :meth:`GraphRetriever.retrieve_ranked` traversal over the graph's integer
+    adjacency arrays. A seed scores its best hit and every hop multiplies the
+    score by ``decay`` and the edge weight, so neighbours are ranked in the
+    units of the vector scores. No further embedding calls are made.
+
+    Results are the vector hits, best first, followed by the neighbouring
+    artifacts not already represented by a hit.
+
+    Parameters
+    ----------
+    vector_retriever : ScoredRetriever
+        Index of the course chunks, typically a :class:`VectorStoreRetriever`.
+    course_graph : CourseGraph or CSRCourseGraph
+        Graph of the same course exports.
+    fetch_k : int, optional
+        Vector hits per query. Defaults to ``5``.
+    k : int, optional
+        Neighbouring artifacts added per query. Defaults to ``5``.
+    max_depth : int, optional
+        Hops followed from the seeds. Defaults to ``1``.
+    decay : float, optional
+        Score multiplier per hop in ``(0, 1]``. Defaults to ``0.5``.
+    max_tokens : int, optional
+        Token budget of the added artifacts. Unlimited by default.
+    latency_budget : float, optional
+        Seconds allowed for a query, counted from the start of the vector
+        search. The traversal stops once the budget is spent and returns the
+        neighbours found so far; if the search alone exceeds it, only the
+        vector hits are returned. Unlimited by default.
+
+    Examples
+    --------
+    >>> retriever = GraphExpansionRetriever(
+    ...     VectorStoreRetriever("course.imscc", "piazza.zip"),
+    ...     graph_from_course("course.imscc", "piazza.zip", embeddings),
+    ...     max_depth=2,
+    ...     latency_budget=0.05,
+    ... )  # doctest: +SKIP
+    >>> retriever.retrieve_with_scores("HW3 late policy")  # doctest: +SKIP
+    """
+
+    def __init__(
+        self,
+        vector_retriever: ScoredRetriever,
+        course_graph: CourseGraph | CSRCourseGraph,
+        *,
+        fetch_k: int = 5,
+        k: int = 5,
+        max_depth: int = 1,
+        decay: float = 0.5,
+        max_tokens: int | None = None,
+        latency_budget: float | None = None,
+    ) -> None:
+        if fetch_k <= 0:
+            msg = "fetch_k must be positive"
+            raise ValueError(msg)
+        if max_depth < 0:
+            msg = "max_depth must be non-negative"
+            raise ValueError(msg)
+        if latency_budget is not None and latency_budget < 0:
+            msg = "latency_budget must be non-negative"
+            raise ValueError(msg)
+        super().__init__()
+        self._vector = vector_retriever
+        self._graph = course_graph
+        self._fetch_k = fetch_k
+        self._latency_budget = latency_budget
+        # Validates ``k``, ``max_tokens`` and ``decay``; ranked traversals do
+        # not use the neighbourhood cache.
+        self._expander = GraphRetriever(
+            course_graph,
+            max_depth=max_depth,
+            cache_size=0,
+            k=k,
+            max_tokens=max_tokens,
+            decay=decay,
+        )
+        self._sources: dict[SourceKey, list[str]] | None = None
+        self._sources_version = course_graph.version
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: langchain_core.callbacks.manager.CallbackManagerForRetrieverRun,
+    ) -> list[langchain_core.documents.Document]:
+        with tracing.callbacks(run_manager):
+            return self.retrieve(query)
+
+    def retrieve(
+        self, query: str, *, filter: MetadataFilter | None = None
+    ) -> list[langchain_core.documents.Document]:
+        """Return the vector hits for ``query`` followed by their neighbours."""
+        return [doc for doc, _ in self.retrieve_with_scores(query, filter=filter)]
+
+    def retrieve_with_scores(
+        self, query: str, *, filter: MetadataFilter | None = None
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Return ``(document, score)`` pairs for ``query``.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        filter : MetadataFilter, optional
+            Metadata constraints on the vector hits, as in
+            :meth:`VectorStoreRetriever.retrieve`. Neighbours are not
+            filtered.
+
+        Returns
+        -------
+        list[tuple[Document, float]]
+            The vector hits with their scores, best first, then the added
+            artifacts with their propagated scores, best first.
+        """
+        start = time.perf_counter()
+        deadline = None
+        if self._latency_budget is not None:
+            deadline = start + self._latency_budget
+        with tracing.span("graph_expand", fetch_k=self._fetch_k) as span:
+            hits = self._vector.retrieve_with_scores(
+                query, self._fetch_k, filter=filter
+            )
+            seeds: dict[str, float] = {}
+            for doc, score in hits:
+                for artifact_id in self.artifacts(doc):
+                    if artifact_id not in seeds or score > seeds[artifact_id]:
+                        seeds[artifact_id] = score
+            span.count("hits", len(hits))
+            span.count("seeds", len(seeds))
+            if not seeds:
+                return list(hits)
+            if deadline is not None and time.perf_counter() >= deadline:
+                span.set(expired=True)
+                return list(hits)
+            neighbours = self._expander.retrieve_ranked(
+                list(seeds), scores=list(seeds.values()), deadline=deadline
+            )
+            span.count("documents", len(neighbours))
+        return list(hits) + neighbours
+
+    def artifacts(self, document: langchain_core.documents.Document) -> list[str]:
+        """Return the graph artifacts loaded from the same file as ``document``.
+
+        The lookup table over the graph's documents is built on first use and
+        rebuilt after the graph changes.
+        """
+        version = self._graph.version
+        if self._sources is None or version != self._sources_version:
+            sources: dict[SourceKey, list[str]] = {}
+            for artifact_id, doc in zip(self._graph.ids, self._graph.documents):
+                key = source_key(doc.metadata)
+                if key is not None:
+                    sources.setdefault(key, []).append(artifact_id)
+            self._sources = sources
+            self._sources_version = version
+        key = source_key(document.metadata)
+        return self._sources.get(key, []) if key is not None else []
@@ -2,24 +2,78 @@
 
 from __future__ import annotations
 
-from collections import deque
+import heapq
+import time
+from typing import Callable, Sequence
 
 import langchain_core.callbacks.manager
 import langchain_core.documents
+import langchain_core.embeddings
 import langchain_core.retrievers
+import numpy as np
+import numpy.typing as npt
 
-from rag_ed.graphs import CourseGraph
+from rag_ed import tracing
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
+from rag_ed.graphs.pagerank import PageRank
+from rag_ed.retrievers.cache import CacheStats, LRUCache
+from rag_ed.retrievers.lexical import BM25Index, top_k
+
+_SMALL_FRONTIER = 16
+"""Frontiers up to this size are expanded with Python row slices."""
+
+_SMALL_MERGE = 2048
+"""Cached neighbourhoods up to this total size are merged with a Python dict."""
+
+_DEADLINE_CHECKS = 32
+"""Ranked traversals check their deadline once per this many expanded nodes."""
+
+_WARM_STARTS = 32
+"""PageRank score vectors kept for warm starts; each holds one float per node."""
+
+Neighbourhood = tuple[npt.NDArray[np.int32], npt.NDArray[np.int64]]
+"""``(nodes, offsets)``: nodes at distance ``d + 1`` are
+``nodes[offsets[d]:offsets[d + 1]]``."""
 
 
 class GraphRetriever(langchain_core.retrievers.BaseRetriever):
     """Traverse a :class:`~rag_ed.graphs.CourseGraph` to fetch related documents.
 
+    Traversals run over the graph's integer CSR :attr:`adjacency` one
+    frontier at a time. The ``k``-hop neighbourhood of every start artifact
+    is kept in a bounded LRU cache, so expanding the same hits for many
+    queries reuses earlier traversals; the cache is dropped whenever the
+    graph's ``version`` changes.
+
+    As a LangChain retriever, a query naming an artifact is expanded from
+    that artifact. Any other query is first matched against the documents of
+    the graph by an :class:`EntryIndex`; its top ``seeds`` artifacts are
+    returned, followed by their expansion.
+
     Parameters
     ----------
-    course_graph : CourseGraph
+    course_graph : CourseGraph or CSRCourseGraph
         Graph containing course artifacts.
     max_depth : int, optional
         Maximum traversal depth. Defaults to ``1``.
+    cache_size : int, optional
+        Neighbourhoods kept in the cache, one per start artifact and depth.
+        ``0`` disables caching. Defaults to ``1024``.
+    k : int, optional
+        Documents returned by :meth:`retrieve_ranked`. Setting ``k`` or
+        ``max_tokens`` makes LangChain calls use the ranked traversal.
+    max_tokens : int, optional
+        Token budget of the documents returned by :meth:`retrieve_ranked`.
+    decay : float, optional
+        Score multiplier per hop in ranked traversals. Defaults to ``0.5``.
+    length : Callable[[str], int], optional
+        Counts the tokens of a document for ``max_tokens``. Defaults to
+        :func:`~rag_ed.retrievers.chunking.count_tokens`.
+    seeds : int, optional
+        Entry artifacts a text query starts from. Defaults to ``3``.
+    embeddings : Embeddings, optional
+        Model for an embedding-based entry index; BM25 over the documents'
+        ``page_content`` by default.
 
     Examples
     --------
@@ -34,9 +88,50 @@ class GraphRetriever(langchain_core.retrievers.BaseRetriever):
     ['B']
     """
 
-    def __init__(self, course_graph: CourseGraph, *, max_depth: int = 1) -> None:
+    def __init__(
+        self,
+        course_graph: CourseGraph | CSRCourseGraph,
+        *,
+        max_depth: int = 1,
+        cache_size: int = 1024,
+        k: int | None = None,
+        max_tokens: int | None = None,
+        decay: float = 0.5,
+        length: Callable[[str], int] | None = None,
+        seeds: int = 3,
+        embeddings: langchain_core.embeddings.Embeddings | None = None,
+    ) -> None:
+        if cache_size < 0:
+            msg = "cache_size must be non-negative"
+            raise ValueError(msg)
+        if seeds <= 0:
+            msg = "seeds must be positive"
+            raise ValueError(msg)
+        _check_budget(k, max_tokens, decay)
+        # Initializes the callback fields ``invoke`` reads.
+        super().__init__()
         self._graph = course_graph
         self._max_depth = max_depth
+        self._cache: LRUCache[Neighbourhood] | None = (
+            LRUCache(cache_size) if cache_size else None
+        )
+        self._cache_version = course_graph.version
+        self._k = k
+        self._max_tokens = max_tokens
+        self._decay = decay
+        self._length = length
+        self._token_counts: dict[int, int] = {}
+        self._ranker: PageRank | None = None
+        self._warm_starts: LRUCache[npt.NDArray[np.float32]] = LRUCache(_WARM_STARTS)
+        self._seeds = seeds
+        self._embeddings = embeddings
+        self._entry: EntryIndex | None = None
+        self._entry_vectors: dict[str, npt.NDArray[np.float32]] = {}
+
+    @property
+    def cache_stats(self) -> CacheStats | None:
+        """Hit and miss counters of the neighbourhood cache, if enabled."""
+        return self._cache.stats if self._cache is not None else None
 
     def _get_relevant_documents(
         self,
@@ -44,39 +139,623 @@ class GraphRetriever(langchain_core.retrievers.BaseRetriever):
         *,
         run_manager: langchain_core.callbacks.manager.CallbackManagerForRetrieverRun,
     ) -> list[langchain_core.documents.Document]:
-        return self.retrieve(query, max_depth=self._max_depth)
+        with tracing.callbacks(run_manager):
+            if query in self._graph:
+                seeds, scores = [query], None
+            else:
+                hits = self.entry_points(query)
+                if not hits:
+                    return []
+                seeds = [artifact_id for artifact_id, _ in hits]
+                # The best entry scores 1, like an artifact named directly.
+                scores = [score / hits[0][1] for _, score in hits]
+            if self._k is None and self._max_tokens is None:
+                docs = self.retrieve_many(seeds, max_depth=self._max_depth)
+                if scores is not None:
+                    docs = [self._graph.document(a) for a in seeds] + docs
+                return docs
+            ranked = self.retrieve_ranked(
+                seeds, scores=scores, include_seeds=scores is not None
+            )
+            return [doc for doc, _ in ranked]
+
+    def entry_points(
+        self, query: str, *, k: int | None = None
+    ) -> list[tuple[str, float]]:
+        """Return the artifacts best matching a free-text ``query``.
+
+        The :class:`EntryIndex` is built on first use and rebuilt after the
+        graph changes; with ``embeddings``, only documents whose text was not
+        embedded before are sent to the model.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        k : int, optional
+            Number of artifacts. Defaults to the retriever's ``seeds``.
+
+        Returns
+        -------
+        list[tuple[str, float]]
+            Artifact ids with their BM25 score or cosine similarity, best
+            first; only positive scores are returned.
+        """
+        k = k if k is not None else self._seeds
+        with tracing.span("graph_entry", k=k) as span:
+            self._sync()
+            if self._entry is None:
+                self._entry = EntryIndex(
+                    self._graph.documents,
+                    embeddings=self._embeddings,
+                    cache=self._entry_vectors,
+                )
+            hits = self._entry.search(query, k)
+            span.count("seeds", len(hits))
+        ids = self._graph.ids
+        return [(ids[row], score) for row, score in hits]
 
     def retrieve(
         self, artifact_id: str, *, max_depth: int | None = None
     ) -> list[langchain_core.documents.Document]:
         """Return documents connected to ``artifact_id`` within ``max_depth``.
 
+        Documents are returned in breadth-first order.
+
         Raises
         ------
         ValueError
             If ``artifact_id`` is absent from the graph or ``max_depth`` is
             negative.
         """
-        if artifact_id not in self._graph.graph:
-            msg = f"Artifact '{artifact_id}' not found in course graph"
+        return self.retrieve_many([artifact_id], max_depth=max_depth)
+
+    def retrieve_many(
+        self, artifact_ids: Sequence[str], *, max_depth: int | None = None
+    ) -> list[langchain_core.documents.Document]:
+        """Return documents within ``max_depth`` of any of ``artifact_ids``.
+
+        All start artifacts share one visited set, so a document reachable
+        from several of them is returned once, at its shortest distance.
+        Documents are ordered by that distance, then by the order of the
+        start artifact reaching them. The start artifacts themselves are not
+        returned.
+
+        Parameters
+        ----------
+        artifact_ids : Sequence[str]
+            Start artifacts, for example the sources of the top vector hits.
+        max_depth : int, optional
+            Maximum number of hops. Defaults to the retriever's ``max_depth``.
+
+        Raises
+        ------
+        ValueError
+            If an artifact is absent from the graph or ``max_depth`` is
+            negative.
+        """
+        for artifact_id in artifact_ids:
+            if artifact_id not in self._graph:
+                msg = f"Artifact '{artifact_id}' not found in course graph"
+                raise ValueError(msg)
+
+        depth = max_depth if max_depth is not None else self._max_depth
+        if depth < 0:
+            msg = "max_depth must be non-negative"
             raise ValueError(msg)
 
+        with tracing.span(
+            "graph_traverse", depth=depth, seeds=len(artifact_ids)
+        ) as span:
+            starts = list(dict.fromkeys(self._graph.index(a) for a in artifact_ids))
+            seeds = np.array(starts, dtype=np.int32)
+            indptr, indices = self._graph.adjacency
+            if self._cache is None:
+                nodes, _ = expand(indptr, indices, seeds, depth)
+            else:
+                nodes = self._merge(
+                    [self._neighbourhood(indptr, indices, s, depth) for s in starts],
+                    seeds,
+                    depth,
+                    len(indptr) - 1,
+                )
+            documents = self._graph.documents
+            docs = [documents[i] for i in nodes.tolist()]
+            span.count("documents", len(docs))
+        return docs
+
+    def retrieve_ranked(
+        self,
+        artifact_ids: Sequence[str],
+        *,
+        k: int | None = None,
+        max_tokens: int | None = None,
+        max_depth: int | None = None,
+        decay: float | None = None,
+        scores: Sequence[float] | None = None,
+        include_seeds: bool = False,
+        deadline: float | None = None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Return the best-scoring documents around ``artifact_ids``.
+
+        A start artifact scores ``1`` (or its entry in ``scores``) and each
+        hop multiplies the score by ``decay`` and the edge weight, clipped to
+        ``[0, 1]``; a document keeps its best score over all paths. Documents
+        are found best-first with a heap, so scores never increase along the
+        way and the search stops as soon as ``k`` documents are found or the
+        next one would exceed ``max_tokens``: the cost depends on the budget,
+        not on the size of the graph.
+
+        Parameters
+        ----------
+        artifact_ids : Sequence[str]
+            Start artifacts; they are not returned unless ``include_seeds``.
+        k : int, optional
+            Maximum number of documents. Defaults to the retriever's ``k``;
+            unlimited if neither is set.
+        max_tokens : int, optional
+            Maximum total tokens of the returned documents. Defaults to the
+            retriever's ``max_tokens``; unlimited if neither is set.
+        max_depth : int, optional
+            Maximum number of hops. Defaults to the retriever's ``max_depth``.
+        decay : float, optional
+            Score multiplier per hop in ``(0, 1]``. Defaults to the
+            retriever's ``decay``.
+        scores : Sequence[float], optional
+            Score of each start artifact, such as its vector similarity.
+        include_seeds : bool, optional
+            Return the start artifacts too, ranked by their own score and
+            counted against ``k`` and ``max_tokens``. Defaults to ``False``.
+        deadline : float, optional
+            :func:`time.perf_counter` value at which the search stops early
+            and returns the documents found so far.
+
+        Returns
+        -------
+        list[tuple[Document, float]]
+            Documents with their scores, best first.
+
+        Raises
+        ------
+        ValueError
+            If an artifact is absent from the graph, or a budget, depth or
+            decay is out of range.
+        """
+        k = k if k is not None else self._k
+        max_tokens = max_tokens if max_tokens is not None else self._max_tokens
+        decay = decay if decay is not None else self._decay
         depth = max_depth if max_depth is not None else self._max_depth
+        _check_budget(k, max_tokens, decay)
         if depth < 0:
             msg = "max_depth must be non-negative"
             raise ValueError(msg)
+        if scores is not None and len(scores) != len(artifact_ids):
+            msg = "scores must have one entry per artifact"
+            raise ValueError(msg)
+        for artifact_id in artifact_ids:
+            if artifact_id not in self._graph:
+                msg = f"Artifact '{artifact_id}' not found in course graph"
+                raise ValueError(msg)
 
-        visited = {artifact_id}
-        docs: list[langchain_core.documents.Document] = []
-        queue: deque[tuple[str, int]] = deque([(artifact_id, 0)])
-        while queue:
-            node, d = queue.popleft()
-            if d >= depth:
-                continue
-            for neighbor in self._graph.graph.neighbors(node):
-                if neighbor in visited:
+        with tracing.span("graph_rank", depth=depth, seeds=len(artifact_ids)) as span:
+            self._sync()
+            indptr, indices = self._graph.adjacency
+            weights = self._graph.weights
+            documents = self._graph.documents
+            best: dict[int, float] = {}
+            for i, artifact_id in enumerate(artifact_ids):
+                node = self._graph.index(artifact_id)
+                score = float(scores[i]) if scores is not None else 1.0
+                best[node] = max(score, best.get(node, score))
+            seeds = set(best)
+            heap = [(-score, node, 0) for node, score in best.items()]
+            heapq.heapify(heap)
+            done: set[int] = set()
+            found: list[tuple[langchain_core.documents.Document, float]] = []
+            used = 0
+            while heap:
+                if (
+                    deadline is not None
+                    and not len(done) % _DEADLINE_CHECKS
+                    and time.perf_counter() >= deadline
+                ):
+                    span.set(expired=True)
+                    break
+                negative, node, d = heapq.heappop(heap)
+                if node in done:
                     continue
-                visited.add(neighbor)
-                queue.append((neighbor, d + 1))
-                docs.append(self._graph.graph.nodes[neighbor]["document"])
-        return docs
+                done.add(node)
+                score = -negative
+                if include_seeds or node not in seeds:
+                    if max_tokens is not None:
+                        used += self._tokens(node)
+                        if used > max_tokens:
+                            break
+                    found.append((documents[node], score))
+                    if k is not None and len(found) >= k:
+                        break
+                if d >= depth:
+                    continue
+                start, end = indptr[node], indptr[node + 1]
+                for target, weight in zip(
+                    indices[start:end].tolist(), weights[start:end].tolist()
+                ):
+                    candidate = score * decay * min(max(weight, 0.0), 1.0)
+                    if candidate > best.get(target, 0.0) and target not in done:
+                        best[target] = candidate
+                        heapq.heappush(heap, (-candidate, target, d + 1))
+            span.count("expanded", len(done))
+            span.count("documents", len(found))
+        return found
+
+    def retrieve_pagerank(
+        self,
+        artifact_ids: Sequence[str],
+        *,
+        k: int | None = None,
+        scores: Sequence[float] | None = None,
+        damping: float = 0.5,
+        tol: float = 1e-4,
+        max_iter: int = 100,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Rank the whole graph by personalized PageRank from ``artifact_ids``.
+
+        Unlike the traversals, scores account for every path between the
+        seeds and a document, so artifacts linked from several seeds, or
+        through many routes, rank higher. See :meth:`retrieve_pagerank_many`
+        for the parameters.
+        """
+        return self.retrieve_pagerank_many(
+            [artifact_ids],
+            k=k,
+            scores=None if scores is None else [scores],
+            damping=damping,
+            tol=tol,
+            max_iter=max_iter,
+        )[0]
+
+    def retrieve_pagerank_many(
+        self,
+        seed_sets: Sequence[Sequence[str]],
+        *,
+        k: int | None = None,
+        scores: Sequence[Sequence[float]] | None = None,
+        damping: float = 0.5,
+        tol: float = 1e-4,
+        max_iter: int = 100,
+    ) -> list[list[tuple[langchain_core.documents.Document, float]]]:
+        """Run personalized PageRank for several seed sets in one iteration.
+
+        The seed sets become the columns of one personalization matrix, so
+        they share every sparse matrix product. The walk operator is built
+        once per graph version, and the converged scores of recent seed sets
+        warm-start later runs with the same seeds, which then converge in a
+        few iterations even after the graph changed.
+
+        Parameters
+        ----------
+        seed_sets : Sequence[Sequence[str]]
+            Artifacts to restart the walk from, one sequence per query.
+        k : int, optional
+            Documents returned per seed set. Defaults to the retriever's
+            ``k``, else ``10``.
+        scores : Sequence[Sequence[float]], optional
+            Restart weight of each seed, such as its vector similarity;
+            uniform by default.
+        damping : float, optional
+            Probability of following an edge rather than restarting.
+            Defaults to ``0.5``.
+        tol : float, optional
+            L1 convergence tolerance. Defaults to ``1e-4``.
+        max_iter : int, optional
+            Iteration cap. Defaults to ``100``.
+
+        Returns
+        -------
+        list[list[tuple[Document, float]]]
+            For each seed set, its top documents and PageRank scores, best
+            first. Seeds are not returned.
+
+        Raises
+        ------
+        ValueError
+            If an artifact is absent from the graph or a parameter is out of
+            range.
+        """
+        k = k if k is not None else self._k if self._k is not None else 10
+        _check_budget(k, None, 1.0)
+        if scores is not None and (
+            len(scores) != len(seed_sets)
+            or any(len(w) != len(s) for w, s in zip(scores, seed_sets))
+        ):
+            msg = "scores must have one entry per artifact"
+            raise ValueError(msg)
+        for artifact_id in (a for seeds in seed_sets for a in seeds):
+            if artifact_id not in self._graph:
+                msg = f"Artifact '{artifact_id}' not found in course graph"
+                raise ValueError(msg)
+        if not seed_sets:
+            return []
+
+        with tracing.span("graph_pagerank", seed_sets=len(seed_sets), k=k) as span:
+            self._sync()
+            if self._ranker is None:
+                self._ranker = PageRank.from_graph(self._graph)
+            ranker = self._ranker
+            restart = np.zeros((ranker.size, len(seed_sets)), dtype=np.float32)
+            start = restart.copy()
+            keys = []
+            for column, seeds in enumerate(seed_sets):
+                weights = scores[column] if scores is not None else [1.0] * len(seeds)
+                for artifact_id, weight in zip(seeds, weights):
+                    restart[self._graph.index(artifact_id), column] += weight
+                rows = np.flatnonzero(restart[:, column])
+                key = (tuple(rows.tolist()), tuple(restart[rows, column].tolist()))
+                keys.append(key)
+                previous = self._warm_starts.get(key)
+                if previous is None:
+                    start[:, column] = restart[:, column]
+                else:
+                    # Artifacts added since start with no mass.
+                    start[: len(previous), column] = previous
+            result, iterations = ranker.run(
+                restart, damping=damping, tol=tol, max_iter=max_iter, start=start
+            )
+            documents = self._graph.documents
+            ranked = []
+            for column, key in enumerate(keys):
+                self._warm_starts.put(key, result[:, column].copy())
+                column_scores = result[:, column].copy()
+                column_scores[list(key[0])] = -np.inf
+                top = np.argpartition(-column_scores, min(k, len(column_scores) - 1))
+                top = top[:k]
+                top = top[np.argsort(-column_scores[top], kind="stable")]
+                ranked.append(
+                    [
+                        (documents[i], float(column_scores[i]))
+                        for i in top.tolist()
+                        if column_scores[i] > 0
+                    ]
+                )
+            span.count("iterations", iterations)
+        return ranked
+
+    def _sync(self) -> int:
+        """Drop caches of an older graph version; return the current version."""
+        version = self._graph.version
+        if version != self._cache_version:
+            if self._cache is not None:
+                self._cache.clear()
+            self._token_counts.clear()
+            self._ranker = None
+            self._entry = None
+            self._cache_version = version
+        return version
+
+    def _tokens(self, node: int) -> int:
+        count = self._token_counts.get(node)
+        if count is None:
+            length = self._length
+            if length is None:
+                from rag_ed.retrievers.chunking import count_tokens
+
+                length = count_tokens
+            count = self._token_counts[node] = length(
+                self._graph.documents[node].page_content
+            )
+        return count
+
+    def _neighbourhood(
+        self,
+        indptr: npt.NDArray[np.int64],
+        indices: npt.NDArray[np.int32],
+        seed: int,
+        depth: int,
+    ) -> Neighbourhood:
+        assert self._cache is not None
+        version = self._sync()
+        key = (version, seed, depth)
+        hood = self._cache.get(key)
+        if hood is None:
+            hood = expand(indptr, indices, np.array([seed], dtype=np.int32), depth)
+            self._cache.put(key, hood)
+        return hood
+
+    @staticmethod
+    def _merge(
+        hoods: list[Neighbourhood],
+        seeds: npt.NDArray[np.int32],
+        depth: int,
+        size: int,
+    ) -> npt.NDArray[np.int32]:
+        """Union per-seed neighbourhoods level by level.
+
+        Each node is kept once, at its shortest distance from any seed.
+        """
+        if len(hoods) == 1:
+            return hoods[0][0]
+        if sum(len(nodes) for nodes, _ in hoods) <= _SMALL_MERGE:
+            # Seeds first, then every level in turn; the dict keeps the first
+            # occurrence of each node.
+            order = seeds.tolist()
+            for d in range(depth):
+                order += np.concatenate(
+                    [nodes[offsets[d] : offsets[d + 1]] for nodes, offsets in hoods]
+                ).tolist()
+            merged = list(dict.fromkeys(order))[len(seeds) :]
+            return np.array(merged, dtype=np.int32)
+        visited = np.zeros(size, dtype=bool)
+        visited[seeds] = True
+        levels = []
+        for d in range(depth):
+            level = np.concatenate(
+                [nodes[offsets[d] : offsets[d + 1]] for nodes, offsets in hoods]
+            )
+            level = _first_occurrences(level[~visited[level]])
+            visited[level] = True
+            levels.append(level)
+        return np.concatenate(levels) if levels else np.empty(0, dtype=np.int32)
+
+
+class EntryIndex:
+    """Map free-text queries to the documents of a course graph.
+
+    By default a :class:`~rag_ed.retrievers.lexical.BM25Index` over the
+    documents' ``page_content``; a query sums a few postings slices, so
+    lookups take well under a millisecond on course-sized graphs. With
+    ``embeddings`` every document is embedded once and queries are scored by
+    one matrix-vector product.
+
+    Parameters
+    ----------
+    documents : Sequence[Document]
+        Documents by integer artifact id.
+    embeddings : Embeddings, optional
+        Model embedding documents and queries.
+    cache : dict[str, numpy.ndarray], optional
+        Document vectors by text, filled as documents are embedded. Passing
+        the dict of an earlier index embeds only new or changed texts.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> index = EntryIndex([Document(page_content="HW3 is due"),
+    ...                     Document(page_content="Midterm review")])
+    >>> [row for row, _ in index.search("midterm", k=1)]
+    [1]
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[langchain_core.documents.Document],
+        *,
+        embeddings: langchain_core.embeddings.Embeddings | None = None,
+        cache: dict[str, npt.NDArray[np.float32]] | None = None,
+    ) -> None:
+        texts = [document.page_content for document in documents]
+        self.embeddings = embeddings
+        self._lexical: BM25Index | None = None
+        self._vectors: npt.NDArray[np.float32] | None = None
+        if embeddings is None:
+            self._lexical = BM25Index(texts)
+            return
+        cache = {} if cache is None else cache
+        missing = [text for text in dict.fromkeys(texts) if text not in cache]
+        if missing:
+            for text, vector in zip(missing, embeddings.embed_documents(missing)):
+                cache[text] = np.asarray(vector, dtype=np.float32)
+        if not texts:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            return
+        vectors = np.stack([cache[text] for text in texts])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._vectors = (vectors / np.where(norms > 0, norms, 1.0)).astype(
+            np.float32, copy=False
+        )
+
+    def __len__(self) -> int:
+        if self._lexical is not None:
+            return len(self._lexical)
+        assert self._vectors is not None
+        return len(self._vectors)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(row, score)`` pairs with a positive score."""
+        if self._lexical is not None:
+            return self._lexical.search(query, k)
+        assert self._vectors is not None and self.embeddings is not None
+        if not len(self._vectors):
+            return []
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return top_k(self._vectors @ vector / (norm or 1.0), k)
+
+
+def _check_budget(k: int | None, max_tokens: int | None, decay: float) -> None:
+    if k is not None and k <= 0:
+        msg = "k must be positive"
+        raise ValueError(msg)
+    if max_tokens is not None and max_tokens <= 0:
+        msg = "max_tokens must be positive"
+        raise ValueError(msg)
+    if not 0.0 < decay <= 1.0:
+        msg = "decay must be in (0, 1]"
+        raise ValueError(msg)
+
+
+def expand(
+    indptr: npt.NDArray[np.int64],
+    indices: npt.NDArray[np.int32],
+    seeds: npt.NDArray[np.int32],
+    depth: int,
+) -> Neighbourhood:
+    """Breadth-first expansion from ``seeds`` over CSR adjacency arrays.
+
+    Each hop gathers the targets of the whole frontier with one vectorized
+    slice, drops visited nodes and keeps the first occurrence of the rest.
+
+    Parameters
+    ----------
+    indptr, indices : numpy.ndarray
+        CSR adjacency as returned by ``CourseGraph.adjacency``.
+    seeds : numpy.ndarray
+        Integer ids to start from; they are excluded from the result.
+    depth : int
+        Number of hops.
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        Reached nodes in breadth-first order and ``depth + 1`` offsets
+        delimiting the nodes found at each hop.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> indptr, indices = np.array([0, 1, 2, 2]), np.array([1, 2], dtype=np.int32)
+    >>> nodes, offsets = expand(indptr, indices, np.array([0]), 3)
+    >>> nodes.tolist(), offsets.tolist()
+    ([1, 2], [0, 1, 2, 2])
+    """
+    visited = np.zeros(len(indptr) - 1, dtype=bool)
+    visited[seeds] = True
+    frontier = np.asarray(seeds, dtype=np.int32)
+    levels = []
+    for _ in range(depth):
+        if len(frontier) <= _SMALL_FRONTIER:
+            # A few row slices beat the fixed cost of the vectorized gather.
+            targets = [
+                t
+                for u in frontier.tolist()
+                for t in indices[indptr[u] : indptr[u + 1]].tolist()
+            ]
+            frontier = np.fromiter(
+                (t for t in dict.fromkeys(targets) if not visited[t]), dtype=np.int32
+            )
+        else:
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            # Offset of every edge of the frontier: its row start plus its
+            # rank within the row.
+            ranks = np.arange(int(counts.sum())) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            found = indices[np.repeat(starts, counts) + ranks]
+            frontier = _first_occurrences(found[~visited[found]])
+        if not len(frontier):
+            break
+        visited[frontier] = True
+        levels.append(frontier)
+    sizes = [len(level) for level in levels] + [0] * (depth - len(levels))
+    offsets = np.zeros(depth + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    nodes = np.concatenate(levels) if levels else np.empty(0, dtype=np.int32)
+    return nodes, offsets
+
+
+def _first_occurrences(values: npt.NDArray[np.int32]) -> npt.NDArray[np.int32]:
+    """Drop repeated values, keeping the first occurrence of each in order."""
+    if len(values) < 2:
+        return values
+    _, first = np.unique(values, return_index=True)
+    return values[np.sort(first)]
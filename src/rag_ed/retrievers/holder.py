@@ -0,0 +1,204 @@
+"""Versioned holder for hot-swapping a retrieval index in a running process."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import threading
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class IndexHolder(Generic[T]):
+    """Serve one version of an index while the next one is built.
+
+    Readers take a :meth:`lease` (or call :meth:`get`) and keep the version
+    they were handed for as long as they hold it. :meth:`refresh_async`
+    builds a replacement in a background thread and :meth:`swap` installs it
+    under a lock, so readers never see a half-built index and never wait for
+    a build. The holder drops its reference to the old version on swap; the
+    old index is freed once its last in-flight lease ends, after
+    ``on_retire`` has been called for it.
+
+    Both versions are alive while a build runs, so peak memory is about twice
+    that of one index.
+
+    Parameters
+    ----------
+    build : Callable[[], T]
+        Builds a fresh index, for example from the latest course exports or
+        snapshot file.
+    on_retire : Callable[[T], None], optional
+        Called with a replaced version once no lease holds it anymore, for
+        releasing resources that garbage collection does not, such as worker
+        pools.
+
+    Examples
+    --------
+    >>> holder = IndexHolder(lambda: {"hw3": "due Friday"})
+    >>> holder.refresh()
+    1
+    >>> with holder.lease() as index:
+    ...     index["hw3"]
+    'due Friday'
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], T],
+        *,
+        on_retire: Callable[[T], None] | None = None,
+    ) -> None:
+        self._build = build
+        self._on_retire = on_retire
+        self._lock = threading.Lock()
+        self._current: T | None = None
+        self._version = 0
+        self._leases: dict[int, int] = {}
+        self._retired: dict[int, T] = {}
+        self._pending: concurrent.futures.Future[int] | None = None
+        self.error: Exception | None = None
+
+    @property
+    def version(self) -> int:
+        """Version of the current index; ``0`` until the first swap."""
+        return self._version
+
+    @property
+    def ready(self) -> bool:
+        """Whether an index has been installed."""
+        return self._current is not None
+
+    @property
+    def refreshing(self) -> bool:
+        """Whether a background build started by :meth:`refresh_async` runs."""
+        return self._pending is not None
+
+    @property
+    def draining(self) -> int:
+        """Number of replaced versions still held by in-flight leases."""
+        with self._lock:
+            return sum(1 for version in self._leases if version != self._version)
+
+    def get(self) -> T:
+        """Return the current index without tracking the reader.
+
+        Raises
+        ------
+        RuntimeError
+            If no index has been installed yet.
+        """
+        current = self._current
+        if current is None:
+            msg = "index is not loaded yet"
+            raise RuntimeError(msg)
+        return current
+
+    @contextlib.contextmanager
+    def lease(self) -> Iterator[T]:
+        """Hold the current index for the duration of a ``with`` block.
+
+        Every lookup inside the block sees the same version even if a swap
+        happens meanwhile; ``on_retire`` for that version waits until the
+        block exits.
+
+        Raises
+        ------
+        RuntimeError
+            If no index has been installed yet.
+        """
+        with self._lock:
+            if self._current is None:
+                msg = "index is not loaded yet"
+                raise RuntimeError(msg)
+            version, index = self._version, self._current
+            self._leases[version] = self._leases.get(version, 0) + 1
+        try:
+            yield index
+        finally:
+            retired = None
+            with self._lock:
+                self._leases[version] -= 1
+                if not self._leases[version]:
+                    del self._leases[version]
+                    retired = self._retired.pop(version, None)
+            if retired is not None:
+                self._retire(retired)
+
+    def swap(self, index: T) -> int:
+        """Install ``index`` as the next version and return its number."""
+        retired = None
+        with self._lock:
+            old, old_version = self._current, self._version
+            self._current = index
+            self._version += 1
+            version = self._version
+            self.error = None
+            if old is not None and self._on_retire is not None:
+                if self._leases.get(old_version):
+                    self._retired[old_version] = old
+                else:
+                    retired = old
+        if retired is not None:
+            self._retire(retired)
+        return version
+
+    def refresh(self) -> int:
+        """Build a new index in the calling thread and swap it in.
+
+        Returns
+        -------
+        int
+            The new version.
+
+        Raises
+        ------
+        Exception
+            Whatever ``build`` raised; it is also kept in :attr:`error` and the
+            current version stays in service.
+        """
+        try:
+            index = self._build()
+        except Exception as exc:
+            self.error = exc
+            raise
+        return self.swap(index)
+
+    def refresh_async(self) -> concurrent.futures.Future[int]:
+        """Start :meth:`refresh` in a daemon thread.
+
+        Calls made while a build is running share it instead of starting
+        another one.
+
+        Returns
+        -------
+        concurrent.futures.Future[int]
+            Resolves to the new version, or to the build error.
+        """
+        with self._lock:
+            if self._pending is not None:
+                return self._pending
+            future: concurrent.futures.Future[int] = concurrent.futures.Future()
+            self._pending = future
+
+        def run() -> None:
+            try:
+                version = self.refresh()
+            except Exception as exc:  # noqa: BLE001 - raised by future.result()
+                self._finish()
+                future.set_exception(exc)
+            else:
+                self._finish()
+                future.set_result(version)
+
+        threading.Thread(target=run, name="rag-ed-refresh", daemon=True).start()
+        return future
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._pending = None
+
+    def _retire(self, index: T) -> None:
+        assert self._on_retire is not None
+        self._on_retire(index)
@@ -0,0 +1,612 @@
+"""Pipelined ingest of course exports into a retrieval index.
+
+Parsing, splitting, embedding and index appends run as concurrent stages
+connected by bounded queues. A full queue blocks the stage feeding it, so
+ingest throughput is set by the slowest stage while only a bounded amount of
+work is held in memory between stages.
+
+:attr:`IngestConfig.rss_limit` makes stages hand items over through
+temporary files while the process's resident set is above the limit, so work
+waiting between stages does not add to it. The chunk store and vector store
+being built are still held in memory.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import itertools
+import os
+import pickle
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+import langchain_core.documents
+import langchain_core.embeddings
+
+from rag_ed import tracing
+from rag_ed.loaders.utils import extract_zip
+from rag_ed.retrievers.chunkstore import ChunkStore, ChunkStoreBuilder
+
+Source = Callable[[], list[langchain_core.documents.Document]]
+"""Zero-argument callable producing the documents of one parse task."""
+
+_DONE = object()
+
+
+@dataclasses.dataclass
+class IngestConfig:
+    """Tuning knobs for :func:`ingest`.
+
+    Attributes
+    ----------
+    parse_workers : int
+        Threads parsing export files. Defaults to ``2``.
+    split_workers : int
+        Threads splitting parsed documents into chunks. Defaults to ``1``.
+    embed_workers : int
+        Threads issuing embedding requests concurrently. Defaults to ``2``.
+    batch_size : int
+        Chunks per embedding request and index append. Defaults to ``64``.
+    queue_size : int
+        Items allowed to wait between two stages before the upstream stage
+        blocks. Defaults to ``8``.
+    memory_budget : int, optional
+        Characters of document and chunk text allowed in flight between
+        parsing and indexing. Parsing pauses while the budget is exhausted.
+        ``None`` (default) bounds memory by ``queue_size`` alone.
+    rss_limit : int, optional
+        Resident set size in bytes above which parsed documents, chunk
+        batches and embedded batches are pickled to disk instead of being
+        queued in memory, and loaded back by the stage that consumes them.
+        Unlike ``memory_budget`` this never pauses parsing. Only these
+        handoffs are spilled; the chunk store and vector store grow in memory
+        regardless. ``None`` (default) keeps everything in memory.
+    spill_directory : str, optional
+        Directory for the temporary spill files. Defaults to the system
+        temporary directory. Spill files are removed when ingest finishes.
+    """
+
+    parse_workers: int = 2
+    split_workers: int = 1
+    embed_workers: int = 2
+    batch_size: int = 64
+    queue_size: int = 8
+    memory_budget: int | None = None
+    rss_limit: int | None = None
+    spill_directory: str | None = None
+
+    def __post_init__(self) -> None:
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, int) and value <= 0:
+                msg = f"{field.name} must be positive"
+                raise ValueError(msg)
+
+
+@dataclasses.dataclass
+class StageStats:
+    """Work done by one pipeline stage, summed over its workers."""
+
+    items: int = 0
+    busy_seconds: float = 0.0
+
+
+@dataclasses.dataclass
+class IngestStats:
+    """Counters reported by :func:`ingest`.
+
+    ``peak_rss`` is the highest resident set size in bytes sampled at stage
+    handoffs, or ``None`` where it cannot be measured. ``spilled`` and
+    ``spilled_bytes`` count the items written to disk under
+    :attr:`IngestConfig.rss_limit`.
+    """
+
+    documents: int = 0
+    chunks: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    peak_in_flight: int = 0
+    peak_rss: int | None = None
+    spilled: int = 0
+    spilled_bytes: int = 0
+    stages: dict[str, StageStats] = dataclasses.field(default_factory=dict)
+
+    @property
+    def bottleneck(self) -> str | None:
+        """Stage with the most busy time, which bounds throughput."""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda name: self.stages[name].busy_seconds)
+
+
+@dataclasses.dataclass
+class IngestResult:
+    """Output of :func:`ingest`."""
+
+    chunks: ChunkStore
+    vector_store: Any
+    stats: IngestStats
+
+
+class _PrecomputedEmbeddings(langchain_core.embeddings.Embeddings):
+    """Hand vectors computed by the embed stage to a vector store.
+
+    Stores embed the texts passed to ``add_documents`` themselves; this
+    wrapper answers that call with the pending batch instead of calling the
+    model again. Queries are delegated to the wrapped model.
+    """
+
+    def __init__(self, embeddings: langchain_core.embeddings.Embeddings) -> None:
+        self._embeddings = embeddings
+        self.pending: list[list[float]] | None = None
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        pending, self.pending = self.pending, None
+        if pending is not None and len(pending) == len(texts):
+            return pending
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embeddings.embed_query(text)
+
+
+class _MemoryBudget:
+    """Count text in flight and block producers once ``limit`` is reached."""
+
+    def __init__(self, limit: int | None) -> None:
+        self._limit = limit
+        self._used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(
+        self,
+        size: int,
+        abort: threading.Event,
+        relieve: Callable[[], None] | None = None,
+    ) -> None:
+        """Reserve ``size`` characters, waiting while the budget is exhausted.
+
+        ``relieve`` is called before each wait to push work that is held
+        back downstream, such as a partial batch, so the budget can drain.
+        A single oversized item is admitted once nothing else is in flight,
+        so progress is always possible.
+        """
+        while True:
+            with self._condition:
+                if (
+                    self._limit is None
+                    or not self._used
+                    or self._used + size <= self._limit
+                    or abort.is_set()
+                ):
+                    self._adjust(size)
+                    return
+            if relieve is not None:
+                relieve()
+            with self._condition:
+                self._condition.wait(0.1)
+
+    def adjust(self, delta: int) -> None:
+        with self._condition:
+            self._adjust(delta)
+
+    def _adjust(self, delta: int) -> None:
+        self._used += delta
+        self.peak = max(self.peak, self._used)
+        if delta < 0:
+            self._condition.notify_all()
+
+
+def current_rss() -> int | None:
+    """Return the resident set size of this process in bytes.
+
+    Read from ``/proc`` on Linux and from the optional ``psutil`` package
+    elsewhere; ``None`` if neither is available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return int(psutil.Process().memory_info().rss)
+
+
+class _Spilled:
+    """Queue placeholder for an item pickled to ``path``."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+class _Spill:
+    """Sample RSS at stage handoffs and move items to disk above ``limit``."""
+
+    def __init__(self, limit: int | None, directory: str | None) -> None:
+        self._limit = limit
+        self._directory = directory
+        self._path: str | None = None
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.peak: int | None = None
+        self.items = 0
+        self.bytes = 0
+
+    def sample(self) -> int | None:
+        rss = current_rss()
+        if rss is not None:
+            with self._lock:
+                self.peak = max(self.peak or 0, rss)
+        return rss
+
+    def dump(self, item: Any) -> Any:
+        """Return ``item``, or a :class:`_Spilled` handle while over the limit."""
+        rss = self.sample()
+        if self._limit is None or rss is None or rss <= self._limit:
+            return item
+        with self._lock:
+            if self._path is None:
+                self._path = tempfile.mkdtemp(
+                    prefix="rag-ed-spill-", dir=self._directory
+                )
+            path = os.path.join(self._path, f"{next(self._ids)}.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(item, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        with self._lock:
+            self.items += 1
+            self.bytes += size
+        return _Spilled(path)
+
+    def load(self, item: Any) -> Any:
+        """Undo :meth:`dump`, deleting the spill file."""
+        if not isinstance(item, _Spilled):
+            return item
+        with open(item.path, "rb") as f:
+            loaded = pickle.load(f)
+        os.unlink(item.path)
+        return loaded
+
+    def close(self) -> None:
+        if self._path is not None:
+            shutil.rmtree(self._path, ignore_errors=True)
+            self._path = None
+
+
+class _Pipeline:
+    def __init__(self, config: IngestConfig) -> None:
+        self.config = config
+        self.abort = threading.Event()
+        self.errors: list[BaseException] = []
+        self.stats = IngestStats()
+        self.budget = _MemoryBudget(config.memory_budget)
+        self.spill = _Spill(config.rss_limit, config.spill_directory)
+        self._lock = threading.Lock()
+        self.threads: list[threading.Thread] = []
+
+    def fail(self, exc: BaseException) -> None:
+        with self._lock:
+            self.errors.append(exc)
+        self.abort.set()
+
+    def put(self, outbox: queue.Queue[Any], item: Any) -> None:
+        """Block until ``outbox`` has room, giving up once the run aborts."""
+        if not self.abort.is_set():
+            item = self.spill.dump(item)
+        while not self.abort.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stage(
+        self,
+        name: str,
+        func: Callable[[Any], Iterable[Any]],
+        inbox: queue.Queue[Any],
+        outbox: queue.Queue[Any],
+        workers: int,
+        flush: Callable[[], Iterable[Any]] | None = None,
+    ) -> None:
+        """Start ``workers`` threads mapping ``inbox`` items to ``outbox``.
+
+        The last worker to see the end marker runs ``flush`` and forwards the
+        marker downstream. After an abort, workers keep draining ``inbox``
+        without doing work so upstream stages never block forever.
+        """
+        stats = self.stats.stages.setdefault(name, StageStats())
+        remaining = [workers]
+
+        def run() -> None:
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    inbox.put(_DONE)  # let sibling workers see it too
+                    break
+                if self.abort.is_set():
+                    continue
+                start = time.perf_counter()
+                blocked = 0.0
+                try:
+                    for out in func(self.spill.load(item)):
+                        # Time spent waiting on a full downstream queue is
+                        # backpressure, not work done by this stage.
+                        put_start = time.perf_counter()
+                        self.put(outbox, out)
+                        blocked += time.perf_counter() - put_start
+                except BaseException as exc:  # noqa: BLE001 - re-raised by ingest()
+                    self.fail(exc)
+                with self._lock:
+                    stats.items += 1
+                    stats.busy_seconds += time.perf_counter() - start - blocked
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                if flush is not None and not self.abort.is_set():
+                    try:
+                        for out in flush():
+                            self.put(outbox, out)
+                    except BaseException as exc:  # noqa: BLE001 - re-raised by ingest()
+                        self.fail(exc)
+                outbox.put(_DONE)
+
+        for i in range(workers):
+            # Worker spans nest under the span that started the pipeline.
+            thread = threading.Thread(
+                target=tracing.propagate(run), name=f"rag-ed-{name}-{i}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+
+def file_sources(loader: Any) -> list[Source]:
+    """Return one parse task per archive member of ``loader``.
+
+    Loaders exposing ``load_file`` (:class:`~rag_ed.loaders.canvas.CanvasLoader`
+    and :class:`~rag_ed.loaders.piazza.PiazzaLoader`) are parsed file by file,
+    so files are parsed concurrently; any other loader is a single task.
+    """
+    if hasattr(loader, "load_file") and hasattr(loader, "zipped_file_path"):
+        return [
+            functools.partial(loader.load_file, path)
+            for path in extract_zip(loader.zipped_file_path)
+        ]
+    return [loader.load]
+
+
+def ingest(
+    sources: Iterable[Source],
+    *,
+    split: Callable[
+        [list[langchain_core.documents.Document]],
+        list[langchain_core.documents.Document],
+    ],
+    embeddings: langchain_core.embeddings.Embeddings | None = None,
+    build_store: (
+        Callable[
+            [
+                list[langchain_core.documents.Document],
+                langchain_core.embeddings.Embeddings,
+            ],
+            Any,
+        ]
+        | None
+    ) = None,
+    config: IngestConfig | None = None,
+    compress: bool = False,
+) -> IngestResult:
+    """Parse, split, embed and index ``sources`` as a streaming pipeline.
+
+    Parameters
+    ----------
+    sources : Iterable[Callable[[], list[Document]]]
+        Parse tasks, typically one per export file (see :func:`file_sources`).
+    split : Callable[[list[Document]], list[Document]]
+        Splits the documents of one task into chunks.
+    embeddings : Embeddings, optional
+        Model used by the embed stage. Without it no vector store is built.
+    build_store : Callable[[list[Document], Embeddings], Any], optional
+        Creates the vector store from the first batch; later batches are
+        appended with ``add_documents``. Required with ``embeddings``.
+    config : IngestConfig, optional
+        Stage parallelism, batch and queue sizes, memory budget and spill
+        limit.
+    compress : bool, optional
+        Compress the resulting :class:`ChunkStore`.
+
+    Returns
+    -------
+    IngestResult
+        Chunk store, vector store (``None`` without ``embeddings``) and
+        counters. Chunk ids are their row numbers. Rows follow the order of
+        ``sources`` and of the chunks ``split`` returns, whatever the number
+        of workers, so a rerun over the same sources assigns the same rows.
+
+    Raises
+    ------
+    ValueError
+        If ``embeddings`` is given without ``build_store``.
+    """
+    if embeddings is not None and build_store is None:
+        msg = "build_store is required when embeddings are given"
+        raise ValueError(msg)
+    pipeline = _Pipeline(config or IngestConfig())
+    try:
+        with tracing.span("ingest") as span:
+            result = _run(pipeline, sources, split, embeddings, build_store, compress)
+            span.count("documents", result.stats.documents)
+            span.count("chunks", result.stats.chunks)
+            if result.stats.spilled:
+                span.count("spilled", result.stats.spilled)
+    finally:
+        pipeline.spill.close()
+    return result
+
+
+def _run(
+    pipeline: _Pipeline,
+    sources: Iterable[Source],
+    split: Callable[
+        [list[langchain_core.documents.Document]],
+        list[langchain_core.documents.Document],
+    ],
+    embeddings: langchain_core.embeddings.Embeddings | None,
+    build_store: Callable[..., Any] | None,
+    compress: bool,
+) -> IngestResult:
+    config = pipeline.config
+    started = time.perf_counter()
+
+    tasks: queue.Queue[Any] = queue.Queue()
+    parsed: queue.Queue[Any] = queue.Queue(config.queue_size)
+    batches: queue.Queue[Any] = queue.Queue(config.queue_size)
+    embedded: queue.Queue[Any] = queue.Queue(config.queue_size)
+    for task in enumerate(sources):
+        tasks.put(task)
+    tasks.put(_DONE)
+
+    # Workers finish out of order. Parsed tasks reserve memory in task order
+    # and split results are held back until every earlier task is split, so
+    # the budget is never held by work waiting on unadmitted tasks. Batches
+    # carry sequence numbers the index stage restores, so rows follow the
+    # order of ``sources``.
+    admitted = [0]
+    turn = threading.Condition()
+    pending: list[langchain_core.documents.Document] = []
+    early: dict[int, list[langchain_core.documents.Document]] = {}
+    next_task = [0]
+    batch_ids = itertools.count()
+    pending_lock = threading.Lock()
+
+    def relieve() -> None:
+        for rest in flush():
+            pipeline.put(batches, rest)
+
+    def parse(task: tuple[int, Source]) -> Iterator[Any]:
+        index, source = task
+        docs = source()
+        size = sum(len(doc.page_content) for doc in docs)
+        with turn:
+            while admitted[0] != index and not pipeline.abort.is_set():
+                turn.wait(0.1)
+        pipeline.budget.acquire(size, pipeline.abort, relieve)
+        with turn:
+            admitted[0] += 1
+            turn.notify_all()
+        with pipeline._lock:
+            pipeline.stats.documents += len(docs)
+        yield index, docs, size
+
+    def split_stage(item: tuple[int, list[Any], int]) -> Iterator[Any]:
+        index, docs, size = item
+        chunks = split(docs)
+        # Chunks overlap, so they may hold more text than their documents.
+        pipeline.budget.adjust(sum(len(c.page_content) for c in chunks) - size)
+        ready = []
+        with pending_lock:
+            early[index] = chunks
+            while next_task[0] in early:
+                pending.extend(early.pop(next_task[0]))
+                next_task[0] += 1
+            while len(pending) >= config.batch_size:
+                ready.append((next(batch_ids), pending[: config.batch_size]))
+                del pending[: config.batch_size]
+        yield from ready
+
+    def flush() -> Iterator[Any]:
+        with pending_lock:
+            rest = [(next(batch_ids), pending[:])] if pending else []
+            pending.clear()
+        yield from rest
+
+    def embed(item: tuple[int, list[Any]]) -> Iterator[Any]:
+        number, batch = item
+        if embeddings is None:
+            yield number, batch, None
+            return
+        with tracing.span("embed", texts=len(batch)):
+            vectors = embeddings.embed_documents([c.page_content for c in batch])
+        yield number, batch, vectors
+
+    pipeline.stage("parse", parse, tasks, parsed, config.parse_workers)
+    pipeline.stage(
+        "split", split_stage, parsed, batches, config.split_workers, flush=flush
+    )
+    pipeline.stage(
+        "embed",
+        embed,
+        batches,
+        embedded,
+        config.embed_workers if embeddings is not None else 1,
+    )
+
+    # The index stage runs on the calling thread; it is the only writer of
+    # the chunk store and vector store, so appends need no locking.
+    builder = ChunkStoreBuilder(compress=compress)
+    precomputed = _PrecomputedEmbeddings(embeddings) if embeddings else None
+    store = None
+    index_stats = pipeline.stats.stages.setdefault("index", StageStats())
+    waiting: dict[int, Any] = {}
+    next_batch = 0
+    while (item := embedded.get()) is not _DONE:
+        try:
+            number, batch, vectors = pipeline.spill.load(item)
+        except BaseException as exc:  # noqa: BLE001 - re-raised by ingest()
+            pipeline.fail(exc)
+            continue
+        waiting[number] = batch, vectors
+        while next_batch in waiting:
+            batch, vectors = waiting.pop(next_batch)
+            next_batch += 1
+            size = sum(len(c.page_content) for c in batch)
+            if not pipeline.abort.is_set():
+                start = time.perf_counter()
+                try:
+                    with tracing.span("index", chunks=len(batch)):
+                        for chunk in batch:
+                            chunk.id = str(len(builder))
+                            builder.add(chunk.page_content, chunk.metadata)
+                        if precomputed is not None:
+                            assert build_store is not None
+                            precomputed.pending = vectors
+                            if store is None:
+                                store = build_store(batch, precomputed)
+                            else:
+                                store.add_documents(batch)
+                except BaseException as exc:  # noqa: BLE001 - re-raised by ingest()
+                    pipeline.fail(exc)
+                index_stats.items += 1
+                index_stats.busy_seconds += time.perf_counter() - start
+                pipeline.stats.batches += 1
+            pipeline.budget.adjust(-size)
+
+    for thread in pipeline.threads:
+        thread.join()
+    if pipeline.errors:
+        raise pipeline.errors[0]
+    if precomputed is not None and store is None:
+        assert build_store is not None
+        store = build_store([], precomputed)
+
+    chunks = builder.build()
+    pipeline.stats.chunks = len(chunks)
+    pipeline.stats.peak_in_flight = pipeline.budget.peak
+    pipeline.spill.sample()
+    pipeline.stats.peak_rss = pipeline.spill.peak
+    pipeline.stats.spilled = pipeline.spill.items
+    pipeline.stats.spilled_bytes = pipeline.spill.bytes
+    pipeline.stats.seconds = time.perf_counter() - started
+    return IngestResult(chunks=chunks, vector_store=store, stats=pipeline.stats)
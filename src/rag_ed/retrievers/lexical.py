@@ -0,0 +1,193 @@
+"""Lexical retrieval with a compact BM25 inverted index."""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Any, Callable, Hashable, Iterable, Mapping, Sequence
+
+import langchain_core.documents
+import numpy as np
+import numpy.typing as npt
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split ``text`` into lowercase word tokens.
+
+    Identifiers such as ``"HW3"`` or ``"ME-201"`` survive as ``["hw3"]`` and
+    ``["me", "201"]`` so they match the same tokens in the corpus.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 index with array-backed postings.
+
+    Postings are stored in CSR layout: the documents containing term ``t`` are
+    ``doc_ids[indptr[t]:indptr[t + 1]]``. Each posting holds its precomputed
+    BM25 term weight, including the document length norm, so a query only sums
+    ``idf * weight`` slices.
+
+    Parameters
+    ----------
+    texts : Sequence[str]
+        Documents to index. Row ``i`` of every result refers to ``texts[i]``.
+    k1 : float, optional
+        Term frequency saturation. Defaults to ``1.5``.
+    b : float, optional
+        Length normalization strength. Defaults to ``0.75``.
+
+    Examples
+    --------
+    >>> index = BM25Index(["HW3 is due Friday", "Midterm review"])
+    >>> [row for row, _ in index.search("hw3", k=1)]
+    [0]
+    """
+
+    def __init__(self, texts: Sequence[str], *, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: dict[str, int] = {}
+        terms: list[int] = []
+        rows: list[int] = []
+        tfs: list[int] = []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            counter = Counter(tokens)
+            terms.extend(
+                self.vocabulary.setdefault(t, len(self.vocabulary)) for t in counter
+            )
+            tfs.extend(counter.values())
+            rows.extend([row] * len(counter))
+
+        # A stable sort by term id groups postings into CSR order while keeping
+        # the row ids of each term ascending.
+        order = np.argsort(np.asarray(terms, dtype=np.int32), kind="stable")
+        df = np.bincount(
+            np.asarray(terms, dtype=np.int64), minlength=len(self.vocabulary)
+        )
+        indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+        doc_ids = np.asarray(rows, dtype=np.int32)[order]
+        freqs = np.asarray(tfs, dtype=np.float32)[order]
+
+        avgdl = float(lengths.mean()) if len(texts) and lengths.any() else 1.0
+        norms = k1 * (1.0 - b + b * lengths / avgdl)
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = (freqs * (k1 + 1.0) / (freqs + norms[doc_ids])).astype(
+            np.float32
+        )
+        n = len(texts)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.size = n
+
+    def __len__(self) -> int:
+        return self.size
+
+    def to_arrays(self) -> tuple[dict[str, Any], dict[str, npt.NDArray[Any]]]:
+        """Return a JSON-serializable header and the index arrays.
+
+        The vocabulary is returned as a newline-separated ``uint8`` array of
+        terms in term-id order; tokens never contain whitespace.
+        """
+        terms = "\n".join(self.vocabulary).encode("utf-8")
+        header: dict[str, Any] = {"k1": self.k1, "b": self.b, "size": self.size}
+        arrays: dict[str, npt.NDArray[Any]] = {
+            "vocabulary": np.frombuffer(terms, dtype=np.uint8),
+            "indptr": self.indptr,
+            "doc_ids": self.doc_ids,
+            "weights": self.weights,
+            "idf": self.idf,
+        }
+        return header, arrays
+
+    @classmethod
+    def from_arrays(
+        cls, header: Mapping[str, Any], arrays: Mapping[str, npt.NDArray[Any]]
+    ) -> BM25Index:
+        """Rebuild an index from :meth:`to_arrays` without re-tokenizing."""
+        index = cls([], k1=header["k1"], b=header["b"])
+        terms = bytes(arrays["vocabulary"]).decode("utf-8")
+        index.vocabulary = (
+            {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        )
+        index.indptr = arrays["indptr"]
+        index.doc_ids = arrays["doc_ids"]
+        index.weights = arrays["weights"]
+        index.idf = arrays["idf"]
+        index.size = header["size"]
+        return index
+
+    def scores(self, query: str) -> npt.NDArray[np.float32]:
+        """Return the BM25 score of every row for ``query``."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.indptr[term], self.indptr[term + 1]
+            scores[self.doc_ids[start:end]] += self.idf[term] * self.weights[start:end]
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        *,
+        mask: npt.NDArray[np.bool_] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to ``k`` ``(row, score)`` pairs with a positive score.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        k : int
+            Number of rows to return.
+        mask : numpy.ndarray, optional
+            Boolean array of length ``len(self)``; rows where it is ``False``
+            are never returned.
+        """
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0.0
+        return top_k(scores, k)
+
+
+def top_k(scores: npt.NDArray[np.floating], k: int) -> list[tuple[int, float]]:
+    """Return the ``k`` highest positive entries of ``scores`` in rank order."""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        part = np.argpartition(scores[candidates], -k)[-k:]
+        candidates = candidates[part]
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return [(int(row), float(scores[row])) for row in order]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[langchain_core.documents.Document]],
+    k: int,
+    *,
+    key: Callable[[langchain_core.documents.Document], Hashable],
+    rrf_k: int = 60,
+) -> list[tuple[langchain_core.documents.Document, float]]:
+    """Merge ranked document lists with reciprocal-rank fusion.
+
+    Each document scores ``sum(1 / (rrf_k + rank))`` over the rankings it
+    appears in, where ``key`` identifies the same document across rankings.
+    The ``k`` best ``(document, score)`` pairs are returned.
+    """
+    scores: dict[Hashable, float] = {}
+    docs: dict[Hashable, langchain_core.documents.Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            doc_key = key(doc)
+            docs.setdefault(doc_key, doc)
+            scores[doc_key] = scores.get(doc_key, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [(docs[doc_key], scores[doc_key]) for doc_key in ranked[:k]]
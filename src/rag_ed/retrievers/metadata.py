@@ -0,0 +1,252 @@
+"""Columnar metadata indexes for filtering chunks before ranking."""
+
+from __future__ import annotations
+
+import datetime
+import math
+from typing import Any, Callable, Hashable, Mapping, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from rag_ed.retrievers.chunkstore import ChunkStore
+
+MetadataFilter = Mapping[str, Any]
+"""Filter specification accepted by :meth:`MetadataIndex.mask`.
+
+Keys are metadata fields. A value is matched by equality, a ``list``/``set``/
+``tuple`` by membership, and a ``dict`` of operators (``$eq``, ``$ne``,
+``$in``, ``$nin``, ``$gt``, ``$gte``, ``$lt``, ``$lte``) is combined with AND.
+Range operators compare timestamps (ISO strings or :class:`datetime.datetime`)
+and numbers.
+"""
+
+INDEXED_FIELDS = ("course", "source", "timestamp", "resource_type", "course_id")
+
+_RANGE_OPERATORS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def _to_number(value: Any) -> float:
+    """Map numbers, timestamps and ISO strings onto a comparable float."""
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.fromisoformat(
+                value.replace("Z", "+00:00")
+            ).timestamp()
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def normalize_filter(filter: MetadataFilter) -> dict[str, dict[str, Any]]:
+    """Rewrite shorthand conditions into explicit operator dictionaries.
+
+    Examples
+    --------
+    >>> normalize_filter({"course": "ME201", "source": ["a", "b"]})
+    {'course': {'$eq': 'ME201'}, 'source': {'$in': ['a', 'b']}}
+    """
+    normalized: dict[str, dict[str, Any]] = {}
+    for field, condition in filter.items():
+        if isinstance(condition, Mapping):
+            unknown = set(condition) - {"$eq", "$ne", "$in", "$nin", *_RANGE_OPERATORS}
+            if unknown:
+                msg = f"Unsupported filter operators for '{field}': {sorted(unknown)}"
+                raise ValueError(msg)
+            normalized[field] = dict(condition)
+        elif isinstance(condition, (list, tuple, set, frozenset)):
+            normalized[field] = {"$in": list(condition)}
+        else:
+            normalized[field] = {"$eq": condition}
+    return normalized
+
+
+def metadata_predicate(
+    filter: MetadataFilter,
+) -> Callable[[Mapping[str, Any]], bool]:
+    """Return a per-chunk test matching the rows :meth:`MetadataIndex.mask` selects.
+
+    Stores that filter candidates by their metadata, such as FAISS, take this
+    predicate so they parse timestamps and treat missing fields exactly like
+    the bitmap: equality and membership never match a missing field, their
+    negations always do, and range bounds compare parsed numbers.
+
+    Examples
+    --------
+    >>> import datetime
+    >>> recent = metadata_predicate({"timestamp": {"$gte": datetime.datetime(2024, 2, 1)}})
+    >>> recent({"timestamp": "2024-03-01T00:00:00"}), recent({})
+    (True, False)
+    """
+    conditions: list[tuple[str, str, Any]] = []
+    for field, condition in normalize_filter(filter).items():
+        for op, value in condition.items():
+            if op in _RANGE_OPERATORS:
+                value = _to_number(value)
+                if math.isnan(value):
+                    msg = f"Cannot compare '{field}' with {condition[op]!r}"
+                    raise ValueError(msg)
+            elif op in ("$eq", "$ne"):
+                value = [value]
+            conditions.append((field, op, value))
+
+    def predicate(metadata: Mapping[str, Any]) -> bool:
+        for field, op, value in conditions:
+            if op in _RANGE_OPERATORS:
+                number = _to_number(metadata.get(field))
+                if not _RANGE_OPERATORS[op](number, value):
+                    return False
+                continue
+            found = field in metadata and metadata[field] in value
+            if found == (op in ("$ne", "$nin")):
+                return False
+        return True
+
+    return predicate
+
+
+def filter_key(filter: MetadataFilter | None) -> Hashable:
+    """Return a hashable, order-independent representation of ``filter``."""
+    if filter is None:
+        return None
+    return tuple(
+        sorted(
+            (field, tuple(sorted((op, repr(value)) for op, value in cond.items())))
+            for field, cond in normalize_filter(filter).items()
+        )
+    )
+
+
+class MetadataIndex:
+    """Per-field array indexes over chunk metadata.
+
+    Categorical values are interned to integer codes stored in one ``int32``
+    array per field, so equality and membership tests are single vectorized
+    comparisons producing a boolean row bitmap. Range queries use a parallel
+    ``float64`` column holding numbers and parsed timestamps. The common
+    fields in :data:`INDEXED_FIELDS` are indexed up front; any other field is
+    indexed the first time a filter names it.
+
+    Parameters
+    ----------
+    metadatas : Sequence[Mapping[str, Any]] or ChunkStore
+        Metadata of every chunk, in row order. A
+        :class:`~rag_ed.retrievers.chunkstore.ChunkStore` already holds
+        interned columns, which are reused without building per-row
+        dictionaries.
+
+    Examples
+    --------
+    >>> index = MetadataIndex([{"course": "a"}, {"course": "b"}])
+    >>> index.mask({"course": "b"}).tolist()
+    [False, True]
+    """
+
+    def __init__(self, metadatas: Sequence[Mapping[str, Any]] | ChunkStore) -> None:
+        self._metadatas = metadatas
+        self._codes: dict[str, tuple[dict[Hashable, int], npt.NDArray[np.int32]]] = {}
+        self._numbers: dict[str, npt.NDArray[np.float64]] = {}
+        for field in INDEXED_FIELDS:
+            self._categorical(field)
+        self._numeric("timestamp")
+
+    def __len__(self) -> int:
+        return len(self._metadatas)
+
+    def _categorical(
+        self, field: str
+    ) -> tuple[dict[Hashable, int], npt.NDArray[np.int32]]:
+        if field in self._codes:
+            return self._codes[field]
+        if isinstance(self._metadatas, ChunkStore):
+            values, codes = self._metadatas.column(field)
+            # The store keeps ``1`` and ``True`` apart; filters match by
+            # equality, so equal values are folded onto one code. The trailing
+            # entry maps missing values (code -1) to themselves.
+            vocabulary: dict[Hashable, int] = {}
+            remap = np.full(len(values) + 1, -1, dtype=np.int32)
+            for code, value in enumerate(values):
+                try:
+                    remap[code] = vocabulary.setdefault(value, code)
+                except TypeError:
+                    remap[code] = code
+            self._codes[field] = (vocabulary, remap[codes])
+        else:
+            metadatas = self._metadatas
+            vocabulary = {}
+            codes = np.fromiter(
+                (
+                    (
+                        vocabulary.setdefault(m[field], len(vocabulary))
+                        if field in m
+                        else -1
+                    )
+                    for m in metadatas
+                ),
+                dtype=np.int32,
+                count=len(metadatas),
+            )
+            self._codes[field] = (vocabulary, codes)
+        return self._codes[field]
+
+    def _numeric(self, field: str) -> npt.NDArray[np.float64]:
+        if field in self._numbers:
+            return self._numbers[field]
+        if isinstance(self._metadatas, ChunkStore):
+            values, codes = self._metadatas.column(field)
+            # One trailing NaN serves rows without the field (code -1).
+            numbers = np.fromiter(
+                (_to_number(value) for value in [*values, None]),
+                dtype=np.float64,
+                count=len(values) + 1,
+            )
+            self._numbers[field] = numbers[codes]
+        else:
+            metadatas = self._metadatas
+            self._numbers[field] = np.fromiter(
+                (_to_number(m.get(field)) for m in metadatas),
+                dtype=np.float64,
+                count=len(metadatas),
+            )
+        return self._numbers[field]
+
+    def _membership(self, field: str, values: Any) -> npt.NDArray[np.bool_]:
+        vocabulary, codes = self._categorical(field)
+        wanted = [vocabulary[v] for v in values if v in vocabulary]
+        if not wanted:
+            return np.zeros(len(codes), dtype=bool)
+        if len(wanted) == 1:
+            return codes == wanted[0]
+        return np.isin(codes, wanted)
+
+    def mask(self, filter: MetadataFilter) -> npt.NDArray[np.bool_]:
+        """Return a boolean bitmap of the rows matching ``filter``."""
+        result = np.ones(len(self), dtype=bool)
+        for field, condition in normalize_filter(filter).items():
+            for op, value in condition.items():
+                if op == "$eq":
+                    result &= self._membership(field, [value])
+                elif op == "$ne":
+                    result &= ~self._membership(field, [value])
+                elif op == "$in":
+                    result &= self._membership(field, value)
+                elif op == "$nin":
+                    result &= ~self._membership(field, value)
+                else:
+                    bound = _to_number(value)
+                    if math.isnan(bound):
+                        msg = f"Cannot compare '{field}' with {value!r}"
+                        raise ValueError(msg)
+                    result &= _RANGE_OPERATORS[op](self._numeric(field), bound)
+        return result
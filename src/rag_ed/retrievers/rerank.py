@@ -0,0 +1,283 @@
+"""Post-retrieval diversification and reranking of candidate chunks."""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Sequence
+
+import langchain_core.documents
+import numpy as np
+import numpy.typing as npt
+
+Scorer = Callable[[str, Sequence[str]], Sequence[float]]
+"""Score ``(query, passages)``, returning one higher-is-better score per passage."""
+
+
+def _unit(vectors: npt.ArrayLike) -> npt.NDArray[np.float32]:
+    """Scale rows to unit length, leaving all-zero rows at zero."""
+    array = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return (array / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+
+def mmr(
+    relevance: npt.ArrayLike,
+    vectors: npt.ArrayLike,
+    k: int,
+    *,
+    lambda_mult: float = 0.5,
+) -> list[int]:
+    """Select ``k`` rows by maximal marginal relevance.
+
+    Each step picks the row maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * redundancy``, where
+    redundancy is the highest cosine similarity to an already selected row.
+    Redundancy is kept as one array updated with a single matrix-vector
+    product per pick, so selecting ``k`` of ``n`` candidates costs
+    ``O(k * n * dim)`` in vectorized numpy rather than pairwise Python loops.
+
+    Parameters
+    ----------
+    relevance : array_like
+        Higher-is-better relevance of each of the ``n`` candidates.
+    vectors : array_like
+        ``(n, dim)`` candidate embeddings; they need not be normalized.
+    k : int
+        Number of rows to select.
+    lambda_mult : float, optional
+        ``1`` ranks by relevance alone, ``0`` by diversity alone. Defaults to
+        ``0.5``.
+
+    Returns
+    -------
+    list[int]
+        Selected row indices in selection order.
+
+    Examples
+    --------
+    >>> mmr([0.9, 0.89, 0.5], [[1, 0], [1, 0.01], [0, 1]], k=2)
+    [0, 2]
+    """
+    scores = np.asarray(relevance, dtype=np.float32)
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    unit = _unit(vectors)
+    best = int(np.argmax(scores))
+    selected = [best]
+    redundancy = unit @ unit[best]
+    available = np.ones(len(scores), dtype=bool)
+    available[best] = False
+    for _ in range(k - 1):
+        gain = lambda_mult * scores - (1.0 - lambda_mult) * redundancy
+        gain[~available] = -np.inf
+        best = int(np.argmax(gain))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, unit @ unit[best], out=redundancy)
+    return selected
+
+
+class CrossEncoderScorer:
+    """Score query-passage pairs with a local cross-encoder.
+
+    Requires the optional ``sentence-transformers`` package
+    (``pip install rag-ed[rerank]``); the model is loaded on construction and
+    runs on the local CPU or GPU.
+
+    Parameters
+    ----------
+    model_name : str, optional
+        Hugging Face cross-encoder model. Defaults to
+        ``"cross-encoder/ms-marco-MiniLM-L-6-v2"``.
+    device : str, optional
+        Torch device such as ``"cpu"`` or ``"cuda"``. Chosen automatically by
+        default.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        *,
+        device: str | None = None,
+    ) -> None:
+        import sentence_transformers
+
+        self.model = sentence_transformers.CrossEncoder(model_name, device=device)
+
+    def __call__(self, query: str, texts: Sequence[str]) -> Sequence[float]:
+        scores = self.model.predict([(query, text) for text in texts])
+        return np.asarray(scores, dtype=np.float32).tolist()
+
+
+class Reranker:
+    """Diversify and optionally rerank over-fetched retrieval candidates.
+
+    The retriever fetches ``fetch_k`` candidates instead of ``k``. If a
+    ``scorer`` is configured the candidates are rescored with it, then
+    :func:`mmr` picks ``k`` of them that are relevant but mutually dissimilar,
+    so overlapping splits of the same page do not crowd out other material.
+
+    Parameters
+    ----------
+    fetch_k : int, optional
+        Candidates fetched before reranking. Defaults to ``20``; raised to
+        ``k`` when a query asks for more.
+    lambda_mult : float, optional
+        Relevance/diversity trade-off of :func:`mmr`. ``1`` disables
+        diversification. Defaults to ``0.5``.
+    scorer : Scorer, optional
+        Pluggable ``(query, passages) -> scores`` function, such as
+        :class:`CrossEncoderScorer`. Its scores replace the first-stage
+        ranking as the relevance term.
+    latency_budget : float, optional
+        Seconds allowed for a query, counted from the start of retrieval.
+        Scoring stops at the first batch boundary past the budget (unscored
+        candidates keep their first-stage order after the scored ones), and
+        diversification is skipped once the budget is spent, so an expensive
+        scorer degrades to the first-stage ranking instead of stalling.
+        Unlimited by default.
+    batch_size : int, optional
+        Candidates scored per ``scorer`` call. Defaults to ``16``.
+
+    Examples
+    --------
+    >>> from langchain_core.documents import Document
+    >>> docs = [Document(page_content=t) for t in ["hw3 due", "hw3 due!", "exam"]]
+    >>> reranker = Reranker(lambda_mult=0.3)
+    >>> vectors = lambda candidates: [[1, 0], [1, 0.01], [0.5, 1]]
+    >>> [d.page_content for d in reranker.rerank("hw3", docs, 2, embed=vectors)]
+    ['hw3 due', 'exam']
+    """
+
+    def __init__(
+        self,
+        *,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        scorer: Scorer | None = None,
+        latency_budget: float | None = None,
+        batch_size: int = 16,
+    ) -> None:
+        if fetch_k <= 0:
+            msg = "fetch_k must be positive"
+            raise ValueError(msg)
+        if not 0.0 <= lambda_mult <= 1.0:
+            msg = "lambda_mult must be between 0 and 1"
+            raise ValueError(msg)
+        if batch_size <= 0:
+            msg = "batch_size must be positive"
+            raise ValueError(msg)
+        if latency_budget is not None and latency_budget < 0:
+            msg = "latency_budget must be non-negative"
+            raise ValueError(msg)
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.scorer = scorer
+        self.latency_budget = latency_budget
+        self.batch_size = batch_size
+
+    def rerank(
+        self,
+        query: str,
+        candidates: Sequence[langchain_core.documents.Document],
+        k: int,
+        *,
+        scores: Sequence[float] | None = None,
+        query_vector: npt.ArrayLike | None = None,
+        embed: (
+            Callable[[list[langchain_core.documents.Document]], npt.ArrayLike | None]
+            | None
+        ) = None,
+        started: float | None = None,
+    ) -> list[langchain_core.documents.Document]:
+        """Return the ``k`` best of ``candidates`` for ``query``.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        candidates : Sequence[Document]
+            First-stage results, best first.
+        k : int
+            Number of documents to return.
+        scores : Sequence[float], optional
+            Higher-is-better first-stage scores of ``candidates``.
+        query_vector : array_like, optional
+            Query embedding. Without a complete ``scorer`` pass, relevance is
+            the cosine similarity to it, else the rescaled ``scores``,
+            else a linear decay over the candidate order.
+        embed : Callable[[list[Document]], array_like], optional
+            Returns the candidates' embeddings, or ``None`` if unavailable.
+            Diversification is skipped without it.
+        started : float, optional
+            :func:`time.perf_counter` value at which the query started.
+            Defaults to now.
+        """
+        candidates = list(candidates)
+        if len(candidates) <= 1 or k <= 0:
+            return candidates[:k]
+        deadline = None
+        if self.latency_budget is not None:
+            start = time.perf_counter() if started is None else started
+            deadline = start + self.latency_budget
+
+        relevance: npt.NDArray[np.float32] | None = None
+        if self.scorer is not None:
+            rescored = self._score(query, candidates, deadline)
+            # Stable sort: unscored candidates (-inf) keep first-stage order.
+            order = np.argsort(-rescored, kind="stable")
+            candidates = [candidates[i] for i in order]
+            if np.isfinite(rescored).all():
+                relevance = _rescale(rescored[order])
+
+        if self.lambda_mult >= 1.0 or _expired(deadline) or embed is None:
+            return candidates[:k]
+        vectors = embed(candidates)
+        if vectors is None:
+            return candidates[:k]
+        unit = _unit(vectors)
+        if relevance is None:
+            if query_vector is not None:
+                relevance = unit @ _unit(query_vector)[0]
+            elif scores is not None and self.scorer is None:
+                relevance = _rescale(np.asarray(scores, dtype=np.float32))
+            else:
+                decay = np.arange(len(candidates), dtype=np.float32) / len(candidates)
+                relevance = (1.0 - decay).astype(np.float32)
+        picked = mmr(relevance, unit, k, lambda_mult=self.lambda_mult)
+        return [candidates[i] for i in picked]
+
+    def _score(
+        self,
+        query: str,
+        candidates: list[langchain_core.documents.Document],
+        deadline: float | None,
+    ) -> npt.NDArray[np.float32]:
+        """Score candidates in batches until done or past ``deadline``."""
+        assert self.scorer is not None
+        scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+        for start in range(0, len(candidates), self.batch_size):
+            if _expired(deadline):
+                break
+            batch = candidates[start : start + self.batch_size]
+            scores[start : start + len(batch)] = self.scorer(
+                query, [doc.page_content for doc in batch]
+            )
+        return scores
+
+
+def _rescale(scores: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    """Scale ``scores`` into ``[0, 1]`` to be comparable to cosine redundancy.
+
+    Non-negative scores (BM25, fused ranks) are divided by their maximum so
+    ratios survive; scores with negative values, such as cross-encoder
+    logits, are min-max scaled.
+    """
+    low = 0.0 if float(scores.min()) >= 0 else float(scores.min())
+    spread = float(scores.max()) - low
+    return (scores - low) / (spread if spread > 0 else 1.0)
+
+
+def _expired(deadline: float | None) -> bool:
+    return deadline is not None and time.perf_counter() >= deadline
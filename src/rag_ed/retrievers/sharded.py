@@ -0,0 +1,276 @@
+"""Course-sharded retrieval over several :class:`VectorStoreRetriever` indexes."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Mapping
+
+import langchain_core.callbacks.manager
+import langchain_core.documents
+import langchain_core.retrievers
+
+from rag_ed import tracing
+from rag_ed.retrievers.cache import QueryCache
+from rag_ed.retrievers.metadata import MetadataFilter, filter_key
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+
+class ShardedRetriever(langchain_core.retrievers.BaseRetriever):
+    """Keep one :class:`VectorStoreRetriever` shard per course.
+
+    Shards are built on first use and the least recently queried ones are
+    evicted once more than ``max_loaded_shards`` are resident. Queries fan out
+    to the selected shards in a thread pool and the per-shard hits are merged
+    into a global top-k with a heap. Rebuilding a course only touches its own
+    shard.
+
+    Shard hits are merged by their retrieval scores, so shards are searched
+    without their result caches and rerankers; pass ``cache`` to cache the
+    merged results instead. With ``retrieval_mode="bm25"`` each shard scores
+    with its own IDF statistics, so a term that is rare in one course ranks
+    that course's hits higher and the merged order only approximates a single
+    index over all courses.
+
+    Parameters
+    ----------
+    courses : Mapping[str, tuple[str, str]]
+        Course name mapped to its ``(canvas_path, piazza_path)`` exports.
+    max_loaded_shards : int, optional
+        Number of shards kept in memory. ``None`` keeps every shard. A query
+        may select at most this many courses, since the shards of a larger
+        selection would be evicted and rebuilt on every query.
+    max_workers : int, optional
+        Size of the fan-out thread pool. Defaults to the number of courses.
+    k : int, optional
+        Default number of documents to retrieve.
+    persist_directory : str, optional
+        Parent directory for per-course persisted indexes. Each shard persists
+        to ``persist_directory/<course>`` so an evicted shard reloads from disk
+        instead of re-embedding its exports.
+    cache : QueryCache, optional
+        Cache of merged results, dropped whenever a course is reindexed.
+    **retriever_kwargs : Any
+        Extra keyword arguments forwarded to every :class:`VectorStoreRetriever`,
+        e.g. ``vector_store_type`` or ``embeddings``.
+
+    Raises
+    ------
+    ValueError
+        If ``max_loaded_shards`` is not positive or ``retriever_kwargs``
+        include a ``reranker``.
+
+    Examples
+    --------
+    >>> retriever = ShardedRetriever(
+    ...     {"ME201": ("me201.imscc", "me201.zip"), "ME301": ("me301.imscc", "me301.zip")},
+    ...     max_loaded_shards=1,
+    ...     retrieval_mode="bm25",
+    ... )
+    >>> docs = retriever.retrieve("HW3", courses=["ME201"])  # doctest: +SKIP
+    """
+
+    courses: dict[str, tuple[str, str]]
+    k: int
+
+    def __init__(
+        self,
+        courses: Mapping[str, tuple[str, str]],
+        *,
+        max_loaded_shards: int | None = None,
+        max_workers: int | None = None,
+        k: int = 5,
+        persist_directory: str | None = None,
+        cache: QueryCache | None = None,
+        **retriever_kwargs: Any,
+    ) -> None:
+        if max_loaded_shards is not None and max_loaded_shards <= 0:
+            msg = "max_loaded_shards must be positive"
+            raise ValueError(msg)
+        if retriever_kwargs.get("reranker") is not None:
+            msg = "ShardedRetriever merges shard scores and cannot rerank shards"
+            raise ValueError(msg)
+        object.__setattr__(self, "courses", dict(courses))
+        object.__setattr__(self, "k", k)
+        self._max_loaded_shards = max_loaded_shards
+        self._persist_directory = persist_directory
+        self._cache = cache
+        self._index_version = 0
+        self._retriever_kwargs = retriever_kwargs
+        self._shards: OrderedDict[str, VectorStoreRetriever] = OrderedDict()
+        self._shards_lock = threading.Lock()
+        self._build_locks = {course: threading.Lock() for course in courses}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(len(courses), 1),
+            thread_name_prefix="rag-ed-shard",
+        )
+
+    @property
+    def loaded_shards(self) -> list[str]:
+        """Courses whose shard is resident, least recently used first."""
+        with self._shards_lock:
+            return list(self._shards)
+
+    def shard(self, course: str) -> VectorStoreRetriever:
+        """Return the shard for ``course``, building it if necessary."""
+        if course not in self.courses:
+            msg = f"Unknown course '{course}'"
+            raise KeyError(msg)
+        with self._shards_lock:
+            if course in self._shards:
+                self._shards.move_to_end(course)
+                return self._shards[course]
+        # Build outside the global lock so other shards stay queryable; the
+        # per-course lock stops concurrent queries from building it twice.
+        with self._build_locks[course]:
+            with self._shards_lock:
+                if course in self._shards:
+                    return self._shards[course]
+            shard = self._build_shard(course)
+            with self._shards_lock:
+                self._shards[course] = shard
+                self._evict()
+        return shard
+
+    def _build_shard(self, course: str) -> VectorStoreRetriever:
+        canvas_path, piazza_path = self.courses[course]
+        kwargs = dict(self._retriever_kwargs)
+        if self._persist_directory is not None:
+            kwargs["persist_directory"] = os.path.join(self._persist_directory, course)
+        return VectorStoreRetriever(canvas_path, piazza_path, k=self.k, **kwargs)
+
+    def _evict(self) -> None:
+        """Drop least recently used shards beyond the residency limit."""
+        limit = self._max_loaded_shards
+        while limit is not None and len(self._shards) > limit:
+            self._shards.popitem(last=False)
+
+    def reindex(
+        self,
+        course: str,
+        canvas_path: str | None = None,
+        piazza_path: str | None = None,
+    ) -> None:
+        """Rebuild the shard for ``course``, optionally from new exports.
+
+        Other shards are left untouched. Any persisted index of this course is
+        discarded so the shard is rebuilt from the exports, and cached merged
+        results are dropped. In-flight queries keep using the old shard object
+        until they finish.
+        """
+        if course not in self.courses:
+            msg = f"Unknown course '{course}'"
+            raise KeyError(msg)
+        with self._build_locks[course]:
+            old_canvas, old_piazza = self.courses[course]
+            self.courses[course] = (
+                canvas_path or old_canvas,
+                piazza_path or old_piazza,
+            )
+            if self._persist_directory is not None:
+                shutil.rmtree(
+                    os.path.join(self._persist_directory, course), ignore_errors=True
+                )
+            shard = self._build_shard(course)
+            with self._shards_lock:
+                self._shards[course] = shard
+                self._shards.move_to_end(course)
+                self._evict()
+                self._index_version += 1
+            if self._cache is not None:
+                self._cache.invalidate()
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: langchain_core.callbacks.manager.CallbackManagerForRetrieverRun,
+    ) -> list[langchain_core.documents.Document]:
+        with tracing.callbacks(run_manager):
+            return self.retrieve(query)
+
+    def retrieve(
+        self,
+        query: str,
+        k: int | None = None,
+        *,
+        courses: Iterable[str] | None = None,
+        filter: MetadataFilter | None = None,
+    ) -> list[langchain_core.documents.Document]:
+        """Return the global top ``k`` documents across the selected shards.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        k : int, optional
+            Number of documents to return. Defaults to ``self.k``.
+        courses : Iterable[str], optional
+            Shards to search. Defaults to every course.
+        filter : Mapping[str, Any], optional
+            Metadata filter applied inside every shard.
+
+        Raises
+        ------
+        ValueError
+            If more courses are selected than ``max_loaded_shards``.
+        """
+        k = k or self.k
+        selected = list(courses) if courses is not None else list(self.courses)
+        limit = self._max_loaded_shards
+        if limit is not None and len(set(selected)) > limit:
+            msg = f"Cannot search {len(set(selected))} courses with {limit} loaded"
+            raise ValueError(msg)
+        if self._cache is None:
+            return self._merged_search(query, k, selected, filter)
+        key = self._cache.result_key(
+            query,
+            k,
+            self._index_version,
+            filter=(tuple(selected), filter_key(filter)),
+        )
+        cached = self._cache.results.get(key)
+        if cached is None:
+            cached = self._merged_search(query, k, selected, filter)
+            self._cache.results.put(key, cached)
+        return [doc.model_copy(deep=True) for doc in cached]
+
+    def _merged_search(
+        self,
+        query: str,
+        k: int,
+        selected: list[str],
+        filter: MetadataFilter | None,
+    ) -> list[langchain_core.documents.Document]:
+        # Shard spans nest under the caller's span in the pool threads.
+        query_shard = tracing.propagate(self._query_shard)
+        futures = [
+            self._executor.submit(query_shard, course, query, k, filter)
+            for course in selected
+        ]
+        # The sequence number breaks score ties without comparing documents.
+        counter = itertools.count()
+        candidates = (
+            (score, next(counter), doc)
+            for future in futures
+            for doc, score in future.result()
+        )
+        return [doc for _, _, doc in heapq.nlargest(k, candidates)]
+
+    def _query_shard(
+        self,
+        course: str,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        return self.shard(course).retrieve_with_scores(query, k, filter=filter)
+
+    def close(self) -> None:
+        """Shut down the fan-out thread pool."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,315 @@
+"""Single-file, memory-mapped snapshots of a retrieval index.
+
+A snapshot is one file holding a JSON header followed by raw numpy arrays::
+
+    magic (8 bytes) | format version (uint32) | header length (uint64)
+    header (UTF-8 JSON) | padding | array sections, 64-byte aligned
+
+The header records each section's dtype, shape and offset, so
+:func:`read_snapshot` maps the file once and exposes every array as a
+zero-copy view. Nothing is unpickled; opening cost is independent of corpus
+size until the data is actually touched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+import langchain_core.documents
+import langchain_core.embeddings
+import langchain_core.vectorstores
+import numpy as np
+import numpy.typing as npt
+
+from rag_ed.retrievers.chunkstore import ChunkStore
+
+MAGIC = b"RAGEDIDX"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sIQ")
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def fingerprint(config: Mapping[str, Any]) -> str:
+    """Return a short stable hash of a JSON-serializable configuration."""
+    canonical = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def write_snapshot(
+    path: str | os.PathLike[str],
+    header: Mapping[str, Any],
+    arrays: Mapping[str, npt.NDArray[Any]],
+) -> None:
+    """Write ``header`` and ``arrays`` to ``path`` as one snapshot file.
+
+    The file is written next to ``path`` and renamed into place, so readers
+    never observe a partially written snapshot.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        Destination file.
+    header : Mapping[str, Any]
+        JSON-serializable metadata stored alongside the arrays.
+    arrays : Mapping[str, numpy.ndarray]
+        Named arrays; they are stored C-contiguous in native byte order.
+    """
+    sections: dict[str, dict[str, Any]] = {}
+    position = 0
+    contiguous = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        contiguous[name] = array
+        sections[name] = {
+            "offset": position,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+        }
+        position = _aligned(position + array.nbytes)
+    encoded = json.dumps(
+        {**header, "sections": sections}, default=str, separators=(",", ":")
+    ).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            file.write(encoded)
+            start = _aligned(_PREFIX.size + len(encoded))
+            for name, array in contiguous.items():
+                file.seek(start + sections[name]["offset"])
+                file.write(array.data)
+            file.truncate(start + position)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def read_header(path: str | os.PathLike[str]) -> dict[str, Any]:
+    """Read only the JSON header of a snapshot.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` is not a snapshot or uses an unsupported format version.
+    """
+    with open(path, "rb") as file:
+        return _parse_header(file.read(_PREFIX.size), file.read)
+
+
+def _parse_header(prefix: bytes, read: Callable[[int], bytes]) -> dict[str, Any]:
+    if len(prefix) < _PREFIX.size:
+        msg = "Not a retriever snapshot: file too short"
+        raise ValueError(msg)
+    magic, version, length = _PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        msg = "Not a retriever snapshot: bad magic bytes"
+        raise ValueError(msg)
+    if version != FORMAT_VERSION:
+        msg = f"Unsupported snapshot version: {version}"
+        raise ValueError(msg)
+    return json.loads(read(length))
+
+
+def read_snapshot(
+    path: str | os.PathLike[str],
+) -> tuple[dict[str, Any], dict[str, npt.NDArray[Any]]]:
+    """Memory-map a snapshot written by :func:`write_snapshot`.
+
+    Returns
+    -------
+    tuple[dict, dict[str, numpy.ndarray]]
+        The header and read-only array views into the mapped file.
+
+    Raises
+    ------
+    ValueError
+        If ``path`` is not a snapshot or uses an unsupported format version.
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    header = _parse_header(
+        mapped[: _PREFIX.size],
+        lambda length: mapped[_PREFIX.size : _PREFIX.size + length],
+    )
+    length = _PREFIX.unpack(mapped[: _PREFIX.size])[2]
+    start = _aligned(_PREFIX.size + length)
+    arrays = {}
+    for name, section in header.pop("sections").items():
+        dtype = np.dtype(section["dtype"])
+        shape = tuple(section["shape"])
+        arrays[name] = np.frombuffer(
+            mapped,
+            dtype=dtype,
+            count=int(np.prod(shape, dtype=np.int64)),
+            offset=start + section["offset"],
+        ).reshape(shape)
+    return header, arrays
+
+
+class ArrayVectorStore(langchain_core.vectorstores.VectorStore):
+    """Exact cosine search over a matrix of chunk vectors.
+
+    Vectors are scored with one matrix-vector product; chunk ``i`` of
+    ``chunks`` is the document for row ``i``, so search results carry
+    ``id=str(row)``. Both may be backed by a memory-mapped snapshot, in which
+    case only the pages a query touches are read from disk.
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        ``(n, dim)`` ``float32`` chunk embeddings.
+    chunks : ChunkStore
+        The ``n`` chunks in row order.
+    embedding : Embeddings
+        Model embedding queries and added documents.
+    norms : numpy.ndarray, optional
+        Precomputed row norms of ``vectors``.
+    """
+
+    def __init__(
+        self,
+        vectors: npt.NDArray[np.float32],
+        chunks: ChunkStore,
+        embedding: langchain_core.embeddings.Embeddings,
+        *,
+        norms: npt.NDArray[np.float32] | None = None,
+    ) -> None:
+        if len(vectors) != len(chunks):
+            msg = f"Got {len(vectors)} vectors for {len(chunks)} chunks"
+            raise ValueError(msg)
+        self.vectors = vectors
+        self.chunks = chunks
+        self.embedding = embedding
+        self.norms = (
+            np.linalg.norm(vectors, axis=1).astype(np.float32)
+            if norms is None
+            else norms
+        )
+
+    @property
+    def embeddings(self) -> langchain_core.embeddings.Embeddings:
+        return self.embedding
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: langchain_core.embeddings.Embeddings,
+        metadatas: list[dict] | None = None,
+        **kwargs: Any,
+    ) -> ArrayVectorStore:
+        """Embed ``texts`` and store them with ``metadatas``."""
+        metadatas = metadatas or [{} for _ in texts]
+        chunks = ChunkStore.from_documents(
+            langchain_core.documents.Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        )
+        vectors = np.asarray(embedding.embed_documents(list(texts)), dtype=np.float32)
+        return cls(vectors.reshape(len(texts), -1), chunks, embedding)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """Embed and append ``texts``; the store is copied into memory."""
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        added = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        start = len(self.chunks)
+        self.chunks = self.chunks.with_documents(
+            langchain_core.documents.Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        )
+        added = added.reshape(len(texts), -1)
+        self.vectors = np.vstack([self.vectors, added]) if start else added
+        self.norms = np.concatenate(
+            [self.norms, np.linalg.norm(added, axis=1).astype(np.float32)]
+        )
+        return [str(row) for row in range(start, len(self.chunks))]
+
+    def get_by_ids(
+        self, ids: Sequence[str], /
+    ) -> list[langchain_core.documents.Document]:
+        return [self.chunks[int(i)] for i in ids if 0 <= int(i) < len(self.chunks)]
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[langchain_core.documents.Document]:
+        return self.similarity_search_by_vector(
+            self.embedding.embed_query(query), k=k, **kwargs
+        )
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self.embedding.embed_query(query), k=k, **kwargs
+        )
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[langchain_core.documents.Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_with_score_by_vector(
+                embedding, k=k, **kwargs
+            )
+        ]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter: (
+            npt.NDArray[np.bool_]
+            | Callable[[langchain_core.documents.Document], bool]
+            | None
+        ) = None,
+        **kwargs: Any,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Return the ``k`` most cosine-similar chunks with their similarity.
+
+        ``filter`` is either a boolean row mask or a predicate on documents.
+        """
+        if not len(self.chunks) or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        scores = self.vectors @ query
+        scores /= np.where(self.norms > 0, self.norms, 1.0) * (norm or 1.0)
+        if isinstance(filter, np.ndarray):
+            scores[~filter] = -np.inf
+            k = min(k, int(filter.sum()))
+        if callable(filter):
+            order = np.argsort(-scores, kind="stable")
+            hits = []
+            for row in order:
+                doc = self.chunks[int(row)]
+                if filter(doc):
+                    hits.append((doc, float(scores[row])))
+                    if len(hits) == k:
+                        break
+            return hits
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(self.chunks[int(row)], float(scores[row])) for row in top]
@@ -2,23 +2,166 @@
 
 from __future__ import annotations
 
+import importlib
+import itertools
+import math
 import os
+import time
 from typing import Any, Literal
 from pathlib import Path
 
-import langchain.text_splitter
 import langchain.vectorstores
 import langchain_core.callbacks.manager
 import langchain_core.documents
 import langchain_core.embeddings
 import langchain_core.retrievers
-import langchain_openai.embeddings
+import numpy as np
+import numpy.typing as npt
 
-from rag_ed.loaders.canvas import CanvasLoader
-from rag_ed.loaders.piazza import PiazzaLoader
+from rag_ed import tracing
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.cache import QueryCache, normalize_query
+from rag_ed.retrievers.chunking import Chunker
+from rag_ed.retrievers.chunkstore import ChunkStore
+from rag_ed.retrievers.ingest import IngestConfig, IngestStats, file_sources, ingest
+from rag_ed.retrievers.lexical import BM25Index, reciprocal_rank_fusion
+from rag_ed.retrievers.metadata import (
+    MetadataFilter,
+    MetadataIndex,
+    filter_key,
+    metadata_predicate,
+)
+from rag_ed.retrievers.rerank import Reranker
+from rag_ed.retrievers.snapshot import (
+    ArrayVectorStore,
+    fingerprint,
+    read_snapshot,
+    write_snapshot,
+)
 
+# The loaders pull in the document parsing stack, which a retriever opened
+# from a snapshot never needs; they are imported on first use.
+_LAZY_IMPORTS = {
+    "CanvasLoader": "rag_ed.loaders.canvas",
+    "PiazzaLoader": "rag_ed.loaders.piazza",
+}
 
 VectorStoreType = Literal["faiss", "in_memory", "chroma"]
+RetrievalMode = Literal["vector", "hybrid", "bm25"]
+
+# Monotonic source of index versions shared by every retriever so that a
+# cache reused across a rebuild never serves results from the old index.
+_INDEX_VERSIONS = itertools.count()
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str) -> Any:
+    """Return the module global ``name``, importing it on first use."""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+
+def _build_vector_store(
+    documents: list[langchain_core.documents.Document],
+    embeddings: langchain_core.embeddings.Embeddings,
+    vector_store_type: VectorStoreType,
+    persist_directory: str | None,
+    *,
+    chunks: ChunkStore | None = None,
+) -> Any:
+    """Create or load the vector store backing a retriever.
+
+    The in-memory store holds only the chunk vectors and reads documents from
+    ``chunks``, which is built from ``documents`` when omitted. FAISS and
+    Chroma keep their own copy of every document.
+    """
+    store: Any
+    if vector_store_type == "in_memory":
+        if chunks is None:
+            chunks = ChunkStore.from_documents(documents)
+        buffer = _VectorBuffer([], embeddings)
+        buffer.add_texts(list(chunks.texts()))
+        store = buffer.build(chunks, embeddings)
+    elif vector_store_type == "faiss":
+        if persist_directory and os.path.exists(persist_directory):
+            store = langchain.vectorstores.FAISS.load_local(
+                persist_directory,
+                embeddings,
+                allow_dangerous_deserialization=True,
+            )
+        else:
+            store = (
+                langchain.vectorstores.FAISS.from_documents(documents, embeddings)
+                if documents
+                else _empty_faiss(embeddings)
+            )
+            if persist_directory:
+                store.save_local(persist_directory)
+    elif vector_store_type == "chroma":
+        if persist_directory and os.path.exists(persist_directory):
+            store = langchain.vectorstores.Chroma(
+                persist_directory=persist_directory,
+                embedding_function=embeddings,
+            )
+        else:
+            store = langchain.vectorstores.Chroma.from_documents(
+                documents, embeddings, persist_directory=persist_directory
+            )
+            if persist_directory:
+                store.persist()
+    else:  # pragma: no cover - safeguarded by type hints
+        msg = f"Unknown vector_store_type: {vector_store_type}"
+        raise ValueError(msg)
+    return store
+
+
+class _VectorBuffer:
+    """Collect the vectors of the batches ingest appends, in row order.
+
+    Used as the ingest ``build_store`` of the in-memory store, which is
+    assembled by :meth:`build` once the chunk store is complete instead of
+    being copied on every append.
+    """
+
+    def __init__(
+        self,
+        documents: list[langchain_core.documents.Document],
+        embeddings: langchain_core.embeddings.Embeddings,
+    ) -> None:
+        self.embeddings = embeddings
+        self.batches: list[npt.NDArray[np.float32]] = []
+        self.add_documents(documents)
+
+    def add_documents(self, documents: list[langchain_core.documents.Document]) -> None:
+        self.add_texts([doc.page_content for doc in documents])
+
+    def add_texts(self, texts: list[str]) -> None:
+        if texts:
+            vectors = self.embeddings.embed_documents(texts)
+            self.batches.append(
+                np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            )
+
+    def build(
+        self,
+        chunks: ChunkStore,
+        embeddings: langchain_core.embeddings.Embeddings,
+    ) -> ArrayVectorStore:
+        """Return a store over ``chunks`` answering queries with ``embeddings``."""
+        vectors = (
+            np.concatenate(self.batches)
+            if self.batches
+            else np.empty((0, 0), dtype=np.float32)
+        )
+        return ArrayVectorStore(vectors, chunks, embeddings)
 
 
 class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
@@ -31,7 +174,9 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
     piazza_path : str
         Path to the Piazza export ``.zip`` file.
     vector_store_type : {"faiss", "in_memory", "chroma"}, optional
-        Backend for storing document vectors. Defaults to ``"faiss"``.
+        Backend for storing document vectors. Defaults to ``"faiss"``. The
+        in-memory store holds only the chunk vectors and reads documents from
+        :attr:`chunks`; FAISS and Chroma keep their own copy of every chunk.
     embeddings : langchain_core.embeddings.Embeddings, optional
         Embedding model to use. If omitted, :class:`langchain_openai.embeddings.OpenAIEmbeddings`
         is used.
@@ -40,6 +185,41 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
         Only applies to ``"faiss"`` and ``"chroma"`` stores.
     k : int, optional
         Default number of top documents to retrieve.
+    cache : QueryCache, optional
+        Cache for query embeddings and top-k results. Cached results are
+        invalidated whenever the index is updated.
+    retrieval_mode : {"vector", "hybrid", "bm25"}, optional
+        ``"vector"`` (default) ranks chunks by embedding similarity only.
+        ``"hybrid"`` fuses the embedding ranking with a BM25 ranking over the
+        same chunks using reciprocal-rank fusion, which keeps exact matches on
+        identifiers like ``"HW3"``. ``"bm25"`` uses the lexical index alone and
+        never builds embeddings, so it runs fully offline.
+    compress_chunks : bool, optional
+        Keep the chunk texts held for lexical search and filtering in
+        zlib-compressed blocks of the
+        :class:`~rag_ed.retrievers.chunkstore.ChunkStore`. Defaults to
+        ``False``.
+    ingest_config : IngestConfig, optional
+        Build the index with the streaming pipeline of
+        :func:`~rag_ed.retrievers.ingest.ingest`: files are parsed, split,
+        embedded and appended to the store concurrently through bounded
+        queues, with per-stage parallelism and an optional memory budget.
+        Stage counters are kept in :attr:`ingest_stats`. By default the
+        exports are processed one stage after another.
+    chunker : Chunker, optional
+        How loaded documents are split into chunks. Defaults to
+        ``Chunker()``: recursive splitting into 1000-character chunks with
+        200 characters of overlap. ``Chunker("structure", length="tokens")``
+        keeps HTML sections, PDF pages and Piazza posts whole within a token
+        budget.
+    reranker : Reranker, optional
+        Post-retrieval stage for :meth:`retrieve`: over-fetch
+        ``reranker.fetch_k`` candidates, optionally rescore them with a local
+        cross-encoder and keep ``k`` diverse ones by maximal marginal
+        relevance, within an optional latency budget. Candidate vectors come
+        from the in-memory or FAISS store, so diversification needs no extra
+        embedding calls there. By default the top ``k`` hits are returned
+        as-is.
 
     Examples
     --------
@@ -56,6 +236,17 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
 
     vector_store: Any
     k: int
+    embeddings: langchain_core.embeddings.Embeddings | None
+    cache: QueryCache | None
+    index_version: int
+    retrieval_mode: RetrievalMode
+    chunks: ChunkStore
+    chunker: Chunker
+    ingest_stats: IngestStats | None
+    lexical_index: BM25Index | None
+    vector_store_type: VectorStoreType
+    metadata_index: MetadataIndex
+    reranker: Reranker | None
 
     def __init__(
         self,
@@ -66,6 +257,12 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
         embeddings: langchain_core.embeddings.Embeddings | None = None,
         persist_directory: str | None = None,
         k: int = 5,
+        cache: QueryCache | None = None,
+        retrieval_mode: RetrievalMode = "vector",
+        compress_chunks: bool = False,
+        ingest_config: IngestConfig | None = None,
+        chunker: Chunker | None = None,
+        reranker: Reranker | None = None,
     ) -> None:
         """Initialize the retriever with the desired vector storage type.
 
@@ -74,7 +271,17 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
             piazza_path (str): Path to the Piazza zip file.
             in_memory (bool): If True, use in-memory vector storage. Otherwise, use FAISS.
             k (int): Default number of top documents to retrieve.
+            cache (QueryCache | None): Optional query embedding and result cache.
+            retrieval_mode (str): ``"vector"``, ``"hybrid"`` or ``"bm25"``.
+            compress_chunks (bool): Compress the stored chunk texts.
+            ingest_config (IngestConfig | None): Build the index with the
+                pipelined ingest engine.
+            chunker (Chunker | None): Chunking strategy for loaded documents.
+            reranker (Reranker | None): Diversify and rerank retrieved chunks.
         """
+        if retrieval_mode not in ("vector", "hybrid", "bm25"):
+            msg = f"Unknown retrieval_mode: {retrieval_mode}"
+            raise ValueError(msg)
         canvas = Path(canvas_path)
         if not canvas.is_file():
             msg = f"Canvas file '{canvas_path}' does not exist or is not a file."
@@ -84,51 +291,94 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
             msg = f"Piazza file '{piazza_path}' does not exist or is not a file."
             raise FileNotFoundError(msg)
 
-        canvas_docs = CanvasLoader(str(canvas)).load()
-        piazza_docs = PiazzaLoader(str(piazza)).load()
-        documents = canvas_docs + piazza_docs
-
-        text_splitter = langchain.text_splitter.RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, length_function=len
-        )
-        documents = text_splitter.split_documents(documents)
+        if retrieval_mode != "bm25" and embeddings is None:
+            import langchain_openai.embeddings
 
-        embeddings = embeddings or langchain_openai.embeddings.OpenAIEmbeddings()
+            embeddings = langchain_openai.embeddings.OpenAIEmbeddings()
+        chunker = chunker or Chunker()
+        object.__setattr__(self, "chunker", chunker)
+        with tracing.span(
+            "build",
+            retrieval_mode=retrieval_mode,
+            vector_store_type=vector_store_type,
+        ) as span:
+            canvas_loader = _lazy("CanvasLoader")(str(canvas))
+            piazza_loader = _lazy("PiazzaLoader")(str(piazza))
 
-        if vector_store_type == "in_memory":
-            store = langchain.vectorstores.InMemoryVectorStore.from_documents(
-                documents, embeddings
-            )
-        elif vector_store_type == "faiss":
-            if persist_directory and os.path.exists(persist_directory):
-                store = langchain.vectorstores.FAISS.load_local(
-                    persist_directory,
-                    embeddings,
-                    allow_dangerous_deserialization=True,
-                )
+            store = None
+            ingest_stats = None
+            if ingest_config is None:
+                documents = canvas_loader.load() + piazza_loader.load()
+                documents = _assign_ids(chunker.split(documents), start=0)
+                chunks = ChunkStore.from_documents(documents, compress=compress_chunks)
+                if vector_store_type == "in_memory" or retrieval_mode == "bm25":
+                    # Only FAISS and Chroma keep their own Document per chunk.
+                    documents = []
+                if retrieval_mode != "bm25":
+                    assert embeddings is not None
+                    # The store embeds the chunks itself, within this span.
+                    with tracing.span("index", chunks=len(chunks)):
+                        store = _build_vector_store(
+                            documents,
+                            embeddings,
+                            vector_store_type,
+                            persist_directory,
+                            chunks=chunks,
+                        )
             else:
-                store = langchain.vectorstores.FAISS.from_documents(
-                    documents, embeddings
-                )
-                if persist_directory:
-                    store.save_local(persist_directory)
-        elif vector_store_type == "chroma":
-            if persist_directory and os.path.exists(persist_directory):
-                store = langchain.vectorstores.Chroma(
-                    persist_directory=persist_directory,
-                    embedding_function=embeddings,
+                vectors = retrieval_mode != "bm25"
+                persisted = (
+                    vector_store_type != "in_memory"
+                    and persist_directory is not None
+                    and os.path.exists(persist_directory)
                 )
-            else:
-                store = langchain.vectorstores.Chroma.from_documents(
-                    documents, embeddings, persist_directory=persist_directory
+                result = ingest(
+                    file_sources(canvas_loader) + file_sources(piazza_loader),
+                    split=chunker.split,
+                    embeddings=embeddings if vectors and not persisted else None,
+                    build_store=(
+                        _VectorBuffer
+                        if vector_store_type == "in_memory"
+                        else lambda docs, model: _build_vector_store(
+                            docs, model, vector_store_type, persist_directory
+                        )
+                    ),
+                    config=ingest_config,
+                    compress=compress_chunks,
                 )
-                if persist_directory:
-                    store.persist()
-        else:  # pragma: no cover - safeguarded by type hints
-            msg = f"Unknown vector_store_type: {vector_store_type}"
-            raise ValueError(msg)
+                store = result.vector_store
+                chunks = result.chunks
+                ingest_stats = result.stats
+                if isinstance(store, _VectorBuffer):
+                    assert embeddings is not None
+                    store = store.build(chunks, embeddings)
+                elif vectors and persisted:
+                    assert embeddings is not None
+                    store = _build_vector_store(
+                        [], embeddings, vector_store_type, persist_directory
+                    )
+                elif vectors and persist_directory and vector_store_type == "faiss":
+                    # Only the first batch was saved when the store was created.
+                    store.save_local(persist_directory)
+
+            lexical_index = None
+            if retrieval_mode != "vector":
+                with tracing.span("lexical_index"):
+                    lexical_index = BM25Index(list(chunks.texts()))
+            span.count("chunks", len(chunks))
         object.__setattr__(self, "vector_store", store)
         object.__setattr__(self, "k", k)
+        object.__setattr__(self, "embeddings", embeddings)
+        object.__setattr__(self, "cache", cache)
+        object.__setattr__(self, "index_version", next(_INDEX_VERSIONS))
+        object.__setattr__(self, "retrieval_mode", retrieval_mode)
+        object.__setattr__(self, "chunks", chunks)
+        object.__setattr__(self, "ingest_stats", ingest_stats)
+        object.__setattr__(self, "lexical_index", lexical_index)
+        object.__setattr__(self, "vector_store_type", vector_store_type)
+        object.__setattr__(self, "metadata_index", MetadataIndex(self.chunks))
+        object.__setattr__(self, "reranker", reranker)
+        _init_base_fields(self)
 
     def _get_relevant_documents(
         self,
@@ -136,12 +386,575 @@ class VectorStoreRetriever(langchain_core.retrievers.BaseRetriever):
         *,
         run_manager: langchain_core.callbacks.manager.CallbackManagerForRetrieverRun,
     ) -> list[langchain_core.documents.Document]:
-        return self.vector_store.similarity_search(query, k=self.k)
+        with tracing.callbacks(run_manager):
+            return self.retrieve(query)
 
     def retrieve(
-        self, query: str, k: int | None = None
+        self,
+        query: str,
+        k: int | None = None,
+        *,
+        filter: MetadataFilter | None = None,
+    ) -> list[langchain_core.documents.Document]:
+        """Return the ``k`` documents most relevant to ``query``.
+
+        Parameters
+        ----------
+        query : str
+            Free-text query.
+        k : int, optional
+            Number of documents to return. Defaults to ``self.k``.
+        filter : Mapping[str, Any], optional
+            Metadata constraints such as ``{"course": "ME201"}``,
+            ``{"resource_type": ["quiz", "assignment"]}`` or
+            ``{"timestamp": {"$gte": "2024-01-01"}}``. Chunks that do not
+            match are excluded before ranking; see
+            :data:`~rag_ed.retrievers.metadata.MetadataFilter`.
+        """
+        k = k or self.k
+        with tracing.span("retrieve", k=k, mode=self.retrieval_mode) as span:
+            if self.cache is None:
+                docs = self._search(query, k, filter)
+            else:
+                key = self.cache.result_key(
+                    query, k, self.index_version, filter=filter_key(filter)
+                )
+                cached = self.cache.results.get(key)
+                span.set(cached=cached is not None)
+                if cached is None:
+                    docs = self._search(query, k, filter)
+                    self.cache.results.put(key, _copy_documents(docs))
+                else:
+                    docs = _copy_documents(cached)
+            span.count("hits", len(docs))
+        return docs
+
+    def retrieve_with_scores(
+        self,
+        query: str,
+        k: int | None = None,
+        *,
+        filter: MetadataFilter | None = None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Return ``(document, score)`` pairs for ``query``, best first.
+
+        Scores are higher-is-better: the store's relevance score in ``[0, 1]``
+        for ``"vector"`` mode, the fused reciprocal-rank score for ``"hybrid"``
+        and the BM25 score for ``"bm25"``. Vector scores are comparable between
+        retrievers sharing an embedding model and fused scores depend only on
+        ranks, but BM25 scores are weighted by the IDF and average chunk length
+        of this retriever's own index, so the same chunk scores differently in
+        another corpus. The result cache and the ``reranker`` are bypassed.
+        """
+        k = k or self.k
+        with tracing.span("retrieve", k=k, mode=self.retrieval_mode) as span:
+            hits = self._scored_search(query, k, filter)
+            span.count("hits", len(hits))
+        return hits
+
+    def _scored_search(
+        self,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        mask = self._filter_mask(filter)
+        if mask is not None and not mask.any():
+            return []
+        if self.retrieval_mode == "vector":
+            with tracing.span("vector_search", k=k):
+                try:
+                    return self._store_search(
+                        "similarity_search_with_relevance_scores",
+                        query,
+                        k,
+                        filter,
+                        mask,
+                    )
+                except NotImplementedError:
+                    # Stores without a relevance function (the in-memory store)
+                    # already report cosine similarity, which is higher-is-better.
+                    return self._store_search(
+                        "similarity_search_with_score", query, k, filter, mask
+                    )
+        return self._ranked_search(query, k, filter, mask)
+
+    def _filter_mask(
+        self, filter: MetadataFilter | None
+    ) -> npt.NDArray[np.bool_] | None:
+        return None if filter is None else self.metadata_index.mask(filter)
+
+    def _search(
+        self,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None = None,
+    ) -> list[langchain_core.documents.Document]:
+        mask = self._filter_mask(filter)
+        if mask is not None and not mask.any():
+            return []
+        # ``getattr``: retrievers assembled with ``__new__`` predate rerankers.
+        if getattr(self, "reranker", None) is not None:
+            return self._reranked_search(query, k, filter, mask)
+        if self.retrieval_mode == "vector":
+            return self._vector_search(query, k, filter, mask)
+        return [doc for doc, _ in self._ranked_search(query, k, filter, mask)]
+
+    def _reranked_search(
+        self,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None,
+        mask: npt.NDArray[np.bool_] | None,
+    ) -> list[langchain_core.documents.Document]:
+        """Over-fetch candidates and pass them through ``self.reranker``."""
+        assert self.reranker is not None
+        started = time.perf_counter()
+        fetch_k = max(self.reranker.fetch_k, k)
+        query_vector = scores = None
+        if self.retrieval_mode == "vector":
+            query_vector = self._embed_query(query)
+            with tracing.span("vector_search", k=fetch_k):
+                candidates = self._store_search(
+                    "similarity_search_by_vector", query_vector, fetch_k, filter, mask
+                )
+        else:
+            ranked = self._ranked_search(query, fetch_k, filter, mask)
+            candidates = [doc for doc, _ in ranked]
+            scores = [score for _, score in ranked]
+        with tracing.span("rerank", candidates=len(candidates)):
+            return self.reranker.rerank(
+                query,
+                candidates,
+                k,
+                scores=scores,
+                query_vector=query_vector,
+                embed=self._candidate_vectors,
+                started=started,
+            )
+
+    def _candidate_vectors(
+        self, docs: list[langchain_core.documents.Document]
+    ) -> npt.ArrayLike:
+        """Return embeddings of retrieved chunks for diversification.
+
+        Vectors are read back from the store when every chunk is found there;
+        otherwise the chunks are embedded again, with hashed bag-of-words
+        vectors in ``"bm25"`` mode.
+        """
+        vectors = self._stored_vectors([str(doc.id) for doc in docs])
+        if vectors is not None:
+            return vectors
+        model = self.embeddings or PassThroughEmbeddings()
+        with tracing.span("embed", texts=len(docs)):
+            return model.embed_documents([doc.page_content for doc in docs])
+
+    def _stored_vectors(self, ids: list[str]) -> npt.ArrayLike | None:
+        """Read the vectors of chunks ``ids`` back from the vector store.
+
+        Returns ``None`` if the store is missing any of them or cannot return
+        stored vectors.
+        """
+        store = self.vector_store
+        if store is None:
+            return None
+        if isinstance(store, ArrayVectorStore):
+            rows = [int(i) for i in ids]
+            if all(0 <= row < len(store.vectors) for row in rows):
+                return store.vectors[rows]
+        elif self.vector_store_type == "faiss":
+            positions = self._faiss_positions()
+            found = [positions[i] for i in ids if i in positions]
+            if len(found) == len(ids):
+                return [store.index.reconstruct(p) for p in found]
+        elif self.vector_store_type == "chroma":
+            result = store.get(ids=ids, include=["embeddings"])
+            by_id = dict(zip(result["ids"], result["embeddings"]))
+            if all(i in by_id for i in ids):
+                return [by_id[i] for i in ids]
+        return None
+
+    def _faiss_positions(self) -> dict[str, int]:
+        """Map FAISS docstore ids to index positions, rebuilt after updates."""
+        mapping = self.vector_store.index_to_docstore_id
+        cached = getattr(self, "_faiss_position_cache", None)
+        if cached is None or cached[0] != len(mapping):
+            cached = (len(mapping), {v: k for k, v in mapping.items()})
+            object.__setattr__(self, "_faiss_position_cache", cached)
+        return cached[1]
+
+    def _ranked_search(
+        self,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None,
+        mask: npt.NDArray[np.bool_] | None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        """Score ``query`` in ``"bm25"`` or ``"hybrid"`` mode."""
+        lexical = self._lexical_search(query, k, mask)
+        if self.retrieval_mode == "bm25":
+            return lexical
+        return reciprocal_rank_fusion(
+            [self._vector_search(query, k, filter, mask), [d for d, _ in lexical]],
+            k,
+            key=_fusion_key,
+        )
+
+    def _vector_search(
+        self,
+        query: str,
+        k: int,
+        filter: MetadataFilter | None = None,
+        mask: npt.NDArray[np.bool_] | None = None,
     ) -> list[langchain_core.documents.Document]:
-        return self.vector_store.similarity_search(query, k=k or self.k)
+        if self.cache is None:
+            with tracing.span("vector_search", k=k):
+                return self._store_search("similarity_search", query, k, filter, mask)
+        embedding = self._embed_query(query)
+        with tracing.span("vector_search", k=k):
+            return self._store_search(
+                "similarity_search_by_vector", embedding, k, filter, mask
+            )
+
+    def _store_search(
+        self,
+        method: str,
+        query: Any,
+        k: int,
+        filter: MetadataFilter | None,
+        mask: npt.NDArray[np.bool_] | None,
+    ) -> list[Any]:
+        """Call ``vector_store.<method>`` for the ``k`` best chunks matching ``filter``.
+
+        Chroma's native ``where`` only compares numbers in range conditions and
+        never matches a missing field, so Chroma hits are over-fetched like
+        FAISS candidates and tested with
+        :func:`~rag_ed.retrievers.metadata.metadata_predicate` instead.
+        """
+        search = getattr(self.vector_store, method)
+        if (
+            filter is None
+            or mask is None
+            or self.vector_store_type != "chroma"
+            or isinstance(self.vector_store, ArrayVectorStore)
+        ):
+            return search(query, k=k, **self._store_filter(filter, mask, k))
+        matches = metadata_predicate(filter)
+        hits = search(query, k=_fetch_k(mask, k))
+        return [
+            hit
+            for hit in hits
+            if matches((hit[0] if isinstance(hit, tuple) else hit).metadata)
+        ][:k]
+
+    def _store_filter(
+        self,
+        filter: MetadataFilter | None,
+        mask: npt.NDArray[np.bool_] | None,
+        k: int,
+    ) -> dict[str, Any]:
+        """Translate a metadata filter into the backend's search arguments.
+
+        The in-memory and snapshot array stores check the precomputed row bitmap for
+        every chunk before scoring it. FAISS tests candidates with
+        :func:`~rag_ed.retrievers.metadata.metadata_predicate`, which matches
+        the bitmap. FAISS only filters its ``fetch_k`` nearest candidates, so
+        the bitmap's selectivity sizes ``fetch_k`` to still yield ``k``
+        matches. Chroma is filtered by :meth:`_store_search` and gets no
+        arguments here.
+        """
+        if filter is None or mask is None:
+            return {}
+        if isinstance(self.vector_store, ArrayVectorStore):
+            return {"filter": mask}
+        if self.vector_store_type == "faiss":
+            return {
+                "filter": metadata_predicate(filter),
+                "fetch_k": _fetch_k(mask, k),
+            }
+        return {}
+
+    def _lexical_search(
+        self,
+        query: str,
+        k: int,
+        mask: npt.NDArray[np.bool_] | None = None,
+    ) -> list[tuple[langchain_core.documents.Document, float]]:
+        assert self.lexical_index is not None
+        with tracing.span("lexical_search", k=k):
+            return [
+                (self.chunks[row], score)
+                for row, score in self.lexical_index.search(query, k, mask=mask)
+            ]
+
+    def _embed_query(self, query: str) -> list[float]:
+        """Embed ``query``, reusing the cached vector when available."""
+        assert self.embeddings is not None
+        if self.cache is None:
+            with tracing.span("embed", texts=1, query=True):
+                return self.embeddings.embed_query(query)
+        # Queries equal up to case and whitespace share the vector of the
+        # first of them to be embedded.
+        normalized = normalize_query(query)
+        embedding = self.cache.embeddings.get(normalized)
+        if embedding is None:
+            with tracing.span("embed", texts=1, query=True):
+                embedding = self.embeddings.embed_query(query)
+            self.cache.embeddings.put(normalized, embedding)
+        return embedding
+
+    def add_documents(self, documents: list[langchain_core.documents.Document]) -> None:
+        """Split ``documents`` and add them to the index.
+
+        The index version is bumped so cached results from before the update are
+        never served again.
+        """
+        chunks = _assign_ids(self.chunker.split(documents), start=len(self.chunks))
+        if self.vector_store is not None:
+            with tracing.span("index", chunks=len(chunks)):
+                self.vector_store.add_documents(chunks)
+        if isinstance(self.vector_store, ArrayVectorStore):
+            # The array store already appended the chunks to its chunk store.
+            object.__setattr__(self, "chunks", self.vector_store.chunks)
+        else:
+            object.__setattr__(self, "chunks", self.chunks.with_documents(chunks))
+        object.__setattr__(self, "metadata_index", MetadataIndex(self.chunks))
+        if self.lexical_index is not None:
+            lexical_index = BM25Index(list(self.chunks.texts()))
+            object.__setattr__(self, "lexical_index", lexical_index)
+        object.__setattr__(self, "index_version", next(_INDEX_VERSIONS))
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    def save_snapshot(self, path: str | os.PathLike[str]) -> None:
+        """Write the index to a single memory-mappable file.
+
+        The snapshot holds the chunk vectors, chunk texts and metadata, the
+        BM25 index and the retriever configuration with its fingerprint, as
+        raw arrays behind a JSON header; nothing is pickled. Reopen it with
+        :meth:`from_snapshot`.
+
+        Raises
+        ------
+        ValueError
+            If the vector store cannot return its stored vectors.
+        """
+        header: dict[str, Any] = {}
+        arrays: dict[str, npt.NDArray[Any]] = {}
+        dimension = None
+        if self.vector_store is not None:
+            stored = self._stored_vectors([str(row) for row in range(len(self.chunks))])
+            if stored is None:
+                msg = (
+                    f"Cannot read vectors back from the {self.vector_store_type} store"
+                )
+                raise ValueError(msg)
+            vectors = np.asarray(stored, dtype=np.float32).reshape(len(self.chunks), -1)
+            dimension = vectors.shape[1]
+            arrays["vectors"] = vectors
+            arrays["norms"] = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        header["chunks"], chunk_arrays = self.chunks.to_arrays()
+        arrays.update({f"chunks.{name}": a for name, a in chunk_arrays.items()})
+        if self.lexical_index is not None:
+            header["lexical"], lexical_arrays = self.lexical_index.to_arrays()
+            arrays.update({f"lexical.{name}": a for name, a in lexical_arrays.items()})
+        length = self.chunker.length
+        config = {
+            "retrieval_mode": self.retrieval_mode,
+            "vector_store_type": self.vector_store_type,
+            "k": self.k,
+            "embeddings": _embeddings_id(self.embeddings),
+            "dimension": dimension,
+            "chunker": {
+                "strategy": self.chunker.strategy,
+                "chunk_size": self.chunker.chunk_size,
+                "chunk_overlap": self.chunker.chunk_overlap,
+                "length": length if isinstance(length, str) else None,
+            },
+        }
+        header["config"] = config
+        header["fingerprint"] = fingerprint(config)
+        write_snapshot(path, header, arrays)
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        path: str | os.PathLike[str],
+        *,
+        embeddings: langchain_core.embeddings.Embeddings | None = None,
+        cache: QueryCache | None = None,
+        reranker: Reranker | None = None,
+        chunker: Chunker | None = None,
+    ) -> VectorStoreRetriever:
+        """Open a snapshot written by :meth:`save_snapshot`.
+
+        The file is memory-mapped: vectors, texts and index arrays are paged
+        in as queries touch them, so opening takes milliseconds regardless of
+        corpus size and the loaders are never imported. Vector search runs
+        exactly over the mapped matrix with
+        :class:`~rag_ed.retrievers.snapshot.ArrayVectorStore`.
+
+        Parameters
+        ----------
+        path : str or os.PathLike
+            Snapshot file.
+        embeddings : langchain_core.embeddings.Embeddings, optional
+            Query embedding model; it must be the model the snapshot was built
+            with. Defaults to
+            :class:`langchain_openai.embeddings.OpenAIEmbeddings` unless the
+            snapshot is in ``"bm25"`` mode.
+        cache : QueryCache, optional
+            Query embedding and result cache.
+        reranker : Reranker, optional
+            Post-retrieval stage, as in the constructor.
+        chunker : Chunker, optional
+            Splits documents passed to :meth:`add_documents`. Defaults to the
+            snapshot's chunker settings, with ``"chars"`` lengths when it used
+            a custom length function.
+
+        Raises
+        ------
+        ValueError
+            If ``path`` is not a compatible snapshot, its configuration was
+            altered after saving or ``embeddings`` is not the model it was
+            built with.
+        """
+        header, arrays = read_snapshot(path)
+        config = header["config"]
+        if fingerprint(config) != header["fingerprint"]:
+            msg = "Snapshot configuration does not match its fingerprint"
+            raise ValueError(msg)
+        retrieval_mode = config["retrieval_mode"]
+        if retrieval_mode != "bm25" and embeddings is None:
+            import langchain_openai.embeddings
+
+            embeddings = langchain_openai.embeddings.OpenAIEmbeddings()
+        built_with = config["embeddings"]
+        if built_with is not None and _embeddings_id(embeddings) != built_with:
+            msg = (
+                f"Snapshot was built with {built_with} embeddings, "
+                f"not {_embeddings_id(embeddings)}"
+            )
+            raise ValueError(msg)
+
+        def section(prefix: str) -> dict[str, npt.NDArray[Any]]:
+            return {
+                name.removeprefix(prefix): array
+                for name, array in arrays.items()
+                if name.startswith(prefix)
+            }
+
+        chunks = ChunkStore.from_arrays(header["chunks"], section("chunks."))
+        store = None
+        if "vectors" in arrays:
+            assert embeddings is not None
+            store = ArrayVectorStore(
+                arrays["vectors"],
+                chunks,
+                embeddings,
+                norms=arrays["norms"],
+            )
+        lexical_index = None
+        if "lexical" in header:
+            lexical_index = BM25Index.from_arrays(
+                header["lexical"], section("lexical.")
+            )
+        if chunker is None:
+            saved = config["chunker"]
+            chunker = Chunker(
+                saved["strategy"],
+                chunk_size=saved["chunk_size"],
+                chunk_overlap=saved["chunk_overlap"],
+                length=saved["length"] or "chars",
+            )
+
+        retriever = cls.__new__(cls)
+        fields = {
+            "vector_store": store,
+            "k": config["k"],
+            "embeddings": embeddings,
+            "cache": cache,
+            "index_version": next(_INDEX_VERSIONS),
+            "retrieval_mode": retrieval_mode,
+            "chunks": chunks,
+            "chunker": chunker,
+            "ingest_stats": None,
+            "lexical_index": lexical_index,
+            "vector_store_type": config["vector_store_type"],
+            "metadata_index": MetadataIndex(chunks),
+            "reranker": reranker,
+        }
+        for name, value in fields.items():
+            object.__setattr__(retriever, name, value)
+        _init_base_fields(retriever)
+        return retriever
+
+
+def _empty_faiss(embeddings: langchain_core.embeddings.Embeddings) -> Any:
+    """Return an empty FAISS store for vectors of ``embeddings``.
+
+    ``FAISS.from_documents`` sizes its index from the first vector, so it
+    cannot build a store for an export without chunks.
+    """
+    import langchain_community.docstore.in_memory
+    import langchain_community.vectorstores.faiss
+
+    faiss = langchain_community.vectorstores.faiss.dependable_faiss_import()
+    index = faiss.IndexFlatL2(len(embeddings.embed_query("")))
+    return langchain.vectorstores.FAISS(
+        embeddings, index, langchain_community.docstore.in_memory.InMemoryDocstore(), {}
+    )
+
+
+def _init_base_fields(retriever: VectorStoreRetriever) -> None:
+    """Set the LangChain fields pydantic validation would have defaulted.
+
+    Retrievers are assembled with ``object.__setattr__``, which skips
+    :class:`~langchain_core.retrievers.BaseRetriever` initialization; ``invoke``
+    and chains such as ``RetrievalQA`` read these fields.
+    """
+    for name, field in langchain_core.retrievers.BaseRetriever.model_fields.items():
+        object.__setattr__(
+            retriever, name, field.get_default(call_default_factory=True)
+        )
+
+
+def _embeddings_id(
+    embeddings: langchain_core.embeddings.Embeddings | None,
+) -> str | None:
+    """Identify an embedding model by class and, if set, model name."""
+    if embeddings is None:
+        return None
+    kind = type(embeddings)
+    name = f"{kind.__module__}.{kind.__qualname__}"
+    model = getattr(embeddings, "model", None)
+    return f"{name}:{model}" if isinstance(model, str) else name
+
+
+def _assign_ids(
+    chunks: list[langchain_core.documents.Document], *, start: int
+) -> list[langchain_core.documents.Document]:
+    """Label ``chunks`` with their row numbers so store hits map back to rows."""
+    for row, chunk in enumerate(chunks, start=start):
+        chunk.id = str(row)
+    return chunks
+
+
+def _fetch_k(mask: npt.NDArray[np.bool_], k: int) -> int:
+    """Candidates to fetch so about ``k`` of them fall inside ``mask``."""
+    return min(len(mask), math.ceil(2 * k * len(mask) / int(mask.sum())))
+
+
+def _copy_documents(
+    docs: list[langchain_core.documents.Document],
+) -> list[langchain_core.documents.Document]:
+    """Copy cached results so callers editing them do not change the cache."""
+    return [doc.model_copy(deep=True) for doc in docs]
+
+
+def _fusion_key(doc: langchain_core.documents.Document) -> tuple[Any, str]:
+    """Identify a chunk across vector and lexical rankings."""
+    return doc.metadata.get("source"), doc.page_content
 
 
 if __name__ == "__main__":  # pragma: no cover - example usage
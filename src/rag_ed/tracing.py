@@ -0,0 +1,505 @@
+"""Nested timing spans and counters across ingest, retrieval and answering.
+
+Instrumented code opens spans with :func:`span`, which nest per thread (and
+per asyncio task) through :mod:`contextvars`::
+
+    with tracing.span("retrieve", k=5) as current:
+        ...
+        current.count("hits", len(docs))
+
+Spans are recorded only while a :class:`Tracer` is installed with
+:func:`set_tracer`, LangChain callbacks are bound with :func:`callbacks` or
+spans are gathered with :func:`collect`; otherwise :func:`span` returns a
+shared no-op and instrumentation costs one variable lookup. Finished spans go
+to the tracer's exporters:
+:class:`InMemoryExporter` for tests and ad-hoc latency breakdowns,
+:class:`JSONLinesExporter` for one JSON object per span, and
+:class:`OTLPJSONExporter` for OpenTelemetry's OTLP/JSON file format, which the
+OpenTelemetry Collector and most tracing backends import.
+
+Instrumented stages
+-------------------
+``extract``
+    Unpacking a course export archive.
+``parse``
+    Parsing one archive member into documents.
+``split``
+    Chunking documents.
+``embed``
+    One embedding request: a batch of chunks in the ingest pipeline, or a
+    query. Outside the pipeline, stores embed chunks within ``index``.
+``build`` / ``ingest`` / ``index`` / ``lexical_index``
+    Building a retriever, running the ingest pipeline, appending to the
+    vector store and building the BM25 index.
+``retrieve`` / ``vector_search`` / ``lexical_search`` / ``rerank``
+    Answering a query and its ranking stages.
+``graph_entry``
+    Matching a text query to the artifacts a graph traversal starts from.
+``graph_traverse`` / ``graph_rank`` / ``graph_pagerank``
+    Collecting related artifacts from a course graph: breadth-first,
+    best-first within a budget, or by personalized PageRank.
+``graph_expand``
+    Following the vector hits of a query into a course graph.
+``graph_link``
+    Adding derived edges to a course graph: similar pairs of artifacts or
+    links between pages.
+``agent`` / ``llm``
+    An agent run and a language model call.
+``request``
+    One request to ``vanilla-rag serve``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import json
+import os
+import threading
+import time
+from typing import IO, Any, Callable, Iterable, Iterator, Protocol, TypeVar, Union
+
+R = TypeVar("R")
+
+_TRACER: Tracer | None = None
+_CURRENT: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "rag_ed_span", default=None
+)
+# Extra per-context receivers of finished spans, bound by :func:`callbacks`
+# and :func:`collect`.
+_SINKS: contextvars.ContextVar[tuple[Callable[[Span], None], ...]] = (
+    contextvars.ContextVar("rag_ed_sinks", default=())
+)
+
+SPAN_EVENT = "rag_ed.span"
+"""Name of the LangChain custom event carrying a finished span."""
+
+
+@dataclasses.dataclass
+class Span:
+    """One timed stage, with attributes and counters.
+
+    Attributes
+    ----------
+    name : str
+        Stage name, such as ``"embed"``.
+    trace_id : str
+        32 hex digits shared by every span of one top-level operation.
+    span_id : str
+        16 hex digits identifying this span.
+    parent_id : str or None
+        ``span_id`` of the enclosing span, ``None`` for a root span.
+    start_ns, end_ns : int
+        Wall-clock start and end in nanoseconds since the epoch.
+    attributes : dict[str, Any]
+        Descriptive values such as the file parsed or ``k``.
+    counters : dict[str, float]
+        Quantities accumulated while the span was open, such as chunks
+        produced.
+    error : str or None
+        ``"Type: message"`` of the exception that ended the span, if any.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = dataclasses.field(default_factory=dict)
+    counters: dict[str, float] = dataclasses.field(default_factory=dict)
+    error: str | None = None
+    _started: float = dataclasses.field(default=0.0, repr=False)
+    _seconds: float = dataclasses.field(default=0.0, repr=False)
+
+    @property
+    def duration(self) -> float:
+        """Elapsed seconds, measured with :func:`time.perf_counter`."""
+        return self._seconds
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Add ``value`` to the counter ``name``."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable view of the span."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "counters": self.counters,
+            "error": self.error,
+        }
+
+
+class _NullSpan:
+    """Stand-in handed out while tracing is off; every method is a no-op."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def count(self, name: str, value: float = 1) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_DISABLED = contextlib.nullcontext(_NULL_SPAN)
+
+AnySpan = Union[Span, _NullSpan]
+
+
+class Exporter(Protocol):
+    """Receives every span when it ends."""
+
+    def export(self, span: Span) -> None: ...
+
+
+class Tracer:
+    """Hand finished spans to ``exporters``.
+
+    Parameters
+    ----------
+    *exporters : Exporter
+        Destinations for finished spans. Exporters are called on the thread
+        that ended the span and must be thread-safe.
+
+    Examples
+    --------
+    >>> memory = InMemoryExporter()
+    >>> previous = set_tracer(Tracer(memory))
+    >>> with span("retrieve", k=5):
+    ...     with span("embed"):
+    ...         pass
+    >>> [s.name for s in memory.spans]
+    ['embed', 'retrieve']
+    >>> _ = set_tracer(previous)
+    """
+
+    def __init__(self, *exporters: Exporter) -> None:
+        self.exporters = list(exporters)
+
+    def export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def close(self) -> None:
+        """Close exporters that hold files."""
+        for exporter in self.exporters:
+            close = getattr(exporter, "close", None)
+            if close is not None:
+                close()
+
+
+def set_tracer(tracer: Tracer | None) -> Tracer | None:
+    """Install ``tracer`` process-wide and return the previous one.
+
+    ``None`` turns tracing off again.
+    """
+    global _TRACER
+    previous, _TRACER = _TRACER, tracer
+    return previous
+
+
+def get_tracer() -> Tracer | None:
+    """Return the installed tracer, if any."""
+    return _TRACER
+
+
+def current_span() -> Span | None:
+    """Return the innermost open span of the calling context."""
+    return _CURRENT.get()
+
+
+def span(name: str, **attributes: Any) -> contextlib.AbstractContextManager[AnySpan]:
+    """Time the enclosed block as a span named ``name``.
+
+    The span is a child of the innermost open span of the calling context.
+    An exception leaving the block is recorded in :attr:`Span.error` and
+    re-raised.
+
+    Parameters
+    ----------
+    name : str
+        Stage name.
+    **attributes : Any
+        Initial span attributes.
+    """
+    if _TRACER is None and not _SINKS.get():
+        return _DISABLED
+    return _record(name, attributes)
+
+
+@contextlib.contextmanager
+def _record(name: str, attributes: dict[str, Any]) -> Iterator[Span]:
+    parent = _CURRENT.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else os.urandom(16).hex(),
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent is not None else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+        _started=time.perf_counter(),
+    )
+    token = _CURRENT.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current._seconds = time.perf_counter() - current._started
+        current.end_ns = current.start_ns + int(current._seconds * 1e9)
+        _CURRENT.reset(token)
+        _finish(current)
+
+
+def _finish(current: Span) -> None:
+    tracer = _TRACER
+    if tracer is not None:
+        tracer.export(current)
+    for sink in _SINKS.get():
+        sink(current)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Add ``value`` to counter ``name`` of the innermost open span."""
+    current = _CURRENT.get()
+    if current is not None:
+        current.count(name, value)
+
+
+@contextlib.contextmanager
+def _sink(receive: Callable[[Span], None]) -> Iterator[None]:
+    token = _SINKS.set((*_SINKS.get(), receive))
+    try:
+        yield
+    finally:
+        _SINKS.reset(token)
+
+
+@contextlib.contextmanager
+def callbacks(run_manager: Any) -> Iterator[None]:
+    """Report spans ending in the block to LangChain callbacks.
+
+    Every span is dispatched as a custom event named :data:`SPAN_EVENT`, with
+    :meth:`Span.to_dict` as its data, to the handlers of ``run_manager``,
+    such as the ``CallbackManagerForRetrieverRun`` passed to
+    ``_get_relevant_documents``. Spans are recorded even without an installed
+    tracer. ``None`` binds nothing.
+    """
+    if run_manager is None:
+        yield
+        return
+
+    def dispatch(finished: Span) -> None:
+        run_manager.get_child().on_custom_event(
+            SPAN_EVENT, finished.to_dict(), run_id=run_manager.run_id
+        )
+
+    with _sink(dispatch):
+        yield
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[list[Span]]:
+    """Gather the spans ending in the block, innermost first.
+
+    Spans from threads started through :func:`propagate` are included, so
+    this yields the latency breakdown of one request without a tracer.
+
+    Examples
+    --------
+    >>> with collect() as spans:
+    ...     with span("retrieve"):
+    ...         pass
+    >>> list(breakdown(spans))
+    ['retrieve']
+    """
+    spans: list[Span] = []
+    with _sink(spans.append):
+        yield spans
+
+
+def breakdown(spans: Iterable[Span]) -> dict[str, float]:
+    """Sum span durations in seconds by span name.
+
+    Nested spans count in their own entry and within every enclosing one, so
+    a root span's entry is the end-to-end latency.
+    """
+    totals: dict[str, float] = {}
+    for finished in spans:
+        totals[finished.name] = totals.get(finished.name, 0.0) + finished.duration
+    return totals
+
+
+def propagate(func: Callable[..., R]) -> Callable[..., R]:
+    """Bind ``func`` to the caller's tracing context for another thread.
+
+    Threads start with an empty context, so spans opened by a worker would
+    otherwise start new traces. Each call runs in a fresh copy of the context
+    captured here, so one wrapper may be called from several threads.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> R:
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+class InMemoryExporter:
+    """Keep finished spans in a list."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+    def breakdown(self, trace_id: str | None = None) -> dict[str, float]:
+        """Return :func:`breakdown` of the kept spans, or of one trace."""
+        with self._lock:
+            spans = list(self.spans)
+        return breakdown(s for s in spans if trace_id is None or s.trace_id == trace_id)
+
+
+class _FileExporter:
+    def __init__(self, target: str | os.PathLike[str] | IO[str]) -> None:
+        if isinstance(target, (str, os.PathLike)):
+            # Held open for the exporter's lifetime and closed by close().
+            self._file: IO[str] = open(target, "a", encoding="utf-8")  # noqa: SIM115
+            self._owned = True
+        else:
+            self._file = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the file if this exporter opened it."""
+        with self._lock:
+            if self._owned and not self._file.closed:
+                self._file.close()
+
+
+class JSONLinesExporter(_FileExporter):
+    """Append one :meth:`Span.to_dict` JSON object per line to a file.
+
+    Parameters
+    ----------
+    target : str, os.PathLike or text file
+        Path to append to, or an open text stream such as ``sys.stderr``.
+    """
+
+    def export(self, span: Span) -> None:
+        self._write(span.to_dict())
+
+
+class OTLPJSONExporter(_FileExporter):
+    """Write traces in OpenTelemetry's OTLP/JSON file format.
+
+    Spans are buffered per trace and written as one
+    ``{"resourceSpans": [...]}`` line when the trace's root span ends, the
+    layout read by the OpenTelemetry Collector's ``otlpjsonfile`` receiver.
+    Counters become ``counter.<name>`` attributes.
+
+    Parameters
+    ----------
+    target : str, os.PathLike or text file
+        Path to append to, or an open text stream.
+    service_name : str, optional
+        ``service.name`` resource attribute. Defaults to ``"rag-ed"``.
+    """
+
+    def __init__(
+        self,
+        target: str | os.PathLike[str] | IO[str],
+        *,
+        service_name: str = "rag-ed",
+    ) -> None:
+        super().__init__(target)
+        self.service_name = service_name
+        self._pending: dict[str, list[Span]] = {}
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_id is not None:
+                return
+            del self._pending[span.trace_id]
+        self._write(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": _otlp_attributes(
+                                {"service.name": self.service_name}
+                            )
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "rag_ed"},
+                                "spans": [_otlp_span(s) for s in spans],
+                            }
+                        ],
+                    }
+                ]
+            }
+        )
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    attributes = dict(span.attributes)
+    attributes.update({f"counter.{k}": v for k, v in span.counters.items()})
+    record: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(attributes),
+        # STATUS_CODE_ERROR or STATUS_CODE_UNSET
+        "status": {"code": 2, "message": span.error} if span.error else {},
+    }
+    if span.parent_id is not None:
+        record["parentSpanId"] = span.parent_id
+    return record
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed: dict[str, Any] = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
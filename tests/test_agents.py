@@ -1,6 +1,5 @@
 """Tests for agent modules."""
 
-import types
 from pathlib import Path
 
 import langchain_core.documents
@@ -9,8 +8,6 @@ from rag_ed.agents import self_querying, vanilla_rag
 from rag_ed.embeddings import PassThroughEmbeddings
 from tests.imscc_utils import generate_imscc
 from tests.piazza_utils import generate_piazza_export
-import rag_ed.retrievers.vectorstore
-import langchain_community.vectorstores
 
 
 def test_one_step_retrieval(monkeypatch) -> None:
@@ -18,25 +15,29 @@ def test_one_step_retrieval(monkeypatch) -> None:
 
     class DummyRetriever:
         def __init__(self, *args, **kwargs) -> None:
-            self.vector_store = object()
+            pass
+
+        def retrieve(self, query: str, k=None, *, filter=None):  # noqa: D401
+            return [langchain_core.documents.Document(page_content="doc")]
+
+    class DummyChain:
+        output_key = "output_text"
 
-    class DummyQA:
-        def run(self, query: str) -> str:  # noqa: D401
-            return "dummy"
+        def invoke(self, inputs: dict) -> dict:  # noqa: D401
+            assert [d.page_content for d in inputs["input_documents"]] == ["doc"]
+            return {"output_text": "dummy"}
 
-    def dummy_from_chain_type(*args, **kwargs):
-        return DummyQA()
+    def dummy_load_qa_chain(llm, *, chain_type):
+        assert isinstance(llm, DummyOpenAI)
+        assert chain_type == "stuff"
+        return DummyChain()
 
     class DummyOpenAI:
         def __init__(self, *args, **kwargs) -> None:  # noqa: D401
             pass
 
     monkeypatch.setattr(vanilla_rag, "VectorStoreRetriever", DummyRetriever)
-    monkeypatch.setattr(
-        vanilla_rag,
-        "RetrievalQA",
-        types.SimpleNamespace(from_chain_type=dummy_from_chain_type),
-    )
+    monkeypatch.setattr(vanilla_rag, "load_qa_chain", dummy_load_qa_chain)
     monkeypatch.setattr(vanilla_rag, "OpenAI", DummyOpenAI)
     assert (
         vanilla_rag.one_step_retrieval("q", canvas_path="c", piazza_path="p") == "dummy"
@@ -79,12 +80,6 @@ def test_one_step_retrieval_pass_through(monkeypatch, tmp_path: Path) -> None:
             raise AssertionError("LLM should not be called")
 
     monkeypatch.setattr(vanilla_rag, "OpenAI", DummyOpenAI)
-    monkeypatch.setattr(
-        rag_ed.retrievers.vectorstore.langchain.vectorstores,
-        "InMemoryVectorStore",
-        langchain_community.vectorstores.InMemoryVectorStore,
-        raising=False,
-    )
     canvas_path = generate_imscc(tmp_path / "c.imscc")
     piazza_path = generate_piazza_export(tmp_path / "p.zip")
 
@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+
+import langchain.text_splitter
+import langchain_core.documents
+import pytest
+from rag_ed.loaders import canvas
+from rag_ed.retrievers.chunking import Chunker
+
+Document = langchain_core.documents.Document
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def test_default_chunker_matches_recursive_splitter() -> None:
+    docs = [Document(page_content="lorem ipsum " * 400, metadata={"source": "a.txt"})]
+    splitter = langchain.text_splitter.RecursiveCharacterTextSplitter(
+        chunk_size=1000, chunk_overlap=200, length_function=len
+    )
+    assert Chunker().split(docs) == splitter.split_documents(docs)
+
+
+def test_structure_splits_piazza_posts() -> None:
+    posts = [
+        {"id": "p1", "subject": "HW3 due?", "content": "<p>When is HW3 due?</p>"},
+        {
+            "id": "p2",
+            "created": "2024-02-01T10:00:00Z",
+            "history": [{"subject": "Midterm", "content": "<b>Room</b> &amp; time"}],
+            "children": [{"history": [{"content": "<p>Room 101</p>"}]}],
+        },
+    ]
+    doc = Document(
+        page_content=json.dumps(posts),
+        metadata={"source": "/tmp/x/class_content.json", "timestamp": "mtime"},
+    )
+    chunks = Chunker("structure").split([doc])
+    assert [c.page_content for c in chunks] == [
+        "HW3 due?\n\nWhen is HW3 due?",
+        "Midterm\n\nRoom & time\n\nRoom 101",
+    ]
+    assert [c.metadata["post_id"] for c in chunks] == ["p1", "p2"]
+    assert chunks[0].metadata["timestamp"] == "mtime"
+    assert chunks[1].metadata["timestamp"] == "2024-02-01T10:00:00Z"
+
+
+def test_structure_splits_html_at_headings(tmp_path: Path) -> None:
+    page = tmp_path / "week1.html"
+    page.write_text(
+        "<html><body><h1>Week 1</h1><p>Intro text.</p>"
+        "<h2>Homework</h2><p>HW1 is due Friday.</p>"
+        "<h2>Reading</h2><p>Chapter 2.</p></body></html>"
+    )
+    text = "Week 1\n\nIntro text.\n\nHomework\n\nHW1 is due Friday.\n\nReading\n\nChapter 2."
+    doc = Document(page_content=text, metadata={"source": str(page)})
+
+    sections = Chunker("structure", chunk_size=30, chunk_overlap=0).split([doc])
+    assert [c.metadata.get("section") for c in sections] == [
+        "Week 1",
+        "Homework",
+        "Reading",
+    ]
+    assert sections[1].page_content.strip() == "Homework\n\nHW1 is due Friday."
+
+    merged = Chunker("structure", chunk_size=500).split([doc])
+    assert len(merged) == 1 and merged[0].metadata["section"] == "Week 1"
+
+
+def test_structure_keeps_pdf_pages_within_budget() -> None:
+    doc = Document(
+        page_content="page one text\fpage two " + "word " * 30 + "\f\f",
+        metadata={"source": "notes.pdf"},
+    )
+    chunks = Chunker("structure", chunk_size=10, chunk_overlap=2, length=_words).split(
+        [doc]
+    )
+    assert chunks[0].page_content == "page one text"
+    assert {c.metadata["page"] for c in chunks} == {1, 2}
+    assert all(_words(c.page_content) <= 10 for c in chunks)
+    assert len(chunks) > 2
+
+
+def test_structure_splits_pages_of_loaded_pdfs(monkeypatch, tmp_path: Path) -> None:
+    class ElementsLoader:
+        """Stands in for Unstructured's ``"elements"`` mode output."""
+
+        def __init__(self, file_path: str, mode: str) -> None:
+            assert mode == "elements"
+
+        def lazy_load(self):
+            for page, text in [(1, "Intro"), (1, "Gradients"), (3, "Summary")]:
+                yield Document(page_content=text, metadata={"page_number": page})
+
+    monkeypatch.setattr(canvas, "UnstructuredPDFLoader", ElementsLoader)
+    export = tmp_path / "course.imscc"
+    export.write_bytes(b"")
+    pdf = tmp_path / "notes.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+
+    docs = canvas.CanvasLoader(str(export)).load_file(str(pdf))
+    chunks = Chunker("structure").split(docs)
+
+    assert len(docs) == 1
+    assert [(c.page_content, c.metadata["page"]) for c in chunks] == [
+        ("Intro\n\nGradients", 1),
+        ("Summary", 3),
+    ]
+
+
+def test_parallel_split_preserves_order() -> None:
+    docs = [
+        Document(page_content=f"doc {i} " + "text " * 300, metadata={"source": f"{i}"})
+        for i in range(8)
+    ]
+    chunker = Chunker(max_workers=2)
+    try:
+        assert chunker.split(docs) == Chunker().split(docs)
+    finally:
+        chunker.close()
+
+
+def test_describe_reports_sizes() -> None:
+    stats = Chunker(length=_words).describe(["a b", "a b c d", "a"])
+    assert (stats.chunks, stats.total, stats.minimum, stats.maximum) == (3, 7, 1, 4)
+    assert stats.median == 2
+
+
+def test_chunker_validation() -> None:
+    with pytest.raises(ValueError, match="Unknown chunking strategy"):
+        Chunker("sentences")  # type: ignore[arg-type]
+    with pytest.raises(ValueError, match="chunk_overlap"):
+        Chunker(chunk_size=100, chunk_overlap=100)
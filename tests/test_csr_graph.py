@@ -0,0 +1,109 @@
+import random
+
+import pytest
+from langchain_core.documents import Document
+
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
+from rag_ed.retrievers.graph import GraphRetriever
+
+
+def _random_graph(factory, seed: int = 0):
+    rng = random.Random(seed)
+    graph = factory()
+    graph.add_artifacts((f"n{i}", Document(page_content=f"N{i}")) for i in range(50))
+    graph.add_relationships(
+        (f"n{rng.randrange(50)}", f"n{rng.randrange(50)}") for _ in range(150)
+    )
+    return graph
+
+
+def test_csr_graph_matches_networkx_backend() -> None:
+    reference = _random_graph(CourseGraph)
+    graph = _random_graph(CSRCourseGraph)
+
+    assert len(graph) == len(reference) == 50
+    _, indices = graph.adjacency
+    assert len(indices) == reference.graph.number_of_edges()
+    for i in range(50):
+        node = f"n{i}"
+        assert sorted(graph.successors(node)) == sorted(reference.successors(node))
+        assert {d.page_content for d in graph.neighbors(node)} == {
+            d.page_content for d in reference.neighbors(node)
+        }
+    assert set(graph.graph.edges) == set(reference.graph.edges)
+    assert graph.graph.nodes["n3"]["document"].page_content == "N3"
+    for depth in (1, 3):
+        expected = GraphRetriever(reference, max_depth=depth).retrieve("n0")
+        found = GraphRetriever(graph, max_depth=depth).retrieve("n0")
+        assert {d.page_content for d in found} == {d.page_content for d in expected}
+
+
+def test_csr_graph_incremental_updates() -> None:
+    graph = CSRCourseGraph()
+    graph.add_artifact("a", Document(page_content="A"))
+    graph.add_artifact("b", Document(page_content="B"))
+    graph.add_relationship("a", "b")
+    assert graph.successors("a") == ["b"]
+
+    graph.add_artifact("c", Document(page_content="C"))
+    graph.add_relationships([("a", "c"), ("a", "b"), ("c", "a")])
+    graph.add_artifact("b", Document(page_content="B2"))
+
+    indptr, indices = graph.adjacency
+    assert indptr.tolist() == [0, 2, 2, 3]
+    assert indices.tolist() == [1, 2, 0]
+    assert [d.page_content for d in graph.neighbors("a")] == ["B2", "C"]
+    assert graph.ids == ["a", "b", "c"] and graph.index("c") == 2
+    assert graph.successors("b") == []
+
+
+def test_csr_graph_rejects_unknown_artifacts() -> None:
+    graph = CSRCourseGraph()
+    graph.add_artifact("a", Document(page_content="A"))
+
+    with pytest.raises(ValueError, match="Artifact 'x' not found"):
+        graph.add_relationship("a", "x")
+    with pytest.raises(ValueError, match="Artifact 'x' not found"):
+        GraphRetriever(graph).retrieve("x")
+    assert "x" not in graph and "a" in graph
+
+
+@pytest.mark.parametrize("saver", [CourseGraph, CSRCourseGraph])
+def test_graph_save_and_load_round_trip(tmp_path, saver) -> None:
+    graph = saver()
+    graph.add_artifacts(
+        [
+            ("a", Document(page_content="A", metadata={"source": "x/a", "n": 1})),
+            ("b", Document(page_content="B", metadata={"source": "x/b"})),
+            ("c", Document(page_content="C")),
+        ]
+    )
+    graph.add_relationships([("a", "b", 0.5), ("b", "c"), ("a", "c")])
+    path = tmp_path / "course.graph"
+
+    graph.save(path)
+    mapped = CSRCourseGraph.load(path)
+    copied = CourseGraph.load(path)
+
+    for loaded in (mapped, copied):
+        assert loaded.ids == ["a", "b", "c"]
+        assert loaded.document("a") == graph.document("a")
+        assert loaded.successors("a") == ["b", "c"]
+        assert loaded.weights.tolist() == graph.weights.tolist()
+    assert not mapped.adjacency[1].flags.writeable
+    assert copied.graph.edges["a", "b"]["weight"] == 0.5
+    # A mapped graph can still be extended.
+    mapped.add_artifact("d", Document(page_content="D"))
+    mapped.add_relationship("c", "d")
+    assert [d.page_content for d in mapped.neighbors("c")] == ["D"]
+    assert GraphRetriever(mapped, max_depth=3).retrieve("a")
+
+
+def test_graph_load_rejects_other_files(tmp_path) -> None:
+    from rag_ed.retrievers.snapshot import write_snapshot
+
+    path = tmp_path / "index.snapshot"
+    write_snapshot(path, {"config": {}}, {})
+
+    with pytest.raises(ValueError, match="Not a course graph"):
+        CSRCourseGraph.load(path)
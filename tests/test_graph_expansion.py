@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+import pytest
+from langchain_core.documents import Document
+
+from rag_ed import tracing
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
+from rag_ed.retrievers.expansion import GraphExpansionRetriever
+
+
+def _source(extraction: str, name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), extraction, "wiki_content", name)
+
+
+class _FakeVectorRetriever:
+    """Returns fixed chunks, as loaded from a different extraction directory."""
+
+    def __init__(self, hits: list[tuple[str, float]]) -> None:
+        self.hits = hits
+        self.calls = 0
+
+    def retrieve_with_scores(self, query, k=None, *, filter=None):
+        self.calls += 1
+        return [
+            (
+                Document(
+                    page_content=f"chunk of {name}",
+                    metadata={"source": _source("tmpchunks", name), "course": "C"},
+                ),
+                score,
+            )
+            for name, score in self.hits[:k]
+        ]
+
+
+def _graph(backend):
+    graph = backend()
+    graph.add_artifacts(
+        (
+            name,
+            Document(
+                page_content=name,
+                metadata={"source": _source("tmpgraph", name), "course": "C"},
+            ),
+        )
+        for name in ["a", "b", "c", "d"]
+    )
+    graph.add_relationships([("a", "b", 0.8), ("b", "c"), ("c", "d"), ("b", "a")])
+    return graph
+
+
+@pytest.mark.parametrize("backend", [CourseGraph, CSRCourseGraph])
+def test_expansion_follows_hits_into_the_graph(backend) -> None:
+    vector = _FakeVectorRetriever([("a", 0.9), ("b", 0.4)])
+    retriever = GraphExpansionRetriever(vector, _graph(backend), max_depth=2)
+
+    with tracing.collect() as spans:
+        results = retriever.retrieve_with_scores("query")
+
+    # Hits first, then neighbours that are not hits themselves.
+    assert [doc.page_content for doc, _ in results] == [
+        "chunk of a",
+        "chunk of b",
+        "c",
+        "d",
+    ]
+    # b is reached from a with 0.9 * 0.5 * 0.8 = 0.36 < 0.4, so c starts at 0.4.
+    assert [score for _, score in results[2:]] == pytest.approx([0.2, 0.1])
+    assert vector.calls == 1
+    (span,) = [s for s in spans if s.name == "graph_expand"]
+    assert span.counters == {"hits": 2, "seeds": 2, "documents": 2}
+
+
+def test_expansion_respects_budgets() -> None:
+    vector = _FakeVectorRetriever([("a", 0.9)])
+    graph = _graph(CSRCourseGraph)
+
+    ranked = GraphExpansionRetriever(vector, graph, k=1, max_depth=2)
+    expired = GraphExpansionRetriever(vector, graph, max_depth=2, latency_budget=0)
+
+    assert [doc.page_content for doc in ranked.invoke("query")] == ["chunk of a", "b"]
+    assert [doc.page_content for doc in expired.retrieve("query")] == ["chunk of a"]
+
+
+def test_unmatched_hits_are_returned_without_expansion() -> None:
+    vector = _FakeVectorRetriever([("missing.html", 0.7)])
+    retriever = GraphExpansionRetriever(vector, _graph(CourseGraph))
+
+    assert [doc.page_content for doc in retriever.retrieve("query")] == [
+        "chunk of missing.html"
+    ]
@@ -1,6 +1,17 @@
+import random
 from pathlib import Path
 
-from rag_ed.graphs import graph_from_canvas, graph_from_piazza
+import pytest
+from langchain_core.documents import Document
+
+from rag_ed.graphs import (
+    CourseGraph,
+    CourseGraphBuilder,
+    CSRCourseGraph,
+    generation,
+    graph_from_canvas,
+    graph_from_piazza,
+)
 from tests.imscc_utils import generate_imscc
 from tests.piazza_utils import generate_piazza_export
 
@@ -44,3 +55,55 @@ def test_graph_from_piazza(tmp_path: Path) -> None:
     )
     assert graph.graph.has_edge(sorted_root[0], sorted_root[1])
     assert graph.graph.has_edge(sorted_root[1], sorted_root[2])
+
+
+def test_graph_from_piazza_uses_cache(tmp_path: Path, monkeypatch) -> None:
+    piazza_path = generate_piazza_export(tmp_path / "piazza")
+    cache = tmp_path / "cache"
+    graph = graph_from_piazza(str(piazza_path), cache_dir=cache)
+
+    def fail(self):
+        raise AssertionError("archive parsed again")
+
+    monkeypatch.setattr(generation.PiazzaLoader, "lazy_load", fail)
+
+    cached = graph_from_piazza(str(piazza_path), cache_dir=cache)
+
+    assert len(list(cache.iterdir())) == 1
+    assert cached.ids == graph.ids
+    assert set(cached.graph.edges) == set(graph.graph.edges)
+    assert cached.document("piazza_0") == graph.document("piazza_0")
+
+
+@pytest.mark.parametrize("backend", [CourseGraph, CSRCourseGraph])
+def test_builder_appends_match_a_full_rebuild(backend) -> None:
+    rng = random.Random(0)
+    documents = [
+        Document(
+            page_content=str(i),
+            metadata={"source": f"d{rng.randrange(4)}/f", "timestamp": rng.random()},
+        )
+        for i in range(60)
+    ]
+    reference = CourseGraphBuilder("p")
+    reference.extend(documents)
+
+    # Bulk-load half, then add the rest one at a time and in small batches,
+    # many of them landing between existing members of their group.
+    builder = CourseGraphBuilder("p", backend())
+    builder.extend(iter(documents[:30]))
+    for document in documents[30:40]:
+        builder.add(document)
+    builder.extend(documents[40:50])
+    resumed = CourseGraphBuilder.from_graph(builder.graph, prefix="p")
+    ids = resumed.extend(documents[50:])
+
+    assert ids == [f"p_{i}" for i in range(50, 60)]
+    assert len(resumed) == len(builder.graph) == 60
+    edges = {
+        (source, target)
+        for source in builder.graph.ids
+        for target in builder.graph.successors(source)
+    }
+    assert edges == set(reference.graph.graph.edges)
+    assert len(edges) == 60 - 4
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+from rag_ed import tracing
+from rag_ed.graphs import CourseGraph, CSRCourseGraph, link_references
+from rag_ed.graphs.links import LinkResolver, extract_links
+
+
+def _export(root: Path) -> dict[str, Path]:
+    files = {
+        "intro": root / "wiki_content" / "intro.html",
+        "syllabus": root / "wiki_content" / "syllabus.html",
+        "homework": root / "web_resources" / "Uploaded Media" / "HW1.pdf",
+        "notes": root / "web_resources" / "notes.txt",
+    }
+    for path in files.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("content")
+    files["intro"].write_text(
+        """<p>Read the <a href="$WIKI_REFERENCE$/pages/syllabus#grading">syllabus</a>,
+        <a href='%24IMS-CC-FILEBASE%24/Uploaded%20Media/hw1.pdf?canvas_download=1'>HW1</a>
+        and <A HREF="../web_resources/notes.txt">notes</A>.
+        <a href="https://example.org">elsewhere</a> <a href="#top">top</a>
+        <a href="$CANVAS_OBJECT_REFERENCE$/assignments/g1">quiz</a>
+        <img src="$IMS-CC-FILEBASE$/missing.png"></p>"""
+    )
+    files["syllabus"].write_text('<a href="intro.html">back</a>')
+    return files
+
+
+@pytest.mark.parametrize("backend", [CourseGraph, CSRCourseGraph])
+def test_link_references_adds_edges_between_artifacts(tmp_path, backend) -> None:
+    files = _export(tmp_path / "export")
+    graph = backend()
+    graph.add_artifacts(
+        (name, Document(page_content=name, metadata={"source": str(path)}))
+        for name, path in files.items()
+    )
+
+    with tracing.collect() as spans:
+        linked = link_references(graph, list(files))
+
+    assert linked == 4
+    assert sorted(graph.successors("intro")) == ["homework", "notes", "syllabus"]
+    assert graph.successors("syllabus") == ["intro"]
+    assert spans[0].counters == {"edges": 4}
+
+
+def test_resolver_indexes_export_folders(tmp_path) -> None:
+    files = _export(tmp_path / "export")
+    resolver = LinkResolver([(name, str(path)) for name, path in files.items()])
+    base = str(files["intro"])
+
+    assert resolver.resolve("$WIKI_REFERENCE$/pages/syllabus", base) == "syllabus"
+    assert resolver.resolve("$IMS-CC-FILEBASE$/notes.txt", base) == "notes"
+    assert resolver.resolve("syllabus.html", base) == "syllabus"
+    assert resolver.resolve("mailto:ta@example.org", base) is None
+    assert resolver.resolve("/courses/1/files/2", base) is None
+    assert list(extract_links('<a href="a&amp;b.html">')) == ["a&b.html"]
@@ -1,8 +1,13 @@
+import random
+
+import networkx
 from langchain_core.documents import Document
 
 import pytest
 
-from rag_ed.graphs import CourseGraph
+from rag_ed import tracing
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.graphs import CourseGraph, CSRCourseGraph
 from rag_ed.retrievers.graph import GraphRetriever
 
 
@@ -42,3 +47,211 @@ def test_graph_retriever_raises_for_negative_depth() -> None:
     # Act / Assert
     with pytest.raises(ValueError, match="max_depth must be non-negative"):
         retriever.retrieve("a", max_depth=-1)
+
+
+@pytest.mark.parametrize("cache_size", [0, 16])
+def test_graph_retriever_retrieve_many_shares_visited(cache_size: int) -> None:
+    # Two chains a -> b -> c -> d and x -> c -> d, plus x -> y
+    graph = CSRCourseGraph()
+    graph.add_artifacts(
+        (name, Document(page_content=name.upper())) for name in "abcdxy"
+    )
+    graph.add_relationships(
+        [("a", "b"), ("b", "c"), ("c", "d"), ("x", "c"), ("x", "y")]
+    )
+    retriever = GraphRetriever(graph, max_depth=2, cache_size=cache_size)
+
+    docs = retriever.retrieve_many(["a", "x", "a"])
+
+    # C is reached at depth 1 from x, and only once
+    assert [d.page_content for d in docs] == ["B", "C", "Y", "D"]
+    assert [d.page_content for d in retriever.retrieve_many(["b", "c"])] == ["D"]
+
+
+def test_graph_retriever_cache_invalidated_on_change() -> None:
+    graph = CourseGraph()
+    graph.add_artifact("a", Document(page_content="A"))
+    graph.add_artifact("b", Document(page_content="B"))
+    graph.add_relationship("a", "b")
+    retriever = GraphRetriever(graph, max_depth=2)
+    retriever.retrieve("a")
+    retriever.retrieve("a")
+    stats = retriever.cache_stats
+    assert stats is not None
+    assert stats.hits == 1
+
+    graph.add_artifact("c", Document(page_content="C"))
+    graph.add_relationship("b", "c")
+
+    assert [d.page_content for d in retriever.retrieve("a")] == ["B", "C"]
+    assert stats.misses == 2
+
+
+def test_graph_retriever_ranked_traversal_respects_budget() -> None:
+    # A strong chain a -> b -> c -> d and a weak edge a -> w
+    graph = CSRCourseGraph()
+    graph.add_artifacts(
+        (name, Document(page_content=f"{name} " * 10)) for name in "abcdw"
+    )
+    graph.add_relationships(
+        [("a", "b", 1.0), ("b", "c", 0.8), ("c", "d", 1.0), ("a", "w", 0.1)]
+    )
+    retriever = GraphRetriever(graph, max_depth=5, length=lambda t: len(t.split()))
+
+    ranked = retriever.retrieve_ranked(["a"], k=3)
+    budgeted = retriever.retrieve_ranked(["a"], max_tokens=25)
+    shallow = retriever.retrieve_ranked(["a"], max_depth=1)
+
+    assert [(d.page_content[0], round(s, 3)) for d, s in ranked] == [
+        ("b", 0.5),
+        ("c", 0.2),
+        ("d", 0.1),
+    ]
+    assert [d.page_content[0] for d, _ in budgeted] == ["b", "c"]
+    assert [d.page_content[0] for d, _ in shallow] == ["b", "w"]
+
+
+def test_graph_retriever_ranked_traversal_stops_early() -> None:
+    # A hub linking to 1000 leaves, each with further children
+    graph = CSRCourseGraph()
+    graph.add_artifact("hub", Document(page_content="hub"))
+    graph.add_artifacts((f"l{i}", Document(page_content=f"l{i}")) for i in range(1000))
+    graph.add_artifacts((f"c{i}", Document(page_content=f"c{i}")) for i in range(1000))
+    graph.add_relationships((f"l{i}", f"c{i}") for i in range(1000))
+    graph.add_relationships(
+        ("hub", f"l{i}", 1.0 if i < 3 else 0.5) for i in range(1000)
+    )
+    retriever = GraphRetriever(graph, max_depth=3, k=3)
+
+    with tracing.collect() as spans:
+        docs = retriever.retrieve_ranked(["hub"], scores=[2.0])
+
+    # Only the hub and the three strongest leaves were expanded
+    assert [d.page_content for d, _ in docs] == ["l0", "l1", "l2"]
+    assert [s for _, s in docs] == [1.0, 1.0, 1.0]
+    assert spans[0].counters["expanded"] == 4
+
+
+def test_graph_retriever_ranked_rejects_bad_budget() -> None:
+    graph = CourseGraph()
+    graph.add_artifact("a", Document(page_content="A"))
+    with pytest.raises(ValueError, match="k must be positive"):
+        GraphRetriever(graph, k=0)
+    with pytest.raises(ValueError, match="decay must be in"):
+        GraphRetriever(graph).retrieve_ranked(["a"], decay=0)
+
+
+def test_graph_retriever_pagerank_matches_networkx() -> None:
+    rng = random.Random(0)
+    graph = CSRCourseGraph()
+    graph.add_artifacts((f"n{i}", Document(page_content=f"N{i}")) for i in range(40))
+    graph.add_relationships(
+        (f"n{rng.randrange(40)}", f"n{rng.randrange(40)}", rng.random())
+        for _ in range(120)
+    )
+    retriever = GraphRetriever(graph)
+    seeds = {"n0": 1.0, "n1": 1.0}
+    expected = networkx.pagerank(
+        graph.graph,
+        alpha=0.5,
+        personalization=seeds,
+        dangling=seeds,
+        tol=1e-10,
+    )
+
+    ranked = retriever.retrieve_pagerank(["n0", "n1"], k=5, tol=1e-6)
+
+    top = sorted((n for n in expected if n not in seeds), key=expected.get)[::-1]
+    assert [d.page_content for d, _ in ranked] == [n.upper() for n in top[:5]]
+    for doc, score in ranked:
+        assert score == pytest.approx(expected[doc.page_content.lower()], abs=1e-5)
+
+
+def test_graph_retriever_pagerank_batches_and_warm_starts() -> None:
+    # B and c both link to hub; only a links to leaf
+    graph = CSRCourseGraph()
+    graph.add_artifacts(
+        (name, Document(page_content=name)) for name in ["a", "b", "c", "hub", "leaf"]
+    )
+    graph.add_relationships(
+        [("a", "leaf"), ("b", "hub"), ("c", "hub"), ("a", "hub"), ("hub", "a")]
+    )
+    retriever = GraphRetriever(graph)
+
+    with tracing.collect() as spans:
+        batched = retriever.retrieve_pagerank_many([["b", "c"], ["a"]], k=2, tol=1e-6)
+        again = retriever.retrieve_pagerank_many([["b", "c"], ["a"]], k=2, tol=1e-6)
+    single = retriever.retrieve_pagerank(["a"], k=2, tol=1e-6)
+
+    assert [d.page_content for d, _ in batched[0]] == ["hub", "a"]
+    assert [d.page_content for d, _ in batched[1]] == ["hub", "leaf"]
+    assert [s for _, s in batched[1]] == pytest.approx([s for _, s in single], abs=1e-5)
+    assert [s for _, s in again[0]] == pytest.approx(
+        [s for _, s in batched[0]], abs=1e-5
+    )
+    cold, warm = (s.counters["iterations"] for s in spans)
+    assert warm < cold
+
+
+def _course_graph():
+    graph = CSRCourseGraph()
+    graph.add_artifacts(
+        [
+            ("hw3", Document(page_content="HW3 gradient descent assignment")),
+            ("hw3_solution", Document(page_content="Solutions posted")),
+            ("lecture", Document(page_content="Lecture on sorting algorithms")),
+            ("post", Document(page_content="Question about sorting lecture")),
+        ]
+    )
+    graph.add_relationships([("hw3", "hw3_solution"), ("lecture", "post")])
+    return graph
+
+
+def test_graph_retriever_maps_text_queries_to_entry_artifacts() -> None:
+    graph = _course_graph()
+    retriever = GraphRetriever(graph, seeds=1)
+
+    with tracing.collect() as spans:
+        docs = retriever.invoke("when is hw3 due?")
+
+    assert [d.page_content for d in docs] == [
+        "HW3 gradient descent assignment",
+        "Solutions posted",
+    ]
+    assert {s.name for s in spans} == {"graph_entry", "graph_traverse"}
+    assert retriever.invoke("hw3") == [graph.document("hw3_solution")]
+    assert retriever.invoke("quantum chromodynamics") == []
+
+
+def test_graph_retriever_ranked_text_queries_include_entries() -> None:
+    graph = _course_graph()
+    retriever = GraphRetriever(graph, seeds=2, k=3, length=len)
+
+    docs = retriever.invoke("sorting lecture")
+
+    assert {d.page_content for d in docs[:2]} == {
+        "Lecture on sorting algorithms",
+        "Question about sorting lecture",
+    }
+    assert len(docs) == 2
+
+
+def test_graph_retriever_embedding_entry_index_embeds_new_texts_only() -> None:
+    class Counting(PassThroughEmbeddings):
+        embedded: list[str] = []
+
+        def embed_documents(self, texts):
+            self.embedded.extend(texts)
+            return super().embed_documents(texts)
+
+    graph = _course_graph()
+    embeddings = Counting()
+    retriever = GraphRetriever(graph, seeds=1, embeddings=embeddings)
+
+    first = retriever.entry_points("gradient descent")
+    graph.add_artifact("quiz", Document(page_content="Quiz on graph search"))
+    second = retriever.entry_points("graph search quiz")
+
+    assert first[0][0] == "hw3"
+    assert second[0][0] == "quiz"
+    assert len(embeddings.embedded) == 5
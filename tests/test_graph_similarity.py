@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from rag_ed import tracing
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.graphs import CourseGraph, CSRCourseGraph, link_similar, similarity_join
+
+
+def _brute_force(left, right, k, threshold):
+    left = left / np.linalg.norm(left, axis=1, keepdims=True)
+    right = right / np.linalg.norm(right, axis=1, keepdims=True)
+    sims = left @ right.T
+    pairs = {(i, int(j)) for i in range(len(left)) for j in np.argsort(-sims[i])[:k]}
+    pairs |= {
+        (int(i), j) for j in range(len(right)) for i in np.argsort(-sims[:, j])[:k]
+    }
+    return {pair: sims[pair] for pair in pairs if sims[pair] >= threshold}
+
+
+@pytest.mark.parametrize("block_size", [1, 7, None])
+def test_similarity_join_matches_brute_force(block_size) -> None:
+    rng = np.random.default_rng(0)
+    left = rng.standard_normal((120, 8))
+    right = rng.standard_normal((90, 8))
+    expected = _brute_force(left, right, k=3, threshold=0.3)
+
+    rows, cols, scores = similarity_join(
+        left, right, k=3, threshold=0.3, block_size=block_size
+    )
+
+    found = dict(zip(zip(rows.tolist(), cols.tolist()), scores.tolist()))
+    assert found.keys() == expected.keys()
+    for pair, score in found.items():
+        assert score == pytest.approx(expected[pair], abs=1e-5)
+    assert (np.diff(scores) <= 0).all()
+
+
+def test_similarity_join_caps_degree() -> None:
+    # Every left vector is closest to the same right vector.
+    rng = np.random.default_rng(1)
+    left = np.array([1.0, 0.0]) + 0.05 * rng.standard_normal((50, 2))
+    right = np.array([[1.0, 0.0], [0.0, 1.0]])
+
+    rows, cols, _ = similarity_join(left, right, k=2, threshold=-1.0, max_degree=4)
+
+    assert np.bincount(cols).max() <= 4
+    assert np.bincount(rows).max() <= 4
+    assert (cols == 0).sum() == 4
+
+
+@pytest.mark.parametrize("backend", [CourseGraph, CSRCourseGraph])
+def test_link_similar_adds_weighted_edges_both_ways(backend) -> None:
+    graph = backend()
+    pages = ["homework 3 gradient descent", "lecture notes on sorting"]
+    posts = ["question about sorting lecture", "gradient descent homework 3 help"]
+    graph.add_artifacts(
+        [(f"canvas_{i}", Document(page_content=t)) for i, t in enumerate(pages)]
+        + [(f"piazza_{i}", Document(page_content=t)) for i, t in enumerate(posts)]
+    )
+
+    with tracing.collect() as spans:
+        linked = link_similar(
+            graph,
+            ["canvas_0", "canvas_1"],
+            ["piazza_0", "piazza_1"],
+            PassThroughEmbeddings(),
+            k=1,
+            threshold=0.3,
+        )
+
+    assert linked == 2
+    assert graph.successors("canvas_0") == ["piazza_1"]
+    assert graph.successors("piazza_1") == ["canvas_0"]
+    assert graph.successors("canvas_1") == ["piazza_0"]
+    assert all(0.3 <= w <= 1.0 for w in graph.weights.tolist())
+    (span,) = spans
+    assert span.name == "graph_link"
+    assert span.counters == {"edges": 2}
@@ -0,0 +1,101 @@
+import gc
+import threading
+import weakref
+
+import pytest
+from rag_ed.retrievers.holder import IndexHolder
+
+
+class Index:
+    def __init__(self, version: int) -> None:
+        self.version = version
+
+    def retrieve(self, query: str) -> str:
+        return f"v{self.version}:{query}"
+
+
+def test_swap_under_concurrent_reads() -> None:
+    builds = iter(range(1, 100))
+    holder = IndexHolder(lambda: Index(next(builds)))
+    holder.refresh()
+    stop = threading.Event()
+    seen: list[tuple[int, int]] = []
+    errors: list[BaseException] = []
+
+    def reader() -> None:
+        try:
+            while not stop.is_set():
+                with holder.lease() as index:
+                    first = index.retrieve("q")
+                    second = index.retrieve("q")
+                assert first == second
+                seen.append((index.version, int(first[1 : first.index(":")])))
+        except BaseException as exc:  # noqa: BLE001 - checked after the join
+            errors.append(exc)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    versions = [holder.refresh_async().result(5) for _ in range(20)]
+    stop.set()
+    for thread in readers:
+        thread.join(5)
+
+    assert not errors
+    assert versions == list(range(2, 22)) and holder.version == 21
+    assert seen and all(leased == answered for leased, answered in seen)
+    assert holder.draining == 0
+
+
+def test_old_version_released_after_last_lease() -> None:
+    retired: list[int] = []
+    builds = iter(range(1, 10))
+    holder = IndexHolder(
+        lambda: Index(next(builds)),
+        on_retire=lambda index: retired.append(index.version),
+    )
+    holder.refresh()
+    old = weakref.ref(holder.get())
+
+    with holder.lease() as index:
+        assert holder.refresh() == 2
+        # The in-flight reader keeps answering from the old version.
+        assert index.retrieve("q") == "v1:q"
+        assert holder.get().version == 2
+        assert holder.draining == 1 and retired == []
+    assert retired == [1]
+    del index
+    gc.collect()
+    assert old() is None
+
+    holder.refresh()
+    assert retired == [1, 2]
+
+
+def test_failed_refresh_keeps_serving() -> None:
+    calls = []
+    release = threading.Event()
+
+    def build() -> Index:
+        calls.append(1)
+        if len(calls) == 2:
+            release.wait(5)
+            raise OSError("export missing")
+        return Index(len(calls))
+
+    holder = IndexHolder(build)
+    with pytest.raises(RuntimeError, match="not loaded"):
+        holder.get()
+    holder.refresh()
+
+    first = holder.refresh_async()
+    assert holder.refresh_async() is first and holder.refreshing
+    release.set()
+    with pytest.raises(OSError, match="export missing"):
+        first.result(5)
+    assert len(calls) == 2 and not holder.refreshing
+    assert isinstance(holder.error, OSError)
+    assert holder.get().retrieve("q") == "v1:q"
+
+    assert holder.refresh_async().result(5) == 2
+    assert holder.error is None
@@ -0,0 +1,40 @@
+"""Guard against heavy dependencies creeping back into start-up imports."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+HEAVY = ("langchain", "langchain_community", "langchain_openai", "unstructured")
+
+
+def _loaded_modules(code: str) -> set[str]:
+    script = f"{code}\nimport sys\nprint(' '.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"PYTHONPATH": SRC},
+    )
+    return set(result.stdout.split())
+
+
+def test_import_rag_ed_is_lazy() -> None:
+    modules = _loaded_modules("import rag_ed")
+    assert modules.isdisjoint(HEAVY)
+
+
+def test_lazy_export_resolves() -> None:
+    modules = _loaded_modules("from rag_ed import PiazzaLoader")
+    assert "rag_ed.loaders.piazza" in modules
+
+
+def test_vanilla_rag_help_skips_llm_stack() -> None:
+    modules = _loaded_modules(
+        "import contextlib, io\n"
+        "from rag_ed.agents import vanilla_rag\n"
+        "with contextlib.suppress(SystemExit), contextlib.redirect_stdout(io.StringIO()):\n"
+        "    vanilla_rag.main(['--help'])"
+    )
+    assert modules.isdisjoint(HEAVY)
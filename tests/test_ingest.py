@@ -0,0 +1,229 @@
+import time
+from pathlib import Path
+
+import langchain_community.vectorstores
+import langchain_core.documents
+import pytest
+import rag_ed.retrievers.vectorstore
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.ingest import IngestConfig, current_rss, ingest
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+
+def _source(i: int):
+    def load() -> list[langchain_core.documents.Document]:
+        return [
+            langchain_core.documents.Document(
+                page_content=f"file {i} part {j} " + "word " * 50,
+                metadata={"source": f"f{i}"},
+            )
+            for j in range(3)
+        ]
+
+    return load
+
+
+def _split(docs):
+    return [
+        langchain_core.documents.Document(
+            page_content=doc.page_content[start : start + 100],
+            metadata=doc.metadata,
+        )
+        for doc in docs
+        for start in range(0, len(doc.page_content), 100)
+    ]
+
+
+class CountingEmbeddings(PassThroughEmbeddings):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return super().embed_documents(texts)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_ingest_pipeline_indexes_every_chunk(workers: int) -> None:
+    sources = [_source(i) for i in range(20)]
+    embeddings = CountingEmbeddings()
+    config = IngestConfig(
+        parse_workers=workers,
+        split_workers=workers,
+        embed_workers=workers,
+        batch_size=16,
+        queue_size=2,
+        memory_budget=2000,
+    )
+    result = ingest(
+        sources,
+        split=_split,
+        embeddings=embeddings,
+        build_store=langchain_community.vectorstores.InMemoryVectorStore.from_documents,
+        config=config,
+    )
+
+    expected = sorted(c.page_content for s in sources for c in _split(s()))
+    assert sorted(result.chunks.texts()) == expected
+    assert len(result.vector_store.store) == len(expected)
+    # Vectors come from the embed stage only; the store never re-embeds.
+    assert embeddings.calls == result.stats.batches >= len(expected) // 16
+    assert result.stats.documents == 60
+    assert result.stats.chunks == len(expected)
+    assert set(result.stats.stages) == {"parse", "split", "embed", "index"}
+    # One file is admitted past the budget at most.
+    assert result.stats.peak_in_flight <= 2000 + 3 * 300
+    doc = result.chunks[5]
+    assert result.vector_store.get_by_ids([doc.id])[0].page_content == (
+        doc.page_content
+    )
+
+
+def test_ingest_rows_follow_source_order() -> None:
+    def slow(i: int):
+        def load() -> list[langchain_core.documents.Document]:
+            time.sleep(0.01 * (i % 4))  # later files often finish first
+            return _source(i)()
+
+        return load
+
+    sources = [slow(i) for i in range(12)]
+    result = ingest(
+        sources,
+        split=_split,
+        embeddings=PassThroughEmbeddings(),
+        build_store=langchain_community.vectorstores.InMemoryVectorStore.from_documents,
+        config=IngestConfig(
+            parse_workers=4,
+            split_workers=2,
+            embed_workers=3,
+            batch_size=5,
+            memory_budget=1000,
+        ),
+    )
+
+    expected = [c.page_content for s in sources for c in _split(s())]
+    assert list(result.chunks.texts()) == expected
+    for row in (0, 17, len(expected) - 1):
+        (hit,) = result.vector_store.get_by_ids([str(row)])
+        assert hit.page_content == expected[row]
+
+
+def test_ingest_without_chunks_builds_an_empty_faiss_store() -> None:
+    pytest.importorskip("faiss")
+    result = ingest(
+        [],
+        split=_split,
+        embeddings=PassThroughEmbeddings(),
+        build_store=lambda docs, model: rag_ed.retrievers.vectorstore._build_vector_store(
+            docs, model, "faiss", None
+        ),
+    )
+
+    assert result.stats.chunks == 0
+    assert result.vector_store.similarity_search("HW3", k=2) == []
+
+
+def test_ingest_pipeline_propagates_errors() -> None:
+    def broken() -> list[langchain_core.documents.Document]:
+        raise RuntimeError("corrupt file")
+
+    with pytest.raises(RuntimeError, match="corrupt file"):
+        ingest(
+            [_source(0), broken, *(_source(i) for i in range(1, 30))],
+            split=_split,
+            config=IngestConfig(queue_size=1, batch_size=1),
+        )
+
+
+def test_ingest_spills_to_disk_over_rss_limit(tmp_path: Path) -> None:
+    sources = [_source(i) for i in range(10)]
+    result = ingest(
+        sources,
+        split=_split,
+        embeddings=CountingEmbeddings(),
+        build_store=langchain_community.vectorstores.InMemoryVectorStore.from_documents,
+        # Any process is above one byte, so every handoff goes through disk.
+        config=IngestConfig(
+            batch_size=8, queue_size=2, rss_limit=1, spill_directory=str(tmp_path)
+        ),
+    )
+
+    expected = sorted(c.page_content for s in sources for c in _split(s()))
+    assert sorted(result.chunks.texts()) == expected
+    assert len(result.vector_store.store) == len(expected)
+    # Parsed files, chunk batches and embedded batches all spilled.
+    assert result.stats.spilled == 10 + 2 * result.stats.batches
+    assert result.stats.spilled_bytes > 0
+    assert result.stats.peak_rss is not None
+    assert result.stats.peak_rss > 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ingest_spilling_bounds_queued_memory(tmp_path: Path) -> None:
+    before = current_rss()
+    if before is None:
+        pytest.skip("RSS cannot be measured here")
+    size = 40 * 2**20  # above glibc's mmap threshold, so frees shrink the RSS
+
+    def load() -> list[langchain_core.documents.Document]:
+        return [langchain_core.documents.Document(page_content="x" * size)]
+
+    def slow_split(docs):
+        time.sleep(0.2)  # let parsed files queue up behind the split stage
+        return [langchain_core.documents.Document(page_content="x")]
+
+    result = ingest(
+        [load] * 8,
+        split=slow_split,
+        config=IngestConfig(
+            parse_workers=1, queue_size=4, rss_limit=1, spill_directory=str(tmp_path)
+        ),
+    )
+
+    assert result.stats.chunks == 8
+    assert result.stats.peak_rss is not None
+    # Kept in memory, the four queued files alone would take 4 * size.
+    assert result.stats.peak_rss - before < 3 * size
+
+
+def test_ingest_config_validation() -> None:
+    with pytest.raises(ValueError, match="batch_size must be positive"):
+        IngestConfig(batch_size=0)
+
+
+def test_retriever_pipelined_ingest(monkeypatch, tmp_path: Path) -> None:
+    class Loader:
+        def __init__(self, path: str) -> None:
+            self.course = Path(path).stem
+
+        def load(self) -> list[langchain_core.documents.Document]:
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"{self.course} HW{i} is due on day {i}",
+                    metadata={"course": self.course},
+                )
+                for i in range(10)
+            ]
+
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+
+    retriever = VectorStoreRetriever(
+        str(canvas),
+        str(piazza),
+        vector_store_type="in_memory",
+        embeddings=PassThroughEmbeddings(),
+        retrieval_mode="hybrid",
+        ingest_config=IngestConfig(batch_size=4),
+    )
+    assert len(retriever.chunks) == 20
+    assert retriever.ingest_stats is not None
+    assert retriever.ingest_stats.batches == 5
+    docs = retriever.retrieve("HW3", k=2, filter={"course": "p"})
+    assert docs[0].page_content == "p HW3 is due on day 3"
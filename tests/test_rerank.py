@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import langchain_core.documents
+import numpy as np
+import pytest
+import rag_ed.retrievers.vectorstore
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.rerank import Reranker, mmr
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+Document = langchain_core.documents.Document
+
+
+def _reference_mmr(relevance, vectors, k, lambda_mult):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < k:
+        best, best_gain = -1, -np.inf
+        for i in range(len(relevance)):
+            if i in selected:
+                continue
+            redundancy = max(unit[i] @ unit[j] for j in selected)
+            gain = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if gain > best_gain:
+                best, best_gain = i, gain
+        selected.append(best)
+    return selected
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.7, 1.0])
+def test_mmr_matches_reference(lambda_mult: float) -> None:
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    relevance = rng.random(40).astype(np.float32)
+    assert mmr(relevance, vectors, 10, lambda_mult=lambda_mult) == _reference_mmr(
+        relevance, vectors, 10, lambda_mult
+    )
+    assert mmr(relevance, vectors, 0) == []
+    assert len(mmr(relevance[:3], vectors[:3], 10)) == 3
+
+
+def test_reranker_uses_scorer_within_budget() -> None:
+    docs = [Document(page_content=f"doc {i}") for i in range(6)]
+    calls: list[int] = []
+
+    def scorer(query: str, texts) -> list[float]:
+        calls.append(len(texts))
+        return [float(text.split()[1]) for text in texts]
+
+    reranker = Reranker(scorer=scorer, lambda_mult=1.0, batch_size=4)
+    assert [d.page_content for d in reranker.rerank("q", docs, 3)] == [
+        "doc 5",
+        "doc 4",
+        "doc 3",
+    ]
+    assert calls == [4, 2]
+
+    def slow(query: str, texts) -> list[float]:
+        time.sleep(0.05)
+        return scorer(query, texts)
+
+    calls.clear()
+    budgeted = Reranker(scorer=slow, latency_budget=0.01, batch_size=4)
+    # The first batch overruns the budget: the rest keep first-stage order.
+    ranked = budgeted.rerank("q", docs, 4, embed=lambda d: pytest.fail("late"))
+    assert [d.page_content for d in ranked] == ["doc 3", "doc 2", "doc 1", "doc 0"]
+    assert calls == [4]
+
+
+def test_reranker_validation() -> None:
+    with pytest.raises(ValueError, match="lambda_mult"):
+        Reranker(lambda_mult=1.5)
+    with pytest.raises(ValueError, match="fetch_k must be positive"):
+        Reranker(fetch_k=0)
+
+
+def test_retriever_diversifies_overlapping_chunks(monkeypatch, tmp_path: Path) -> None:
+    class Loader:
+        def __init__(self, path: str) -> None:
+            self.course = Path(path).stem
+
+        def load(self) -> list[Document]:
+            texts = ["HW3 is due Friday at noon"] * 4 + ["HW3 solutions are posted"]
+            return [
+                Document(page_content=text, metadata={"course": self.course})
+                for text in texts
+            ]
+
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+
+    def build(reranker: Reranker | None) -> VectorStoreRetriever:
+        return VectorStoreRetriever(
+            str(canvas),
+            str(piazza),
+            vector_store_type="in_memory",
+            embeddings=PassThroughEmbeddings(),
+            reranker=reranker,
+        )
+
+    query = "when is hw3 due friday"
+    plain = build(None).retrieve(query, k=2)
+    assert {doc.page_content for doc in plain} == {"HW3 is due Friday at noon"}
+    diverse = build(Reranker(fetch_k=10)).retrieve(query, k=2)
+    assert [doc.page_content for doc in diverse] == [
+        "HW3 is due Friday at noon",
+        "HW3 solutions are posted",
+    ]
+    filtered = build(Reranker(fetch_k=10)).retrieve(query, k=2, filter={"course": "c"})
+    assert {doc.metadata["course"] for doc in filtered} == {"c"}
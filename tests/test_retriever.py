@@ -1,5 +1,7 @@
+import datetime
 import os
 from pathlib import Path
+from typing import Any
 
 import langchain_core.documents
 from langchain_core.embeddings import Embeddings
@@ -10,6 +12,11 @@ import langchain_community.vectorstores
 from rag_ed.embeddings import PassThroughEmbeddings
 from rag_ed.loaders.canvas import CanvasLoader
 from rag_ed.loaders.piazza import PiazzaLoader
+from rag_ed.retrievers.cache import LRUCache, QueryCache
+from rag_ed.retrievers.chunkstore import ChunkStore
+from rag_ed.retrievers.lexical import BM25Index
+from rag_ed.retrievers.metadata import MetadataIndex
+from rag_ed.retrievers.snapshot import ArrayVectorStore
 from rag_ed.retrievers.vectorstore import VectorStoreRetriever
 from tests.imscc_utils import generate_imscc
 from tests.piazza_utils import generate_piazza_export
@@ -46,6 +53,8 @@ def test_vector_store_retriever(tmp_path: Path) -> None:
     retriever = VectorStoreRetriever.__new__(VectorStoreRetriever)
     object.__setattr__(retriever, "vector_store", vector_store)
     object.__setattr__(retriever, "k", 1)
+    object.__setattr__(retriever, "cache", None)
+    object.__setattr__(retriever, "retrieval_mode", "vector")
     results = retriever.retrieve("Hello", k=1)
     assert len(results) == 1
 
@@ -60,24 +69,7 @@ def test_custom_embeddings_and_inmemory(monkeypatch, tmp_path: Path) -> None:
         def embed_query(self, text: str) -> list[float]:  # noqa: D401
             return [1.0]
 
-    class DummyVectorStore:
-        @classmethod
-        def from_documents(
-            cls, docs: list, embeddings: Embeddings
-        ) -> "DummyVectorStore":
-            assert embeddings is dummy_embeddings
-            return cls()
-
-        def similarity_search(self, query: str, k: int) -> list:  # noqa: D401
-            return []
-
     dummy_embeddings = DummyEmbeddings()
-    monkeypatch.setattr(
-        rag_ed.retrievers.vectorstore.langchain.vectorstores,
-        "InMemoryVectorStore",
-        DummyVectorStore,
-        raising=False,
-    )
 
     class Loader:
         def __init__(self, _path: str) -> None:  # noqa: D401
@@ -99,12 +91,21 @@ def test_custom_embeddings_and_inmemory(monkeypatch, tmp_path: Path) -> None:
         lambda *a, **k: (_ for _ in ()).throw(RuntimeError("should not call")),
     )
 
-    VectorStoreRetriever(
+    retriever = VectorStoreRetriever(
         str(canvas),
         str(piazza),
         vector_store_type="in_memory",
         embeddings=dummy_embeddings,
     )
+    store = retriever.vector_store
+    assert isinstance(store, ArrayVectorStore)
+    assert store.embeddings is dummy_embeddings
+    # The store reads its documents from the retriever's chunk store.
+    assert store.chunks is retriever.chunks
+    assert store.vectors.shape == (2, 1)
+    retriever.add_documents([langchain_core.documents.Document(page_content="y")])
+    assert store.chunks is retriever.chunks
+    assert store.vectors.shape == (3, 1)
 
 
 def test_faiss_persistence(monkeypatch, tmp_path: Path) -> None:
@@ -254,12 +255,6 @@ def test_vector_store_retriever_missing_files() -> None:
 def test_passthrough_embeddings_retrieve(monkeypatch, tmp_path: Path) -> None:
     """In-memory retrieval works with :class:`PassThroughEmbeddings`."""
 
-    monkeypatch.setattr(
-        rag_ed.retrievers.vectorstore.langchain.vectorstores,
-        "InMemoryVectorStore",
-        langchain_community.vectorstores.InMemoryVectorStore,
-        raising=False,
-    )
     canvas_path = generate_imscc(tmp_path / "canvas.imscc")
     piazza_path = generate_piazza_export(tmp_path / "piazza.zip")
     retriever = VectorStoreRetriever(
@@ -272,3 +267,307 @@ def test_passthrough_embeddings_retrieve(monkeypatch, tmp_path: Path) -> None:
     assert any("Hello from Piazza" in doc.page_content for doc in piazza_docs)
     canvas_docs = retriever.retrieve("minimal", k=3)
     assert any("Minimal CC Example" in doc.page_content for doc in canvas_docs)
+
+
+def test_lru_cache_evicts_and_expires() -> None:
+    now = [0.0]
+    cache: LRUCache[int] = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+    assert cache.stats.expirations == 1
+    assert cache.stats.hit_rate == 1 / 3
+
+
+def test_query_cache_reuses_results_until_index_update(
+    monkeypatch, tmp_path: Path
+) -> None:
+    """Repeated queries skip embedding and search until the index changes."""
+
+    queries: list[str] = []
+
+    class CountingEmbeddings(PassThroughEmbeddings):
+        def embed_query(self, text: str) -> list[float]:
+            queries.append(text)
+            return super().embed_query(text)
+
+    class Loader:
+        def __init__(self, _path: str) -> None:  # noqa: D401
+            pass
+
+        def load(self) -> list[langchain_core.documents.Document]:  # noqa: D401
+            return [
+                langchain_core.documents.Document(page_content="hello piazza"),
+                langchain_core.documents.Document(page_content="midterm date"),
+            ]
+
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    cache = QueryCache(maxsize=8)
+    retriever = VectorStoreRetriever(
+        str(canvas),
+        str(piazza),
+        vector_store_type="in_memory",
+        embeddings=CountingEmbeddings(),
+        cache=cache,
+    )
+
+    first = retriever.retrieve("Hello  Piazza", k=2)
+    first[0].metadata["edited"] = True
+    second = retriever.retrieve("hello piazza", k=2)
+    assert [doc.page_content for doc in first] == [doc.page_content for doc in second]
+    assert "edited" not in second[0].metadata
+    # The model sees the query as typed; the cache key is normalized.
+    assert queries == ["Hello  Piazza"]
+    assert cache.stats()["results"].hits == 1
+
+    retriever.add_documents(
+        [langchain_core.documents.Document(page_content="hello piazza again")]
+    )
+    retriever.retrieve("hello piazza", k=2)
+    assert cache.stats()["results"].misses == 2
+    assert cache.stats()["embeddings"].hits == 1
+
+
+def test_bm25_index_ranks_exact_identifiers() -> None:
+    index = BM25Index(
+        ["HW3 is due Friday", "Homework policy and late days", "hw3 hw3 solutions"]
+    )
+    assert [row for row, _ in index.search("HW3", k=5)] == [2, 0]
+    assert index.search("nothing matches", k=5) == []
+
+
+@pytest.mark.parametrize("mode", ["bm25", "hybrid"])
+def test_lexical_retrieval_modes(monkeypatch, tmp_path: Path, mode: str) -> None:
+    """Lexical modes surface exact identifier matches; bm25 needs no embeddings."""
+
+    class Loader:
+        def __init__(self, path: str) -> None:  # noqa: D401
+            self.path = path
+
+        def load(self) -> list[langchain_core.documents.Document]:  # noqa: D401
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"{text} from {self.path}",
+                    metadata={"source": f"{self.path}/{i}"},
+                )
+                for i, text in enumerate(["HW3 is due Friday", "Office hours"])
+            ]
+
+    monkeypatch.setattr(
+        langchain_openai.embeddings,
+        "OpenAIEmbeddings",
+        lambda *a, **k: (_ for _ in ()).throw(RuntimeError("should not call")),
+    )
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+
+    retriever = VectorStoreRetriever(
+        str(canvas),
+        str(piazza),
+        vector_store_type="in_memory",
+        embeddings=PassThroughEmbeddings() if mode == "hybrid" else None,
+        retrieval_mode=mode,  # type: ignore[arg-type]
+    )
+
+    docs = retriever.retrieve("hw3", k=2)
+    assert len(docs) == 2
+    assert all("HW3" in doc.page_content for doc in docs)
+    assert (retriever.vector_store is None) == (mode == "bm25")
+
+
+def test_metadata_index_masks() -> None:
+    index = MetadataIndex(
+        [
+            {"course": "a", "timestamp": "2024-01-01T00:00:00"},
+            {"course": "b", "timestamp": "2024-02-01T00:00:00Z"},
+            {"course": "c", "resource_type": "quiz"},
+        ]
+    )
+    assert index.mask({"course": "a"}).tolist() == [True, False, False]
+    assert index.mask({"course": ["a", "c"]}).tolist() == [True, False, True]
+    assert index.mask({"timestamp": {"$gte": "2024-01-15"}}).tolist() == [
+        False,
+        True,
+        False,
+    ]
+    assert index.mask({"resource_type": {"$ne": "quiz"}}).tolist() == [
+        True,
+        True,
+        False,
+    ]
+    with pytest.raises(ValueError, match="Unsupported filter operators"):
+        index.mask({"course": {"$regex": "a"}})
+
+
+@pytest.mark.parametrize("mode", ["vector", "bm25"])
+def test_retrieve_with_metadata_filter(monkeypatch, tmp_path: Path, mode: str) -> None:
+    """Filtered queries only return chunks whose metadata matches."""
+
+    class Loader:
+        def __init__(self, path: str) -> None:  # noqa: D401
+            self.course = Path(path).stem
+
+        def load(self) -> list[langchain_core.documents.Document]:  # noqa: D401
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"midterm review week {week}",
+                    metadata={
+                        "course": self.course,
+                        "timestamp": f"2024-0{week}-01T00:00:00",
+                    },
+                )
+                for week in (1, 2, 3)
+            ]
+
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    retriever = VectorStoreRetriever(
+        str(canvas),
+        str(piazza),
+        vector_store_type="in_memory",
+        embeddings=PassThroughEmbeddings(),
+        retrieval_mode=mode,  # type: ignore[arg-type]
+        cache=QueryCache(),
+    )
+
+    docs = retriever.retrieve(
+        "midterm review",
+        k=5,
+        filter={"course": "p", "timestamp": {"$gte": "2024-02-01"}},
+    )
+    assert len(docs) == 2
+    assert {doc.metadata["course"] for doc in docs} == {"p"}
+    assert retriever.retrieve("midterm review", k=5, filter={"course": "x"}) == []
+    assert len(retriever.retrieve("midterm review", k=5)) == 5
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_chunk_store_round_trip(tmp_path: Path, compress: bool) -> None:
+    docs = [
+        langchain_core.documents.Document(
+            page_content=f"chunk {i} \u00fcber HW{i}",
+            metadata={"course": "ME201", "source": f"s{i % 2}"}
+            | ({"page": i} if i % 3 == 0 else {}),
+        )
+        for i in range(7)
+    ]
+    store = ChunkStore.from_documents(docs, compress=compress, block_size=3)
+    assert len(store) == 7
+    assert store.compressed is compress
+    assert [d.page_content for d in store] == [d.page_content for d in docs]
+    assert store.metadata(4) == {"course": "ME201", "source": "s0"}
+    assert store[3].id == "3" and store[3].metadata["page"] == 3
+    values, codes = store.column("course")
+    assert values == ["ME201"] and codes.tolist() == [0] * 7
+
+    store.save(tmp_path / "chunks")
+    loaded = ChunkStore.load(tmp_path / "chunks")
+    assert [loaded.metadata(i) for i in range(7)] == [d.metadata for d in docs]
+    assert list(loaded.texts()) == [d.page_content for d in docs]
+
+    extended = loaded.with_documents(
+        [langchain_core.documents.Document(page_content="new", metadata={"x": 1})]
+    )
+    assert len(extended) == 8
+    assert extended[7].page_content == "new"
+    assert extended.metadata(7) == {"x": 1}
+    assert "x" not in extended.metadata(0)
+    with pytest.raises(IndexError):
+        store.text(7)
+
+
+def test_metadata_index_over_chunk_store() -> None:
+    metadatas: list[dict[str, Any]] = [
+        {"course": "a", "timestamp": "2024-01-01T00:00:00", "flag": 1},
+        {"course": "b", "timestamp": "2024-02-01T00:00:00Z", "flag": True},
+        {"course": "c", "resource_type": "quiz"},
+    ]
+    store = ChunkStore.from_documents(
+        langchain_core.documents.Document(page_content="x", metadata=m)
+        for m in metadatas
+    )
+    for flt in (
+        {"course": ["a", "c"]},
+        {"timestamp": {"$gte": "2024-01-15"}},
+        {"resource_type": {"$ne": "quiz"}},
+        {"flag": 1},
+    ):
+        expected = MetadataIndex(metadatas).mask(flt).tolist()
+        assert MetadataIndex(store).mask(flt).tolist() == expected
+
+
+def test_faiss_filter_matches_metadata_index() -> None:
+    metadatas = [
+        {"course": "a", "timestamp": "2024-01-01T00:00:00"},
+        {"course": "b", "timestamp": "2024-03-01T00:00:00"},
+        {"course": "c", "resource_type": "quiz"},
+        {"resource_type": "page", "timestamp": "not a date"},
+    ]
+    retriever = VectorStoreRetriever.__new__(VectorStoreRetriever)
+    object.__setattr__(retriever, "vector_store", object())
+    object.__setattr__(retriever, "vector_store_type", "faiss")
+    index = MetadataIndex(metadatas)
+    for flt in (
+        {"timestamp": {"$gte": datetime.datetime(2024, 2, 1)}},
+        {"timestamp": {"$lt": "2024-02-01", "$gt": datetime.datetime(2023, 1, 1)}},
+        {"course": {"$ne": "a"}},
+        {"course": {"$nin": ["a", "b"]}, "resource_type": "quiz"},
+        {"course": ["a", "c"]},
+    ):
+        mask = index.mask(flt)
+        kwargs = retriever._store_filter(flt, mask, k=1)
+        matches = langchain_community.vectorstores.FAISS._create_filter_func(
+            kwargs["filter"]
+        )
+        assert [matches(m) for m in metadatas] == mask.tolist(), flt
+
+
+def test_chroma_filter_matches_metadata_index() -> None:
+    metadatas = [
+        {"course": "a", "timestamp": "2024-01-01T00:00:00"},
+        {"course": "b", "timestamp": "2024-03-01T00:00:00"},
+        {"course": "c", "resource_type": "quiz"},
+        {"resource_type": "page", "timestamp": "not a date"},
+    ]
+
+    class FakeChroma:
+        def similarity_search(self, query: str, k: int, **kwargs: Any) -> list:
+            # Chroma's ``where`` cannot compare dates, so none is passed.
+            assert not kwargs
+            return [
+                langchain_core.documents.Document(page_content=str(row), metadata=m)
+                for row, m in enumerate(metadatas)
+            ][:k]
+
+    retriever = VectorStoreRetriever.__new__(VectorStoreRetriever)
+    object.__setattr__(retriever, "vector_store", FakeChroma())
+    object.__setattr__(retriever, "vector_store_type", "chroma")
+    object.__setattr__(retriever, "cache", None)
+    index = MetadataIndex(metadatas)
+    for flt in (
+        {"timestamp": {"$gte": datetime.datetime(2024, 2, 1)}},
+        {"timestamp": {"$lt": "2024-02-01", "$gt": datetime.datetime(2023, 1, 1)}},
+        {"course": {"$nin": ["a", "b"]}},
+    ):
+        mask = index.mask(flt)
+        docs = retriever._vector_search("query", 4, flt, mask)
+        rows = [row for row, selected in enumerate(mask) if selected]
+        assert [int(doc.page_content) for doc in docs] == rows, flt
@@ -0,0 +1,192 @@
+"""Tests for the long-lived retrieval server."""
+
+import http.client
+import json
+import threading
+from pathlib import Path
+
+import langchain_core.documents
+import langchain_core.retrievers
+import pytest
+from langchain_core.language_models import FakeListLLM
+
+from rag_ed.agents import server, vanilla_rag
+
+
+class DummyRetriever:
+    def retrieve(self, query: str, k=None, *, filter=None):  # noqa: D401
+        return [langchain_core.documents.Document(page_content=f"doc for {query}")]
+
+
+def _service(build) -> server.RetrievalService:
+    """Serve a stand-in retriever; the service is typed for the real one."""
+    return server.RetrievalService(build)
+
+
+def _serve(service: server.RetrievalService, **kwargs):
+    httpd = server.make_server(service, **kwargs)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
+def test_server_health_and_query_over_tcp() -> None:
+    release = threading.Event()
+
+    def build():
+        release.wait()
+        return DummyRetriever()
+
+    service = server.RetrievalService(build)
+    service.start()
+    httpd = _serve(service, port=0)
+    client = server.RetrievalClient(f"http://127.0.0.1:{httpd.server_address[1]}")
+
+    try:
+        assert client.health() == {"status": "ok", "ready": False}
+        assert not client.ready()
+        with pytest.raises(RuntimeError, match="503"):
+            client.query("midterm", pass_through=True)
+        release.set()
+        service._ready.wait(5)
+        assert client.ready()
+        response = client.query("midterm", pass_through=True)
+        assert response["answer"] == "doc for midterm"
+        assert response["documents"][0]["page_content"] == "doc for midterm"
+        assert "timings" not in response
+        traced = client.query("midterm", pass_through=True, trace=True)
+        assert set(traced["timings"]) == {"request"}
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.mark.parametrize("body", [b"[]", b'"midterm"', b"{"])
+def test_malformed_query_body_is_a_bad_request(body: bytes) -> None:
+    service = _service(DummyRetriever)
+    service.load()
+    httpd = _serve(service, port=0)
+    connection = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1])
+    try:
+        connection.request("POST", "/query", body=body)
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "error" in json.loads(response.read())
+    finally:
+        connection.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_cli_forwards_to_unix_socket_server(tmp_path: Path, capsys) -> None:
+    service = _service(DummyRetriever)
+    service.load()
+    socket_path = str(tmp_path / "rag.sock")
+    httpd = _serve(service, socket_path=socket_path)
+
+    try:
+        vanilla_rag.main(["hw3", "--pass-through", "--server", f"unix://{socket_path}"])
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert capsys.readouterr().out.strip() == "doc for hw3"
+
+
+def test_unix_server_replaces_only_stale_sockets(tmp_path: Path) -> None:
+    service = _service(DummyRetriever)
+    socket_path = tmp_path / "rag.sock"
+    server.make_server(service, socket_path=str(socket_path)).server_close()
+    # The closed server left its socket behind; a new server replaces it.
+    server.make_server(service, socket_path=str(socket_path)).server_close()
+
+    data = tmp_path / "notes.txt"
+    data.write_text("keep me")
+    with pytest.raises(FileExistsError, match="not a socket"):
+        server.make_server(service, socket_path=str(data))
+    assert data.read_text() == "keep me"
+
+
+def test_reload_swaps_index_without_downtime() -> None:
+    release = threading.Event()
+    builds = []
+
+    class VersionedRetriever(DummyRetriever):
+        def __init__(self, version: int) -> None:
+            self.version = version
+
+        def retrieve(self, query: str, k=None, *, filter=None):
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"v{self.version} {query}"
+                )
+            ]
+
+    def build():
+        builds.append(1)
+        if len(builds) > 1:
+            release.wait(5)
+        return VersionedRetriever(len(builds))
+
+    service = server.RetrievalService(build)
+    service.load()
+    httpd = _serve(service, port=0)
+    client = server.RetrievalClient(f"http://127.0.0.1:{httpd.server_address[1]}")
+
+    try:
+        assert client.reload() == {"version": 1, "reloading": True}
+        assert client.health()["reloading"]
+        assert client.query("hw3", pass_through=True)["answer"] == "v1 hw3"
+        pending = service.reload()  # joins the build already running
+        release.set()
+        assert pending.result(5) == 2
+        assert client.query("hw3", pass_through=True)["answer"] == "v2 hw3"
+        assert client.health() == {
+            "status": "ok",
+            "ready": True,
+            "version": 2,
+            "reloading": False,
+        }
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_query_answers_through_the_llm(monkeypatch) -> None:
+    class Retriever(langchain_core.retrievers.BaseRetriever):
+        calls: list = []
+
+        def _get_relevant_documents(self, query, *, run_manager):
+            raise AssertionError("documents come from retrieve()")
+
+        def retrieve(self, query: str, k=None, *, filter=None):
+            self.calls.append((query, k, filter))
+            return [langchain_core.documents.Document(page_content="HW3 is due Friday")]
+
+    prompts = []
+
+    class LLM(FakeListLLM):
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            prompts.append(prompt)
+            return super()._call(prompt, stop, run_manager, **kwargs)
+
+    monkeypatch.setattr(
+        vanilla_rag,
+        "OpenAI",
+        lambda **kwargs: LLM(responses=["Friday"]),
+        raising=False,
+    )
+    retriever = Retriever()
+    service = _service(lambda: retriever)
+    service.load()
+    httpd = _serve(service, port=0)
+    client = server.RetrievalClient(f"http://127.0.0.1:{httpd.server_address[1]}")
+    try:
+        response = client.query("When is HW3 due?", k=2, filter={"course": "ME201"})
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert response == {"answer": "Friday"}
+    assert retriever.calls == [("When is HW3 due?", 2, {"course": "ME201"})]
+    assert "HW3 is due Friday" in prompts[0]
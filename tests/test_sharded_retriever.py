@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import langchain_core.documents
+import pytest
+
+import rag_ed.retrievers.vectorstore
+from rag_ed.retrievers.cache import QueryCache
+from rag_ed.retrievers.rerank import Reranker
+from rag_ed.retrievers.sharded import ShardedRetriever
+
+
+class Loader:
+    builds: list[str] = []
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def load(self) -> list[langchain_core.documents.Document]:
+        Loader.builds.append(self.path.stem)
+        course = self.path.parent.name
+        text = self.path.read_text()
+        return [
+            langchain_core.documents.Document(
+                page_content=f"{text} {course}", metadata={"course": course}
+            )
+        ]
+
+
+@pytest.fixture
+def courses(monkeypatch, tmp_path: Path) -> dict[str, tuple[str, str]]:
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    Loader.builds = []
+    paths = {}
+    for course, topic in [("me201", "statics hw3"), ("me301", "dynamics hw3")]:
+        (tmp_path / course).mkdir()
+        canvas = tmp_path / course / "canvas.imscc"
+        canvas.write_text(f"{topic} syllabus")
+        piazza = tmp_path / course / "piazza.zip"
+        piazza.write_text(f"{topic} question")
+        paths[course] = (str(canvas), str(piazza))
+    return paths
+
+
+def test_sharded_retriever_merges_shards(courses) -> None:
+    retriever = ShardedRetriever(courses, retrieval_mode="bm25", k=4)
+
+    docs = retriever.retrieve("hw3")
+    statics = retriever.retrieve("statics", k=1)
+
+    assert len(docs) == 4
+    assert {d.metadata["course"] for d in docs} == {"me201", "me301"}
+    assert [d.metadata["course"] for d in statics] == ["me201"]
+    retriever.close()
+
+
+def test_sharded_retriever_loads_lazily_and_evicts(courses) -> None:
+    retriever = ShardedRetriever(courses, retrieval_mode="bm25", max_loaded_shards=1)
+
+    assert retriever.loaded_shards == []
+    retriever.retrieve("hw3", courses=["me201"])
+    assert retriever.loaded_shards == ["me201"]
+    retriever.retrieve("hw3", courses=["me301"])
+    assert retriever.loaded_shards == ["me301"]
+    Loader.builds.clear()
+    retriever.reindex("me301")
+    assert Loader.builds == ["canvas", "piazza"]
+    with pytest.raises(KeyError, match="Unknown course"):
+        retriever.shard("me999")
+    retriever.close()
+
+
+def test_sharded_retriever_caches_merged_results(courses, tmp_path: Path) -> None:
+    cache = QueryCache(maxsize=8)
+    retriever = ShardedRetriever(courses, retrieval_mode="bm25", k=1, cache=cache)
+
+    first = retriever.retrieve("statics")
+    first[0].metadata["edited"] = True
+    second = retriever.retrieve("statics")
+    assert [d.page_content for d in second] == [d.page_content for d in first]
+    assert "edited" not in second[0].metadata
+    assert cache.stats()["results"].hits == 1
+
+    (tmp_path / "me301" / "canvas.imscc").write_text("statics statics")
+    retriever.reindex("me301")
+    (doc,) = retriever.retrieve("statics")
+    assert doc.page_content == "statics statics me301"
+    assert cache.stats()["results"].misses == 2
+    retriever.close()
+
+
+def test_sharded_retriever_rejects_unsupported_setups(courses) -> None:
+    with pytest.raises(ValueError, match="cannot rerank"):
+        ShardedRetriever(courses, retrieval_mode="bm25", reranker=Reranker())
+    retriever = ShardedRetriever(courses, retrieval_mode="bm25", max_loaded_shards=1)
+    with pytest.raises(ValueError, match="Cannot search 2 courses"):
+        retriever.retrieve("hw3")
+    assert retriever.loaded_shards == []
+    retriever.close()
@@ -0,0 +1,134 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import langchain_core.documents
+import pytest
+import rag_ed.retrievers.vectorstore
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.snapshot import read_header, read_snapshot, write_snapshot
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+SRC = str(Path(__file__).resolve().parents[1] / "src")
+
+
+@pytest.fixture
+def build(monkeypatch, tmp_path: Path):
+    class Loader:
+        def __init__(self, path: str) -> None:
+            self.course = Path(path).stem
+
+        def load(self) -> list[langchain_core.documents.Document]:
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"{self.course} HW{i} is due on day {i}",
+                    metadata={"course": self.course, "week": i % 4},
+                )
+                for i in range(30)
+            ]
+
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+
+    def build(**kwargs) -> VectorStoreRetriever:
+        kwargs.setdefault("vector_store_type", "in_memory")
+        return VectorStoreRetriever(str(canvas), str(piazza), **kwargs)
+
+    return build
+
+
+@pytest.mark.parametrize("mode", ["vector", "hybrid", "bm25"])
+def test_snapshot_round_trip(build, tmp_path: Path, mode: str) -> None:
+    embeddings = None if mode == "bm25" else PassThroughEmbeddings()
+    retriever = build(
+        embeddings=embeddings,
+        retrieval_mode=mode,
+        compress_chunks=mode == "hybrid",
+        k=3,
+    )
+    path = tmp_path / "index.snap"
+    retriever.save_snapshot(path)
+    opened = VectorStoreRetriever.from_snapshot(path, embeddings=embeddings)
+
+    assert opened.k == 3 and opened.retrieval_mode == mode
+    assert list(opened.chunks.texts()) == list(retriever.chunks.texts())
+    for query, filter in [("p HW7 due", None), ("HW2", {"week": 2, "course": "c"})]:
+        expected = retriever.retrieve_with_scores(query, filter=filter)
+        got = opened.retrieve_with_scores(query, filter=filter)
+        if mode != "hybrid":
+            # Fused scores depend on how each store orders tied vectors.
+            assert [score for _, score in got] == pytest.approx(
+                [score for _, score in expected], abs=1e-5
+            )
+        if filter:
+            assert all(doc.metadata["week"] == 2 for doc, _ in got)
+    top = opened.retrieve("c HW11 is due on day 11")[0]
+    assert top.page_content == "c HW11 is due on day 11"
+
+    opened.add_documents(
+        [langchain_core.documents.Document(page_content="HW99 posted late")]
+    )
+    assert opened.retrieve("HW99 posted late", k=1)[0].page_content == (
+        "HW99 posted late"
+    )
+
+
+def test_snapshot_opens_in_fresh_process(build, tmp_path: Path) -> None:
+    retriever = build(embeddings=PassThroughEmbeddings(), retrieval_mode="hybrid")
+    path = tmp_path / "index.snap"
+    retriever.save_snapshot(path)
+    query = "p HW4 is due on day 4"
+    expected = retriever.retrieve(query, k=1)[0].page_content
+
+    script = (
+        "import json, sys\n"
+        "from rag_ed.embeddings import PassThroughEmbeddings\n"
+        "from rag_ed.retrievers.vectorstore import VectorStoreRetriever\n"
+        f"r = VectorStoreRetriever.from_snapshot({str(path)!r}, "
+        "embeddings=PassThroughEmbeddings())\n"
+        f"doc = r.retrieve({query!r}, k=1)[0].page_content\n"
+        "print(json.dumps([doc, sorted(sys.modules)]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={"PYTHONPATH": SRC},
+    )
+    doc, modules = json.loads(result.stdout)
+    assert doc == expected == query
+    assert "rag_ed.loaders.canvas" not in modules
+    assert "unstructured" not in modules
+
+
+def test_snapshot_rejects_bad_input(build, tmp_path: Path) -> None:
+    path = tmp_path / "index.snap"
+    build(embeddings=PassThroughEmbeddings(dimension=64)).save_snapshot(path)
+    header = read_header(path)
+    assert header["config"]["dimension"] == 64
+    assert header["config"]["embeddings"].endswith("PassThroughEmbeddings")
+    other = tmp_path / "other.snap"
+    build(embeddings=PassThroughEmbeddings(dimension=64), k=7).save_snapshot(other)
+    assert read_header(other)["fingerprint"] != header["fingerprint"]
+
+    class OtherEmbeddings(PassThroughEmbeddings):
+        pass
+
+    with pytest.raises(ValueError, match="Snapshot was built with"):
+        VectorStoreRetriever.from_snapshot(path, embeddings=OtherEmbeddings())
+    header, arrays = read_snapshot(path)
+    header["config"]["retrieval_mode"] = "bm25"
+    altered = tmp_path / "altered.snap"
+    write_snapshot(altered, header, arrays)
+    with pytest.raises(ValueError, match="does not match its fingerprint"):
+        VectorStoreRetriever.from_snapshot(altered)
+    not_snapshot = tmp_path / "garbage.bin"
+    not_snapshot.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError, match="Not a retriever snapshot"):
+        VectorStoreRetriever.from_snapshot(not_snapshot)
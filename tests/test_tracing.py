@@ -0,0 +1,153 @@
+import json
+from pathlib import Path
+
+import langchain_core.callbacks
+import langchain_core.callbacks.manager
+import langchain_core.documents
+import pytest
+import rag_ed.retrievers.vectorstore
+from rag_ed import tracing
+from rag_ed.embeddings import PassThroughEmbeddings
+from rag_ed.retrievers.ingest import IngestConfig
+from rag_ed.retrievers.vectorstore import VectorStoreRetriever
+
+
+@pytest.fixture
+def memory():
+    exporter = tracing.InMemoryExporter()
+    previous = tracing.set_tracer(tracing.Tracer(exporter))
+    yield exporter
+    tracing.set_tracer(previous)
+
+
+@pytest.fixture
+def build(monkeypatch, tmp_path: Path):
+    class Loader:
+        def __init__(self, path: str) -> None:
+            self.course = Path(path).stem
+
+        def load(self) -> list[langchain_core.documents.Document]:
+            return [
+                langchain_core.documents.Document(
+                    page_content=f"{self.course} HW{i} is due on day {i}",
+                    metadata={"course": self.course},
+                )
+                for i in range(10)
+            ]
+
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "CanvasLoader", Loader)
+    monkeypatch.setattr(rag_ed.retrievers.vectorstore, "PiazzaLoader", Loader)
+    canvas = tmp_path / "c.imscc"
+    canvas.write_text("x")
+    piazza = tmp_path / "p.zip"
+    piazza.write_text("x")
+
+    def build(**kwargs) -> VectorStoreRetriever:
+        return VectorStoreRetriever(
+            str(canvas),
+            str(piazza),
+            vector_store_type="in_memory",
+            embeddings=PassThroughEmbeddings(),
+            **kwargs,
+        )
+
+    return build
+
+
+def _tree(spans: list[tracing.Span]) -> dict[str, set[str]]:
+    names = {s.span_id: s.name for s in spans}
+    children: dict[str, set[str]] = {}
+    for s in spans:
+        if s.parent_id is not None:
+            children.setdefault(names[s.parent_id], set()).add(s.name)
+    return children
+
+
+def test_build_and_query_spans_nest(memory, build) -> None:
+    retriever = build(retrieval_mode="hybrid", ingest_config=IngestConfig(batch_size=4))
+    build_span = next(s for s in memory.spans if s.name == "build")
+    assert build_span.counters == {"chunks": 20}
+    tree = _tree(memory.spans)
+    assert tree["build"] == {"ingest", "lexical_index"}
+    # Pipeline workers run in their own threads but join the build's trace.
+    assert tree["ingest"] == {"split", "embed", "index"}
+    assert {s.trace_id for s in memory.spans} == {build_span.trace_id}
+
+    memory.clear()
+    retriever.retrieve("c HW3 is due on day 3", k=2)
+    tree = _tree(memory.spans)
+    assert tree == {"retrieve": {"vector_search", "lexical_search"}}
+    (root,) = [s for s in memory.spans if s.parent_id is None]
+    assert root.counters == {"hits": 2}
+    assert root.attributes == {"k": 2, "mode": "hybrid"}
+    breakdown = memory.breakdown(root.trace_id)
+    assert breakdown["retrieve"] >= breakdown["vector_search"] > 0
+
+
+def test_file_exporters(tmp_path: Path) -> None:
+    lines = tmp_path / "spans.jsonl"
+    otlp = tmp_path / "traces.json"
+    tracer = tracing.Tracer(
+        tracing.JSONLinesExporter(lines), tracing.OTLPJSONExporter(otlp)
+    )
+    previous = tracing.set_tracer(tracer)
+    try:
+        request = tracing.span("request", pass_through=True)
+        with request, tracing.span("embed", texts=3) as inner:
+            inner.count("tokens", 12)
+        with pytest.raises(KeyError), tracing.span("retrieve"):
+            raise KeyError("k")
+    finally:
+        tracing.set_tracer(previous)
+        tracer.close()
+
+    records = [json.loads(line) for line in lines.read_text().splitlines()]
+    assert [r["name"] for r in records] == ["embed", "request", "retrieve"]
+    assert records[0]["parent_id"] == records[1]["span_id"]
+    assert records[0]["counters"] == {"tokens": 12}
+    assert records[2]["error"] == "KeyError: 'k'"
+
+    traces = [json.loads(line) for line in otlp.read_text().splitlines()]
+    assert len(traces) == 2
+    spans = traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    embed, request = spans
+    assert embed["parentSpanId"] == request["spanId"]
+    assert "parentSpanId" not in request
+    assert {"key": "counter.tokens", "value": {"intValue": "12"}} in (
+        embed["attributes"]
+    )
+    assert int(request["endTimeUnixNano"]) >= int(embed["endTimeUnixNano"])
+    failed = traces[1]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert failed["status"]["code"] == 2
+
+
+def test_spans_reach_langchain_callbacks(build) -> None:
+    events: list[tuple[str, dict]] = []
+
+    class Handler(langchain_core.callbacks.BaseCallbackHandler):
+        def on_custom_event(self, name, data, *, run_id, **kwargs) -> None:
+            events.append((name, data))
+
+    retriever = build(retrieval_mode="bm25")
+    manager = langchain_core.callbacks.manager.CallbackManager(
+        handlers=[], inheritable_handlers=[Handler()]
+    )
+    run_manager = manager.on_retriever_start({}, "HW3")
+    docs = retriever._get_relevant_documents("HW3", run_manager=run_manager)
+
+    assert docs
+    assert [name for name, _ in events] == [tracing.SPAN_EVENT] * 2
+    assert [data["name"] for _, data in events] == ["lexical_search", "retrieve"]
+    assert events[1][1]["counters"]["hits"] == len(docs)
+
+
+def test_disabled_tracing_is_a_no_op() -> None:
+    assert tracing.get_tracer() is None
+    with tracing.span("retrieve") as span:
+        span.count("hits")
+        tracing.count("hits")
+        assert tracing.current_span() is None
+    with tracing.collect() as spans, tracing.span("retrieve"), tracing.span("embed"):
+        pass
+    assert [s.name for s in spans] == ["embed", "retrieve"]
+    assert set(tracing.breakdown(spans)) == {"embed", "retrieve"}